@@ -10,12 +10,10 @@
 # ///
 
 
-import sqlite3
-
-from hishel import SyncSqliteStorage
+from hishel import SyncInMemoryStorage
 from hishel.httpx import SyncCacheClient
 
-cl = SyncCacheClient(storage=SyncSqliteStorage(connection=sqlite3.connect(":memory:")))
+cl = SyncCacheClient(storage=SyncInMemoryStorage())
 
 cl.get("https://hishel.com/")
 response = cl.get("https://hishel.com/")
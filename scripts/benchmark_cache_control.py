@@ -0,0 +1,56 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "hishel",
+# ]
+#
+# [tool.uv.sources]
+# hishel = { path = "../", editable = true }
+# ///
+
+"""
+Micro-benchmark for Cache-Control parsing.
+
+Compares the uncached parser (`parse`) with the memoized entry point
+(`parse_cache_control`) on a set of header values seen in real responses.
+"""
+
+import argparse
+import timeit
+
+from hishel._core._headers import parse, parse_cache_control
+
+VALUES = [
+    "max-age=0",
+    "no-cache",
+    "no-store",
+    "public, max-age=3600",
+    "private, max-age=0, must-revalidate",
+    "public, max-age=31536000, immutable",
+    "max-age=600, stale-while-revalidate=30, stale-if-error=86400",
+    "no-cache, no-store, max-age=0, must-revalidate",
+    's-maxage=300, private="Set-Cookie, Authorization", proxy-revalidate',
+    'no-cache="Set-Cookie", max-age=60, custom-extension="some value"',
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20_000, help="iterations over all values")
+    args = parser.parse_args()
+
+    for name, func in (("parse", parse), ("parse_cache_control", parse_cache_control)):
+        seconds = min(
+            timeit.repeat(
+                lambda: [func(value) for value in VALUES],
+                number=args.number,
+                repeat=5,
+            )
+        )
+        per_call = seconds / (args.number * len(VALUES)) * 1e9
+        print(f"{name:>20}: {per_call:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
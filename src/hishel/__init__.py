@@ -1,9 +1,22 @@
 from hishel._core._storages._async_sqlite import AsyncSqliteStorage
 from hishel._core._storages._async_base import AsyncBaseStorage
 from hishel._core._storages._async_redis import AsyncRedisStorage
+from hishel._core._storages._async_memory import AsyncInMemoryStorage
+from hishel._core._storages._async_tiered import AsyncTieredStorage
 from hishel._core._storages._sync_sqlite import SyncSqliteStorage
 from hishel._core._storages._sync_base import SyncBaseStorage
 from hishel._core._storages._sync_redis import RedisStorage
+from hishel._core._storages._sync_memory import SyncInMemoryStorage
+from hishel._core._storages._sync_tiered import SyncTieredStorage
+from hishel._core._storages._bloom import BloomFilter as BloomFilter
+from hishel._core._storages._codecs import (
+    BodyCodec as BodyCodec,
+    BodyCompression as BodyCompression,
+    LzmaCodec as LzmaCodec,
+    ZlibCodec as ZlibCodec,
+    ZstdCodec as ZstdCodec,
+    register_codec as register_codec,
+)
 from hishel._core._headers import Headers as Headers
 from hishel._core._spec import (
     AnyState as AnyState,
@@ -29,6 +42,7 @@ from hishel._core.models import (
 from hishel._async_cache import AsyncCacheProxy as AsyncCacheProxy
 from hishel._sync_cache import SyncCacheProxy as SyncCacheProxy
 
+from hishel._cache_keys import CacheKeyBuilder as CacheKeyBuilder
 from hishel._policies import SpecificationPolicy, FilterPolicy, CachePolicy, BaseFilter
 
 __all__ = (
@@ -62,6 +76,18 @@ __all__ = (
     "AsyncSqliteStorage",
     "RedisStorage",
     "AsyncRedisStorage",
+    "SyncInMemoryStorage",
+    "AsyncInMemoryStorage",
+    "SyncTieredStorage",
+    "AsyncTieredStorage",
+    "BloomFilter",
+    ## Body compression
+    "BodyCompression",
+    "BodyCodec",
+    "ZlibCodec",
+    "LzmaCodec",
+    "ZstdCodec",
+    "register_codec",
     # Proxy
     "AsyncCacheProxy",
     "SyncCacheProxy",
@@ -70,4 +96,5 @@ __all__ = (
     "CachePolicy",
     "SpecificationPolicy",
     "FilterPolicy",
+    "CacheKeyBuilder",
 )
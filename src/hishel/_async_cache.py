@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import hashlib
 import logging
+import tempfile
+import threading
 import time
+import uuid
 from dataclasses import replace
-from typing import AsyncIterable, AsyncIterator, Awaitable, Callable
+from types import TracebackType
+from typing import AsyncIterator, Awaitable, Callable
 
 from typing_extensions import assert_never
 
@@ -15,6 +18,7 @@ from hishel import (
     CacheMiss,
     CouldNotBeStored,
     FromCache,
+    Headers,
     IdleClient,
     NeedRevalidation,
     NeedToBeUpdated,
@@ -22,13 +26,17 @@ from hishel import (
     Response,
     StoreAndUse,
 )
-from hishel._core._spec import InvalidateEntries, vary_headers_match
+from hishel._concurrency import AsyncBackgroundTasks, AsyncHandoff, AsyncSingleFlight, UncacheableMemo
+from hishel._core._spec import InvalidateEntries, UnstorableReason, vary_headers_match
 from hishel._core.models import Entry, ResponseMetadata
 from hishel._policies import CachePolicy, FilterPolicy, SpecificationPolicy
-from hishel._utils import make_async_iterator
+from hishel._utils import spooled_async_stream, write_async_spool
 
 logger = logging.getLogger("hishel.integrations.clients")
 
+# Reasons a response is unstorable that hold for every request with the same cache key.
+MEMOIZABLE_UNSTORABLE_REASONS: frozenset[UnstorableReason] = frozenset({"no-store", "private", "missing-freshness"})
+
 
 class AsyncCacheProxy:
     """
@@ -54,20 +62,83 @@ class AsyncCacheProxy:
         self.send_request = request_sender
         self.storage = storage if storage is not None else AsyncSqliteStorage()
         self.policy = policy if policy is not None else SpecificationPolicy()
+        self._single_flight = AsyncSingleFlight()
+        self._background = AsyncBackgroundTasks()
+        # Entries with a background revalidation already in progress. Sync
+        # proxies are shared across threads, hence the lock.
+        self._revalidating_in_background: set[uuid.UUID] = set()
+        self._revalidating_lock = threading.Lock()
+        self._uncacheable = UncacheableMemo(maxsize=self.policy.uncacheable_max_size)
+
+    async def __aenter__(self) -> "AsyncCacheProxy":
+        await self._background.__aenter__()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        await self._background.__aexit__(exc_type, exc_value, traceback)
+
+    async def aclose(self) -> None:
+        await self._background.aclose()
 
     async def handle_request(self, request: Request) -> Response:
         if isinstance(self.policy, FilterPolicy):
             return await self._handle_request_with_filters(request)
         return await self._handle_request_respecting_spec(request)
 
-    async def _get_key_for_request(self, request: Request) -> str:
-        if self.policy.use_body_key or request.metadata.get("hishel_body_key"):
-            assert isinstance(request.stream, (AsyncIterator, AsyncIterable))
-            collected = b"".join([chunk async for chunk in request.stream])
-            hash_ = hashlib.sha256(collected).hexdigest()
-            request.stream = make_async_iterator([collected])
-            return hash_
-        return hashlib.sha256(str(request.url).encode("utf-8")).hexdigest()
+    async def _get_key_for_request(self, request: Request) -> tuple[str, tempfile.SpooledTemporaryFile[bytes] | None]:
+        """
+        Build the cache key for the request.
+
+        With body keys, the body is read and spooled for the origin, and the
+        spool is returned too; the caller closes it once the request is handled.
+        """
+        if not (self.policy.use_body_key or request.metadata.get("hishel_body_key")):
+            return self.policy.key_builder.build(request), None
+
+        # Hash the body as it is read and spool it for the origin, so at most
+        # `body_key_spool_size` bytes of it are held in memory.
+        hasher = self.policy.key_builder.body_hasher(request)
+        spool = tempfile.SpooledTemporaryFile(max_size=self.policy.body_key_spool_size)
+        try:
+            async for chunk in request._aiter_stream():
+                hasher.update(chunk)
+                await write_async_spool(spool, chunk)
+        except BaseException:
+            spool.close()
+            raise
+        request.stream = spooled_async_stream(spool)
+        return hasher.hexdigest(), spool
+
+    def _entries_for_request(self, entries: list[Entry], request: Request) -> list[Entry]:
+        """
+        Present entries stored for a URL that canonicalizes to the request's URL
+        as entries for the request's URL, which is the only one the state
+        machine reuses responses for.
+        """
+        canonical_url: str | None = None
+        matching: list[Entry] = []
+        for entry in entries:
+            if entry.request.url != request.url:
+                if canonical_url is None:
+                    canonical_url = self.policy.key_builder.canonical_url(request.url)
+                if self.policy.key_builder.canonical_url(entry.request.url) != canonical_url:
+                    continue
+                entry = replace(entry, request=replace(entry.request, url=request.url))
+            matching.append(entry)
+        return matching
+
+    async def _get_entries(self, cache_key: str, request: Request) -> list[Entry]:
+        if not await self.storage.might_have_entries(cache_key):
+            # Definitely never stored: skip the storage round trip.
+            return []
+        if self.policy.use_variant_index:
+            return await self.storage.get_variant_entries(cache_key, request)
+        return await self.storage.get_entries(cache_key)
 
     async def _maybe_refresh_entry_ttl(self, entry: Entry) -> None:
         if entry.request.metadata.get("hishel_refresh_ttl_on_access"):
@@ -94,107 +165,402 @@ class AsyncCacheProxy:
                     return await self.send_request(request)
 
         logger.debug("Trying to get cached response ignoring specification")
-        cache_key = await self._get_key_for_request(request)
-        entries = await self.storage.get_entries(cache_key)
+        cache_key, spool = await self._get_key_for_request(request)
+        try:
+            entries = self._entries_for_request(await self._get_entries(cache_key, request), request)
 
-        logger.debug(f"Found {len(entries)} cached entries for the request")
+            logger.debug(f"Found {len(entries)} cached entries for the request")
 
-        for entry in entries:
-            if (
-                str(entry.request.url) == str(request.url)
-                and entry.request.method == request.method
-                and vary_headers_match(
-                    request,
-                    entry,
-                )
-            ):
-                logger.debug(
-                    "Found matching cached response for the request",
-                )
-                response_meta = ResponseMetadata(
-                    hishel_from_cache=True,
-                    hishel_created_at=entry.meta.created_at,
-                    hishel_revalidated=False,
-                    hishel_stored=False,
-                )
-                entry.response.metadata.update(response_meta)  # type: ignore
-                await self._maybe_refresh_entry_ttl(entry)
-                return entry.response
-
-        response = await self.send_request(request)
-        for response_filter in self.policy.response_filters:
-            if response_filter.needs_body():
-                body = await response.aread()
-                if not response_filter.apply(response, body):
-                    logger.debug("Response filtered out by response filter")
-                    return response
-            else:
-                if not response_filter.apply(response, None):
-                    logger.debug("Response filtered out by response filter")
-                    return response
-        response_meta = ResponseMetadata(
-            hishel_from_cache=False,
-            hishel_created_at=time.time(),
-            hishel_revalidated=False,
-            hishel_stored=True,
-        )
-        response.metadata.update(response_meta)  # type: ignore
+            for entry in entries:
+                if entry.request.method == request.method and vary_headers_match(request, entry):
+                    logger.debug(
+                        "Found matching cached response for the request",
+                    )
+                    response_meta = ResponseMetadata(
+                        hishel_from_cache=True,
+                        hishel_created_at=entry.meta.created_at,
+                        hishel_revalidated=False,
+                        hishel_stored=False,
+                    )
+                    entry.response.metadata.update(response_meta)  # type: ignore
+                    await self._maybe_refresh_entry_ttl(entry)
+                    return entry.response
 
-        logger.debug("Storing response in cache ignoring specification")
-        entry = await self.storage.create_entry(
-            request,
-            response,
-            cache_key,
-        )
-        return entry.response
+            response = await self.send_request(request)
+            for response_filter in self.policy.response_filters:
+                if response_filter.needs_body():
+                    body = await response.aread()
+                    if not response_filter.apply(response, body):
+                        logger.debug("Response filtered out by response filter")
+                        return response
+                else:
+                    if not response_filter.apply(response, None):
+                        logger.debug("Response filtered out by response filter")
+                        return response
+            response_meta = ResponseMetadata(
+                hishel_from_cache=False,
+                hishel_created_at=time.time(),
+                hishel_revalidated=False,
+                hishel_stored=True,
+            )
+            response.metadata.update(response_meta)  # type: ignore
+
+            logger.debug("Storing response in cache ignoring specification")
+            entry = await self.storage.create_entry(
+                request,
+                response,
+                cache_key,
+            )
+            return entry.response
+        finally:
+            if spool is not None:
+                spool.close()
 
     async def _handle_request_respecting_spec(self, request: Request) -> Response:
         assert isinstance(self.policy, SpecificationPolicy)
         state: AnyState = IdleClient(options=self.policy.cache_options)
+        # Computed once: with body keys, this reads the whole request body.
+        cache_key, spool = await self._get_key_for_request(request)
+        # Cache key this request is leading a coalesced miss for, if any.
+        leading_key: str | None = None
 
+        try:
+            while state:
+                logger.debug(f"Handling state: {state.__class__.__name__}")
+                if isinstance(state, IdleClient):
+                    if self._is_known_uncacheable(request, cache_key):
+                        logger.debug("Skipping the cache lookup for a recently uncacheable response")
+                        # Nothing usable is stored, which still has to be answered
+                        # as a miss would be (e.g. a 504 for only-if-cached).
+                        state = state.next(request, [])
+                        continue
+                    state = await self._handle_idle_state(state, request, cache_key)
+                    if isinstance(state, CacheMiss) and self._should_coalesce(request):
+                        state, leading_key = await self._coalesce_cache_miss(state, request, cache_key)
+                elif isinstance(state, CacheMiss):
+                    state = await self._handle_cache_miss(state)
+                elif isinstance(state, StoreAndUse):
+                    if self.policy.remember_uncacheable:
+                        self._uncacheable.discard(cache_key)
+                    response = await self._handle_store_and_use(state, request, cache_key)
+                    if leading_key is not None:
+                        # Waiters can only reuse the entry once its body is fully
+                        # stored, so hold the flight until the stream is consumed,
+                        # closed or dropped.
+                        assert isinstance(response.stream, AsyncIterator)
+                        response.stream = self._single_flight.release_after(leading_key, response.stream)
+                        leading_key = None
+                    return response
+                elif isinstance(state, CouldNotBeStored):
+                    self._maybe_remember_uncacheable(state, request, cache_key)
+                    return state.response
+                elif isinstance(state, NeedRevalidation):
+                    deadline = request.metadata.get("hishel_deadline")
+                    if deadline is not None:
+                        state, spool = await self._handle_revalidation_within_deadline(
+                            state, deadline, cache_key, spool
+                        )
+                    else:
+                        state = await self._handle_revalidation(state)
+                elif isinstance(state, FromCache):
+                    if state.background_revalidation is not None:
+                        if not self._schedule_background_revalidation(state.background_revalidation, cache_key, spool):
+                            # Nowhere to run it in the background; revalidate before responding.
+                            state = state.background_revalidation
+                            continue
+                        # The background revalidation now owns the spooled body.
+                        spool = None
+                    await self._maybe_refresh_entry_ttl(state.entry)
+                    if state.ranges is not None:
+                        return self._make_partial_response(state.entry, state.ranges)
+                    return state.entry.response
+                elif isinstance(state, NeedToBeUpdated):
+                    state = await self._handle_update(state)
+                elif isinstance(state, InvalidateEntries):
+                    state = await self._handle_invalidate_entries(state)
+                else:
+                    assert_never(state)
+        finally:
+            if leading_key is not None:
+                self._single_flight.release(leading_key)
+            if spool is not None:
+                spool.close()
+
+        raise RuntimeError("Unreachable")
+
+    def _is_known_uncacheable(self, request: Request, cache_key: str) -> bool:
+        assert isinstance(self.policy, SpecificationPolicy)
+        if not self.policy.remember_uncacheable or len(self._uncacheable) == 0:
+            return False
+        # Only cacheable methods are remembered; the rest never reach the lookup anyway.
+        if request.method.upper() not in self.policy.cache_options.supported_methods:
+            return False
+        return cache_key in self._uncacheable
+
+    def _maybe_remember_uncacheable(self, state: CouldNotBeStored, request: Request, cache_key: str) -> None:
+        assert isinstance(self.policy, SpecificationPolicy)
+        if (
+            self.policy.remember_uncacheable
+            and state.reason in MEMOIZABLE_UNSTORABLE_REASONS
+            and request.method.upper() in self.policy.cache_options.supported_methods
+        ):
+            self._uncacheable.add(cache_key, ttl=self.policy.uncacheable_ttl)
+
+    def _should_coalesce(self, request: Request) -> bool:
+        assert isinstance(self.policy, SpecificationPolicy)
+        # Only requests whose responses could end up in the cache are worth
+        # waiting for; everything else goes straight to the origin.
+        return (
+            self.policy.coalesce_requests
+            and request.method.upper() in self.policy.cache_options.supported_methods
+            and "range" not in request.headers
+        )
+
+    async def _coalesce_cache_miss(
+        self, state: CacheMiss, request: Request, cache_key: str
+    ) -> tuple[AnyState, str | None]:
+        if self._single_flight.lead(cache_key):
+            return state, cache_key
+
+        logger.debug("Waiting for an in-flight request to populate the cache")
+        await self._single_flight.wait(cache_key, timeout=self.policy.coalesce_timeout)
+        return await self._handle_idle_state(IdleClient(options=state.options), request, cache_key), None
+
+    def _schedule_background_revalidation(
+        self,
+        state: NeedRevalidation,
+        cache_key: str,
+        spool: tempfile.SpooledTemporaryFile[bytes] | None = None,
+    ) -> bool:
+        """
+        Revalidate in the background, returning False if that isn't possible.
+
+        On True, `spool` (the spooled request body, if any) is closed once
+        the background revalidation no longer needs it.
+        """
+        if not self._background.available:
+            return False
+        entry_id = state.revalidating_entries[0].id
+        with self._revalidating_lock:
+            already_running = entry_id in self._revalidating_in_background
+            self._revalidating_in_background.add(entry_id)
+        if already_running:
+            logger.debug("Background revalidation is already in progress")
+            if spool is not None:
+                spool.close()
+            return True
+        self._background.start_soon(self._revalidate_in_background, state, entry_id, cache_key, spool)
+        return True
+
+    async def _revalidate_in_background(
+        self,
+        state: NeedRevalidation,
+        entry_id: uuid.UUID,
+        cache_key: str,
+        spool: tempfile.SpooledTemporaryFile[bytes] | None = None,
+    ) -> None:
+        try:
+            next_state = await self._handle_revalidation(state)
+            await self._complete_in_background(next_state, state.original_request, cache_key)
+        except Exception:
+            logger.exception("Background revalidation failed")
+        finally:
+            with self._revalidating_lock:
+                self._revalidating_in_background.discard(entry_id)
+            if spool is not None:
+                spool.close()
+
+    async def _complete_in_background(self, state: AnyState, request: Request, cache_key: str) -> None:
+        """
+        Drive the state machine to its end without a caller waiting for the response.
+
+        Response bodies are drained so that storable responses end up fully stored.
+        """
         while state:
-            logger.debug(f"Handling state: {state.__class__.__name__}")
-            if isinstance(state, IdleClient):
-                state = await self._handle_idle_state(state, request)
-            elif isinstance(state, CacheMiss):
+            if isinstance(state, CacheMiss):
                 state = await self._handle_cache_miss(state)
             elif isinstance(state, StoreAndUse):
-                return await self._handle_store_and_use(state, request)
+                response = await self._handle_store_and_use(state, request, cache_key)
+                async for _ in response._aiter_stream():
+                    pass
+                return
             elif isinstance(state, CouldNotBeStored):
-                return state.response
-            elif isinstance(state, NeedRevalidation):
-                state = await self._handle_revalidation(state)
-            elif isinstance(state, FromCache):
-                await self._maybe_refresh_entry_ttl(state.entry)
-                return state.entry.response
+                async for _ in state.response._aiter_stream():
+                    pass
+                return
             elif isinstance(state, NeedToBeUpdated):
                 state = await self._handle_update(state)
             elif isinstance(state, InvalidateEntries):
                 state = await self._handle_invalidate_entries(state)
+            elif isinstance(state, (FromCache, IdleClient, NeedRevalidation)):
+                return
             else:
                 assert_never(state)
 
-        raise RuntimeError("Unreachable")
+    def _make_partial_response(self, entry: Entry, ranges: list[tuple[int, int]]) -> Response:
+        """
+        Build the 206 response for byte `ranges` of a stored response (RFC 9110 §15.3.7).
+
+        A single range is sent as is; several are sent as multipart/byteranges,
+        read in one pass from the start of the first range to the end of the last.
+        """
+        response = entry.response
+        length = response.headers["content-length"]
+        headers = {
+            name: response.headers.get_list(name) or []
+            for name in response.headers
+            if name not in ("content-length", "content-range")
+        }
+        stream = self.storage.stream_entry_range(entry, ranges[0][0], ranges[-1][1])
 
-    async def _handle_idle_state(self, state: IdleClient, request: Request) -> AnyState:
-        stored_entries = await self.storage.get_entries(await self._get_key_for_request(request))
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            headers["content-range"] = [f"bytes {first}-{last}/{length}"]
+            headers["content-length"] = [str(last - first + 1)]
+        else:
+            boundary = uuid.uuid4().hex
+            content_type = response.headers.get("content-type")
+            part_heads: list[bytes] = []
+            for first, last in ranges:
+                part_head = f"--{boundary}\r\n"
+                if content_type is not None:
+                    part_head += f"content-type: {content_type}\r\n"
+                part_head += f"content-range: bytes {first}-{last}/{length}\r\n\r\n"
+                # Every part after the first starts on a new line.
+                part_heads.append((part_head if not part_heads else "\r\n" + part_head).encode("ascii"))
+            tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+            headers["content-type"] = [f"multipart/byteranges; boundary={boundary}"]
+            headers["content-length"] = [
+                str(sum(map(len, part_heads)) + sum(last - first + 1 for first, last in ranges) + len(tail))
+            ]
+            stream = self._iter_byteranges(stream, ranges, part_heads, tail)
+
+        return Response(
+            status_code=206,
+            headers=Headers(headers),
+            stream=stream,
+            metadata=response.metadata,
+        )
+
+    async def _iter_byteranges(
+        self,
+        stream: AsyncIterator[bytes],
+        ranges: list[tuple[int, int]],
+        part_heads: list[bytes],
+        tail: bytes,
+    ) -> AsyncIterator[bytes]:
+        """
+        Frame the sorted, disjoint `ranges` of a stream that starts at the first range.
+        """
+        position = ranges[0][0]
+        index = 0
+        yield part_heads[0]
+        async for chunk in stream:
+            while chunk:
+                first, last = ranges[index]
+                if position < first:
+                    # Skip the gap before the next range.
+                    skipped = min(first - position, len(chunk))
+                    chunk = chunk[skipped:]
+                    position += skipped
+                    continue
+                taken = min(last + 1 - position, len(chunk))
+                yield chunk[:taken]
+                chunk = chunk[taken:]
+                position += taken
+                if position > last:
+                    index += 1
+                    if index == len(ranges):
+                        yield tail
+                        return
+                    yield part_heads[index]
+
+    async def _handle_idle_state(self, state: IdleClient, request: Request, cache_key: str) -> AnyState:
+        stored_entries = self._entries_for_request(await self._get_entries(cache_key, request), request)
         return state.next(request, stored_entries)
 
     async def _handle_cache_miss(self, state: CacheMiss) -> AnyState:
         response = await self.send_request(state.request)
         return state.next(response)
 
-    async def _handle_store_and_use(self, state: StoreAndUse, request: Request) -> Response:
+    async def _handle_store_and_use(self, state: StoreAndUse, request: Request, cache_key: str) -> Response:
         entry = await self.storage.create_entry(
             request,
             state.response,
-            await self._get_key_for_request(request),
+            cache_key,
         )
         return entry.response
 
     async def _handle_revalidation(self, state: NeedRevalidation) -> AnyState:
-        revalidation_response = await self.send_request(state.request)
-        return state.next(revalidation_response)
+        try:
+            revalidation_response = await self.send_request(state.request)
+        except Exception:
+            stale = state.serve_stale_on_error()
+            if stale is None:
+                raise
+            logger.debug("Revalidation request failed", exc_info=True)
+            return stale
+
+        next_state = state.next(revalidation_response)
+        if isinstance(next_state, FromCache) and revalidation_response.status_code >= 500:
+            # The error response is replaced with a stored one; drain it so the
+            # connection can be reused.
+            async for _ in revalidation_response._aiter_stream():
+                pass
+        return next_state
+
+    async def _handle_revalidation_within_deadline(
+        self,
+        state: NeedRevalidation,
+        deadline: float,
+        cache_key: str,
+        spool: tempfile.SpooledTemporaryFile[bytes] | None = None,
+    ) -> tuple[AnyState, tempfile.SpooledTemporaryFile[bytes] | None]:
+        """
+        Revalidate, but serve a stale stored response if the origin takes longer
+        than `deadline` seconds. The revalidation then finishes in the background
+        and updates the cache.
+
+        Returns the next state and the spooled request body the caller still
+        owns, which is None once the background revalidation has taken it over.
+        """
+        stale = state.serve_stale_past_deadline()
+        if stale is None or not self._background.available:
+            return await self._handle_revalidation(state), spool
+
+        handoff: AsyncHandoff[AnyState] = AsyncHandoff()
+        self._background.start_soon(self._revalidate_for_handoff, state, handoff, cache_key, spool)
+        next_state = await handoff.wait(deadline)
+        if next_state is None:
+            logger.debug("Serving a stale response because revalidation exceeded the deadline")
+            return stale, None
+        return next_state, None
+
+    async def _revalidate_for_handoff(
+        self,
+        state: NeedRevalidation,
+        handoff: AsyncHandoff[AnyState],
+        cache_key: str,
+        spool: tempfile.SpooledTemporaryFile[bytes] | None = None,
+    ) -> None:
+        try:
+            try:
+                next_state = await self._handle_revalidation(state)
+            except Exception as error:
+                if not handoff.fail(error):
+                    logger.exception("Background revalidation failed")
+                return
+
+            if handoff.put(next_state):
+                return
+            try:
+                await self._complete_in_background(next_state, state.original_request, cache_key)
+            except Exception:
+                logger.exception("Background revalidation failed")
+        finally:
+            # The conditional request may send the spooled body until here.
+            if spool is not None:
+                spool.close()
 
     async def _handle_update(self, state: NeedToBeUpdated) -> AnyState:
         for updating_entry in state.updating_entries:
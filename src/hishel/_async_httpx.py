@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import ssl
 import typing as t
+from types import TracebackType
 from typing import (
     AsyncIterable,
     AsyncIterator,
@@ -67,7 +68,7 @@ def _internal_to_httpx(
         return httpx.Response(
             status_code=value.status_code,
             headers=value.headers,
-            stream=_IteratorStream(value._aiter_stream()),
+            stream=_IteratorStream(value._aiter_stream(), value.stream),
             extensions=value.metadata,
         )
 
@@ -98,6 +99,7 @@ def _httpx_to_internal(
             hishel_ttl=value.extensions.get("hishel_ttl"),
             hishel_spec_ignore=value.extensions.get("hishel_spec_ignore"),
             hishel_body_key=value.extensions.get("hishel_body_key"),
+            hishel_deadline=value.extensions.get("hishel_deadline"),
         )
         headers_metadata = extract_metadata_from_headers(value.headers)
 
@@ -145,14 +147,25 @@ def _httpx_to_internal(
 
 
 class _IteratorStream(httpx.SyncByteStream, httpx.AsyncByteStream):
-    def __init__(self, iterator: Iterator[bytes] | AsyncIterator[bytes]) -> None:
+    def __init__(
+        self,
+        iterator: Iterator[bytes] | AsyncIterator[bytes],
+        source: object = None,
+    ) -> None:
         self.iterator = iterator
+        # The stream `iterator` reads from, closed with the response even if it was never read.
+        self.source = source
 
     async def __aiter__(self) -> AsyncIterator[bytes]:
         assert isinstance(self.iterator, (AsyncIterator, AsyncIterable))
         async for chunk in self.iterator:
             yield chunk
 
+    async def aclose(self) -> None:
+        aclose = getattr(self.source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
 
 class AsyncCacheTransport(httpx.AsyncBaseTransport):
     def __init__(
@@ -178,7 +191,22 @@ class AsyncCacheTransport(httpx.AsyncBaseTransport):
         response = _internal_to_httpx(internal_response)
         return response
 
+    async def __aenter__(self) -> "AsyncCacheTransport":
+        await self._cache_proxy.__aenter__()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        # Let background revalidations finish before the storage is closed.
+        await self._cache_proxy.__aexit__(exc_type, exc_value, traceback)
+        await super().__aexit__(exc_type, exc_value, traceback)
+
     async def aclose(self) -> None:
+        await self._cache_proxy.aclose()
         await self.next_transport.aclose()
         await self.storage.close()
         await super().aclose()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+if TYPE_CHECKING:
+    from hishel import Request
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+@dataclass(frozen=True)
+class CacheKeyBuilder:
+    """
+    Computes the cache key of a request.
+
+    By default, the key is a hash of the request URL, or of the request body
+    alone when the body is part of the key (see `CachePolicy.use_body_key`),
+    so it matches the keys of existing caches.
+
+    Everything else is opt-in and changes the keys of existing entries. With
+    `canonicalize_url`, trivially different URLs for the same resource share
+    their entries: the scheme and host are lowercased, the default port and
+    the fragment are dropped, and an empty path becomes "/" (RFC 9110 §4.2.3).
+    Query parameters whose names match one of `ignore_params` are dropped and,
+    when `allow_params` is set, so are the ones that match none of them; both
+    take shell-style patterns such as `utm_*`. With `sort_query`, the
+    remaining parameters are sorted by name. The values of the request headers
+    named in `headers` are added to the key. Once any of these is set, body
+    keys hash the URL and headers too.
+
+    `hash_name` is the name of any fixed-size algorithm `hashlib.new` accepts.
+    """
+
+    canonicalize_url: bool = False
+    sort_query: bool = False
+    ignore_params: tuple[str, ...] = ()
+    allow_params: Optional[tuple[str, ...]] = None
+    headers: tuple[str, ...] = ()
+    hash_name: str = "sha256"
+
+    def canonical_url(self, url: str) -> str:
+        if not self.canonicalize_url:
+            if not self._filters_query:
+                return url
+            parts = urlsplit(url)
+            return urlunsplit(parts._replace(query=self.canonical_query(parts.query)))
+
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+
+        userinfo, at, host = parts.netloc.rpartition("@")
+        port = ""
+        # IPv6 hosts are bracketed and contain colons of their own.
+        if ":" in host and not host.endswith("]"):
+            host, _, port = host.rpartition(":")
+        if port == DEFAULT_PORTS.get(scheme):
+            port = ""
+        netloc = userinfo + at + host.lower() + (":" + port if port else "")
+
+        path = parts.path or ("/" if netloc else "")
+        return urlunsplit((scheme, netloc, path, self.canonical_query(parts.query), ""))
+
+    def canonical_query(self, query: str) -> str:
+        if not self._filters_query:
+            return query
+
+        # Parameters are kept as they were encoded; only their names are decoded
+        # for matching, so values that are equivalent but encoded differently
+        # still produce different keys.
+        params = []
+        for param in query.split("&"):
+            if not param:
+                continue
+            name = unquote_plus(param.partition("=")[0])
+            if any(fnmatchcase(name, pattern) for pattern in self.ignore_params):
+                continue
+            if self.allow_params is not None and not any(fnmatchcase(name, pattern) for pattern in self.allow_params):
+                continue
+            params.append((name, param))
+        if self.sort_query:
+            # Stable, so repeated parameters keep their order.
+            params.sort(key=lambda item: item[0])
+        return "&".join(param for _, param in params)
+
+    def build(self, request: Request, body: Optional[bytes] = None) -> str:
+        if body is None:
+            return self._hasher(request).hexdigest()
+        hasher = self.body_hasher(request)
+        hasher.update(body)
+        return hasher.hexdigest()
+
+    def body_hasher(self, request: Request) -> hashlib._Hash:
+        """
+        A hash object for the key of `request`, waiting to be updated with the
+        request body. Its hex digest is the same key `build` computes for the
+        whole body, so the body can be hashed while it is being read.
+        """
+        if not (self.canonicalize_url or self._filters_query or self.headers):
+            return hashlib.new(self.hash_name)
+        hasher = self._hasher(request)
+        hasher.update(b"\x00")
+        return hasher
+
+    @property
+    def _filters_query(self) -> bool:
+        return self.sort_query or bool(self.ignore_params) or self.allow_params is not None
+
+    def _hasher(self, request: Request) -> hashlib._Hash:
+        hasher = hashlib.new(self.hash_name, self.canonical_url(request.url).encode("utf-8"))
+        for name in self.headers:
+            values = request.headers.get_list(name) or []
+            hasher.update(b"\x00" + name.lower().encode("utf-8") + b":" + ", ".join(values).encode("utf-8"))
+        return hasher
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+
+from hishel._utils import notify_async_stream, notify_sync_stream
+
+if tp.TYPE_CHECKING:  # pragma: no cover
+    import anyio
+    import anyio.abc
+
+# Upper bound on threads used by sync proxies for background work.
+BACKGROUND_MAX_WORKERS = 4
+
+
+class AsyncSingleFlight:
+    """
+    Tracks in-flight cache misses per cache key for async proxies.
+
+    The first caller to `lead` a key becomes the leader and is expected to
+    populate the cache; every other caller for the same key `wait`s until the
+    leader calls `release` (or the timeout elapses) and then retries the cache
+    lookup instead of hitting the origin.
+
+    No lock is needed: all bookkeeping happens between awaits on a single
+    event loop, so `lead` and `release` are atomic with respect to other tasks.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, anyio.Event] = {}
+
+    def lead(self, key: str) -> bool:
+        """
+        Try to become the leader for `key`.
+
+        Returns:
+            True if the caller is now the leader, False if another caller already is.
+        """
+        import anyio
+
+        if key in self._flights:
+            return False
+        self._flights[key] = anyio.Event()
+        return True
+
+    async def wait(self, key: str, timeout: float | None = None) -> None:
+        """
+        Wait until the leader for `key` releases it, or until `timeout` seconds pass.
+        """
+        import anyio
+
+        event = self._flights.get(key)
+        if event is None:
+            return
+        with anyio.move_on_after(timeout):
+            await event.wait()
+
+    def release(self, key: str) -> None:
+        """
+        Release the leadership for `key` and wake up all waiters.
+        """
+        event = self._flights.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def release_after(self, key: str, stream: tp.AsyncIterator[bytes]) -> tp.AsyncIterator[bytes]:
+        """
+        Wrap the leader's response `stream` so that `key` is released once the
+        stream is exhausted, fails, is closed, or is dropped without being read.
+        """
+        return notify_async_stream(stream, functools.partial(self.release, key))
+
+
+class SyncSingleFlight:
+    """
+    Tracks in-flight cache misses per cache key for sync proxies.
+
+    Same contract as `AsyncSingleFlight`, but safe to share across threads:
+    the registry is guarded by a lock and waiters block on a `threading.Event`.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def lead(self, key: str) -> bool:
+        """
+        Try to become the leader for `key`.
+
+        Returns:
+            True if the caller is now the leader, False if another caller already is.
+        """
+        with self._lock:
+            if key in self._flights:
+                return False
+            self._flights[key] = threading.Event()
+            return True
+
+    def wait(self, key: str, timeout: float | None = None) -> None:
+        """
+        Wait until the leader for `key` releases it, or until `timeout` seconds pass.
+        """
+        with self._lock:
+            event = self._flights.get(key)
+        if event is None:
+            return
+        event.wait(timeout)
+
+    def release(self, key: str) -> None:
+        """
+        Release the leadership for `key` and wake up all waiters.
+        """
+        with self._lock:
+            event = self._flights.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def release_after(self, key: str, stream: tp.Iterator[bytes]) -> tp.Iterator[bytes]:
+        """
+        Wrap the leader's response `stream` so that `key` is released once the
+        stream is exhausted, fails, is closed, or is dropped without being read.
+        """
+        return notify_sync_stream(stream, functools.partial(self.release, key))
+
+
+class AsyncBackgroundTasks:
+    """
+    Runs fire-and-forget work for async proxies on an anyio task group.
+
+    The task group only exists while the owner is used as an async context
+    manager; outside of it `start_soon` refuses the work so the caller can
+    do it in the foreground instead.
+    """
+
+    def __init__(self) -> None:
+        self._task_group: anyio.abc.TaskGroup | None = None
+
+    @property
+    def available(self) -> bool:
+        return self._task_group is not None
+
+    def start_soon(self, func: tp.Callable[..., tp.Coroutine[tp.Any, tp.Any, tp.Any]], *args: tp.Any) -> bool:
+        """
+        Schedule `func(*args)` in the background.
+
+        Returns:
+            False if there is no running task group and nothing was scheduled.
+        """
+        if self._task_group is None:
+            return False
+        self._task_group.start_soon(func, *args)
+        return True
+
+    async def __aenter__(self) -> "AsyncBackgroundTasks":
+        import anyio
+
+        task_group = anyio.create_task_group()
+        await task_group.__aenter__()
+        self._task_group = task_group
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        task_group, self._task_group = self._task_group, None
+        if task_group is not None:
+            await task_group.__aexit__(exc_type, exc_value, traceback)
+
+    async def aclose(self) -> None:
+        # The task group is owned by the async context manager; nothing to release here.
+        pass
+
+
+class SyncBackgroundTasks:
+    """
+    Runs fire-and-forget work for sync proxies on a bounded thread pool.
+
+    The pool is created lazily on first use and shut down by `close`.
+    """
+
+    def __init__(self, max_workers: int = BACKGROUND_MAX_WORKERS) -> None:
+        self._max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def start_soon(self, func: tp.Callable[..., tp.Any], *args: tp.Any) -> bool:
+        """
+        Schedule `func(*args)` in the background.
+
+        Returns:
+            Always True; the thread pool is created on demand.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="hishel-background",
+                )
+            self._executor.submit(func, *args)
+        return True
+
+    def __enter__(self) -> "SyncBackgroundTasks":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+T = tp.TypeVar("T")
+
+
+class AsyncHandoff(tp.Generic[T]):
+    """
+    Hands the result of background work to a caller that waits for it for a
+    limited time, in async proxies.
+
+    If `wait` times out, the handoff is abandoned: `put` and `fail` then
+    return False, so the background task knows nobody will take the result
+    and finishes the work itself.
+
+    No lock is needed for the same reason as in `AsyncSingleFlight`.
+    """
+
+    def __init__(self) -> None:
+        import anyio
+
+        self._event = anyio.Event()
+        self._abandoned = False
+        self._value: T | None = None
+        self._error: BaseException | None = None
+
+    def put(self, value: T) -> bool:
+        """
+        Hand `value` to the waiting caller.
+
+        Returns:
+            False if the caller has stopped waiting.
+        """
+        if self._abandoned:
+            return False
+        self._value = value
+        self._event.set()
+        return True
+
+    def fail(self, error: BaseException) -> bool:
+        """
+        Raise `error` in the waiting caller.
+
+        Returns:
+            False if the caller has stopped waiting.
+        """
+        if self._abandoned:
+            return False
+        self._error = error
+        self._event.set()
+        return True
+
+    async def wait(self, timeout: float) -> T | None:
+        """
+        Wait up to `timeout` seconds for the result.
+
+        Returns:
+            The value that was put, or None if the timeout elapsed first.
+        """
+        import anyio
+
+        with anyio.move_on_after(timeout):
+            await self._event.wait()
+        if not self._event.is_set():
+            self._abandoned = True
+            return None
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class SyncHandoff(tp.Generic[T]):
+    """
+    Hands the result of background work to a caller that waits for it for a
+    limited time, in sync proxies.
+
+    Same contract as `AsyncHandoff`, with a lock deciding whether the result
+    or the timeout comes first.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._abandoned = False
+        self._value: T | None = None
+        self._error: BaseException | None = None
+
+    def put(self, value: T) -> bool:
+        """
+        Hand `value` to the waiting caller.
+
+        Returns:
+            False if the caller has stopped waiting.
+        """
+        with self._lock:
+            if self._abandoned:
+                return False
+            self._value = value
+            self._event.set()
+            return True
+
+    def fail(self, error: BaseException) -> bool:
+        """
+        Raise `error` in the waiting caller.
+
+        Returns:
+            False if the caller has stopped waiting.
+        """
+        with self._lock:
+            if self._abandoned:
+                return False
+            self._error = error
+            self._event.set()
+            return True
+
+    def wait(self, timeout: float) -> T | None:
+        """
+        Wait up to `timeout` seconds for the result.
+
+        Returns:
+            The value that was put, or None if the timeout elapsed first.
+        """
+        self._event.wait(timeout)
+        with self._lock:
+            if not self._event.is_set():
+                self._abandoned = True
+                return None
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class UncacheableMemo:
+    """
+    Remembers cache keys whose responses were recently judged unstorable.
+
+    Keys expire `ttl` seconds after they were added, and once `maxsize` keys
+    are remembered the oldest one is forgotten. Shared by async and sync
+    proxies; the lock only matters for the latter.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._expires_at: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, ttl: float) -> None:
+        with self._lock:
+            self._expires_at.pop(key, None)
+            self._expires_at[key] = time.monotonic() + ttl
+            while len(self._expires_at) > self.maxsize:
+                self._expires_at.popitem(last=False)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        with self._lock:
+            expires_at = self._expires_at.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._expires_at[key]
+                return False
+            return True
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._expires_at.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires_at.clear()
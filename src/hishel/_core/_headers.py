@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import (
     Any,
     Iterator,
@@ -87,7 +89,8 @@ def is_token(c: str) -> bool:
           / "+" / "-" / "." / "0"-"9" / "A"-"Z"
           / "^" / "_" / "`" / "a"-"z" / "|" / "~"
 
-    Implementation: token chars are CHAR but not CTL or separators
+    Implementation: token chars are CHAR but not CTL or separators,
+    precomputed in `TOKEN_CHARS`
 
     Args:
         c: Single character string
@@ -113,7 +116,20 @@ def is_token(c: str) -> bool:
         >>> is_token('=')
         False
     """
-    return is_char(c) and not is_ctl(c) and not is_separator(c)
+    return c in TOKEN_CHARS
+
+
+TOKEN_CHARS = frozenset(chr(b) for b in range(128) if not is_ctl(chr(b)) and not is_separator(chr(b)))
+
+# Compiled forms of the character classes above, used by the Cache-Control
+# parser to scan whole runs of characters at once.
+_TOKEN_RE = re.compile(r"[!#$%&'*+.^_`|~0-9A-Za-z-]+")
+# A quoted-string made only of qdtext, i.e. without quoted-pairs or characters
+# that `http_unquote` would have to replace.
+_QUOTED_STRING_RE = re.compile(r'"([\t !#-\[\]-~\x80-\U0010ffff]*)"')
+_EQUALS_RE = re.compile(r"[ \t]*=[ \t]*")
+_VALUE_END_RE = re.compile(r"[ \t,]")
+_FIELD_NAMES_VALUE_END_RE = re.compile(r"[ \t]")
 
 
 def is_qd_text(c: str) -> bool:
@@ -338,6 +354,41 @@ class Range:
         )
 
 
+def parse_byte_ranges(range_header: str) -> list[tuple[int | None, int | None]] | None:
+    """
+    Parse a `bytes` Range header value into its ranges (RFC 9110 Section 14.1.2).
+
+    Each range is a `(first, last)` pair; a suffix range such as `-500` has a
+    `first` of None and an open range such as `100-` a `last` of None.
+
+    Returns:
+        None if the value uses another unit or is not a valid range set.
+    """
+    unit, equals, values = range_header.partition("=")
+    if not equals or unit.strip().lower() != "bytes":
+        return None
+
+    ranges: list[tuple[int | None, int | None]] = []
+    for part in values.split(","):
+        part = part.strip()
+        if not part:
+            # Empty list elements are allowed (RFC 9110 Section 5.6.1).
+            continue
+        first_str, dash, last_str = part.partition("-")
+        first_str, last_str = first_str.strip(), last_str.strip()
+        if not dash or not (first_str or last_str):
+            return None
+        if (first_str and not first_str.isdigit()) or (last_str and not last_str.isdigit()):
+            return None
+        first = int(first_str) if first_str else None
+        last = int(last_str) if last_str else None
+        if first is not None and last is not None and last < first:
+            return None
+        ranges.append((first, last))
+
+    return ranges or None
+
+
 class CacheControl:
     """
     Unified Cache-Control directives for both requests and responses.
@@ -367,8 +418,22 @@ class CacheControl:
         - None: directive not present
         - True: directive present without field names
         - List[str]: directive present with specific field names
+
+    Instances returned by `parse_cache_control` are shared between every
+    caller that parses the same header value, so they are frozen: setting an
+    attribute raises AttributeError, and the lists must not be modified.
     """
 
+    _frozen = False
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self._frozen:
+            raise AttributeError(f"cannot assign to field {name!r} of a parsed CacheControl")
+        super().__setattr__(name, value)
+
+    def _freeze(self) -> None:
+        object.__setattr__(self, "_frozen", True)
+
     def __init__(self) -> None:
         # Common directives
         self.max_age: Optional[int] = None
@@ -429,10 +494,11 @@ def has_field_names(token: str) -> bool:
 
 def parse(value: str) -> CacheControl:
     """
-    Parse a Cache-Control header value character by character.
+    Parse a Cache-Control header value.
 
-    This parser handles quoted values and field names correctly,
-    allowing commas within field name lists.
+    Tokens and values are scanned with the precompiled patterns above rather
+    than one character at a time. This parser handles quoted values and field
+    names correctly, allowing commas within field name lists.
 
     Args:
         value: The Cache-Control header value string
@@ -457,71 +523,54 @@ def parse(value: str) -> CacheControl:
             break
 
         # Find end of token
-        j = i
-        while j < length and is_token(value[j]):
-            j += 1
-
-        if j == i:
+        token_match = _TOKEN_RE.match(value, i)
+        if token_match is None:
             # No valid token found, skip this character
             i += 1
             continue
 
-        token = value[i:j].lower()
-        token_has_fields = has_field_names(token)
-
-        # Skip whitespace after token
-        while j < length and value[j] in (" ", "\t"):
-            j += 1
-
-        # Check if token has a value (token=value)
-        if j < length and value[j] == "=":
-            k = j + 1
+        token = token_match.group().lower()
 
-            # Skip whitespace after equals sign
-            while k < length and value[k] in (" ", "\t"):
-                k += 1
+        # Check if token has a value (token=value), allowing whitespace around "="
+        equals = _EQUALS_RE.match(value, token_match.end())
+        if equals is None:
+            # Token without value
+            handle_directive_without_value(cc, token)
+            i = token_match.end()
+            continue
 
-            if k >= length:
-                # Directive ends with '=' but no value
-                i = k
-                continue
+        k = equals.end()
+        if k >= length:
+            # Directive ends with '=' but no value
+            i = k
+            continue
 
-            # Check for quoted value
-            if value[k] == '"':
+        # Check for quoted value
+        if value[k] == '"':
+            quoted = _QUOTED_STRING_RE.match(value, k)
+            if quoted is not None:
+                # Nothing to unescape or replace
+                i = quoted.end()
+                result = quoted.group(1)
+            else:
                 eaten, result = http_unquote(value[k:])
                 if eaten == -1:
                     # Quote mismatch, skip to next directive
                     i = k + 1
                     continue
-
                 i = k + eaten
-                handle_directive_with_value(cc, token, result)
-            else:
-                # Unquoted value
-                z = k
-                while z < length:
-                    if token_has_fields:
-                        # For directives with field names, stop only at whitespace
-                        if value[z] in (" ", "\t"):
-                            break
-                    else:
-                        # For other directives, stop at whitespace or comma
-                        if value[z] in (" ", "\t", ","):
-                            break
-                    z += 1
-
-                result = value[k:z]
-
-                # Remove trailing comma if present
-                if result and result[-1] == ",":
-                    result = result[:-1]
-
-                i = z
-                handle_directive_with_value(cc, token, result)
         else:
-            # Token without value
-            handle_directive_without_value(cc, token)
-            i = j
+            # Unquoted value. For directives with field names, stop only at
+            # whitespace; for other directives, stop at whitespace or comma.
+            value_end = (_FIELD_NAMES_VALUE_END_RE if has_field_names(token) else _VALUE_END_RE).search(value, k)
+            i = value_end.start() if value_end is not None else length
+            result = value[k:i]
+
+            # Remove trailing comma if present
+            if result and result[-1] == ",":
+                result = result[:-1]
+
+        handle_directive_with_value(cc, token, result)
 
     return cc
 
@@ -640,7 +689,20 @@ def parse_cache_control(value: str | None) -> CacheControl:
         True
         >>> cc.stale_while_revalidate
         86400
+
+    Results are memoized by header value (see `CACHE_CONTROL_MEMO_SIZE`), so the
+    returned object is shared and frozen.
     """
-    if value is None:
-        return CacheControl()
-    return parse(value)
+    return _parse_cache_control_memoized(value or "")
+
+
+# Only a handful of distinct Cache-Control values are seen in practice, while
+# the header is parsed for the request and for every candidate entry.
+CACHE_CONTROL_MEMO_SIZE = 512
+
+
+@lru_cache(maxsize=CACHE_CONTROL_MEMO_SIZE)
+def _parse_cache_control_memoized(value: str) -> CacheControl:
+    cc = parse(value)
+    cc._freeze()
+    return cc
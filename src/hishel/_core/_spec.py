@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import time
 import uuid
@@ -9,17 +11,18 @@ from typing import (
     TYPE_CHECKING,
     Any,
     Dict,
+    Literal,
     Optional,
     TypeVar,
     Union,
 )
 
-from hishel._core._headers import Headers, Range, Vary, parse_cache_control
-from hishel._core.models import ResponseMetadata
+from hishel._core._headers import Headers, Range, Vary, parse_byte_ranges, parse_cache_control
+from hishel._core.models import Response, ResponseMetadata
 from hishel._utils import parse_date, partition
 
 if TYPE_CHECKING:
-    from hishel import Entry, Request, Response
+    from hishel import Entry, Request
 
 
 TState = TypeVar("TState", bound="State")
@@ -36,6 +39,17 @@ HEURISTICALLY_CACHEABLE_STATUS_CODES = (
     414,
     501,
 )
+
+UnstorableReason = Literal[
+    "method",
+    "status",
+    "not-understood",
+    "no-store",
+    "private",
+    "authorization",
+    "missing-freshness",
+]
+"""The storage requirement (RFC 9111 Section 3) a response failed."""
 logger = logging.getLogger("hishel.core.spec")
 
 
@@ -132,6 +146,27 @@ class CacheOptions:
     allow_stale: bool = False
     """When True, stale responses can be served without revalidation."""
 
+    stale_while_revalidate: bool = False
+    """
+    When True, honours the RFC 5861 `stale-while-revalidate` response directive:
+    a stale response within its window is served immediately and revalidated
+    in the background.
+    """
+
+    stale_if_error: bool = False
+    """
+    When True, honours the RFC 5861 `stale-if-error` directive of responses and
+    requests: if revalidating a stale response fails with an error or a 5xx
+    response within its window, the stale response is served and kept.
+    """
+
+    serve_ranges: bool = False
+    """
+    When True, GET requests with a `Range` header are answered with a 206
+    response cut from a complete stored response that can be reused without
+    validation. Otherwise they always go to the origin.
+    """
+
 
 @dataclass
 class State(ABC):
@@ -248,6 +283,38 @@ def vary_headers_match(
     return True
 
 
+def normalize_vary(vary_value: Optional[str]) -> str:
+    """
+    The field names of a Vary header value in a canonical form.
+
+    Names are lowercased, deduplicated, sorted and joined with commas, so that
+    every spelling of the same Vary set normalizes to the same string. Returns
+    "" when there is no Vary header and "*" when it contains "*".
+    """
+    if not vary_value:
+        return ""
+    names = {name.lower() for name in Vary.from_value(vary_value).values if name}
+    if "*" in names:
+        return "*"
+    return ",".join(sorted(names))
+
+
+def get_variant_key(vary: str, request: Request) -> Optional[bytes]:
+    """
+    Identifies the variant of a response with the normalized Vary set `vary`
+    (see `normalize_vary`) that `request` selects.
+
+    A stored response is a candidate for a request exactly when the key computed
+    from the request that stored it equals the key computed from the new
+    request, because the nominated header values are compared the same way as
+    in `vary_headers_match`. Returns None for "*", which no request matches.
+    """
+    if vary == "*":
+        return None
+    names = vary.split(",") if vary else []
+    return hashlib.sha256(json.dumps([vary, [request.headers.get(name) for name in names]]).encode("utf-8")).digest()
+
+
 def get_freshness_lifetime(response: Response, is_cache_shared: bool) -> Optional[int]:
     """
     Calculates the freshness lifetime of a cached response in seconds.
@@ -682,6 +749,148 @@ def get_age(response: Response) -> int:
     return int(apparent_age)
 
 
+# Key in `Entry.extra` that holds the entry's precomputed `Freshness`.
+FRESHNESS_KEY = "hishel_freshness"
+
+
+@dataclass(frozen=True)
+class Freshness:
+    """
+    The parts of a stored response's headers needed to decide whether it can be reused.
+
+    Storages compute this record with `get_freshness` when an entry is stored
+    or updated and keep it in `Entry.extra` under `FRESHNESS_KEY`, so looking
+    an entry up doesn't have to parse its Cache-Control, Date and Expires
+    headers again.
+
+    Heuristic freshness lifetimes (see `get_heuristic_freshness`) are fixed
+    at the time the record is computed, which can only make them shorter
+    than computing them on every lookup.
+    """
+
+    date: Optional[int]
+    """The parsed Date header, or None if it is missing or invalid."""
+    lifetime_shared: Optional[int]
+    """The freshness lifetime for a shared cache (`get_freshness_lifetime`)."""
+    lifetime_private: Optional[int]
+    """The freshness lifetime for a private cache (`get_freshness_lifetime`)."""
+    no_cache: bool
+    """The response has an unqualified no-cache directive."""
+    must_revalidate: bool
+    """The response can't be served stale (see `allowed_stale`)."""
+    stale_while_revalidate: Optional[int] = None
+    """The response's stale-while-revalidate directive, if any."""
+    stale_if_error: Optional[int] = None
+    """The response's stale-if-error directive, if any."""
+    immutable: bool = False
+    """The response has an immutable directive (RFC 8246)."""
+
+    def lifetime(self, is_cache_shared: bool) -> Optional[int]:
+        return self.lifetime_shared if is_cache_shared else self.lifetime_private
+
+    def expires_at(self, is_cache_shared: bool) -> Optional[int]:
+        """The absolute time the response becomes stale, if it is known."""
+        lifetime = self.lifetime(is_cache_shared)
+        if lifetime is None or self.date is None:
+            return None
+        return self.date + lifetime
+
+    def age(self) -> int:
+        """Same as `get_age`, using the stored Date."""
+        if self.date is None:
+            return 0
+        return int(max(0, time.time() - self.date))
+
+
+def get_freshness(response: Response) -> Freshness:
+    """
+    Parses everything `IdleClient` needs from a stored response's headers.
+    """
+    cache_control = parse_cache_control(response.headers.get("cache-control"))
+    return Freshness(
+        date=parse_date(response.headers.get("date", "")),
+        lifetime_shared=get_freshness_lifetime(response, is_cache_shared=True),
+        lifetime_private=get_freshness_lifetime(response, is_cache_shared=False),
+        no_cache=cache_control.no_cache is True,
+        # A no-cache directive that lists field names doesn't require validating
+        # the whole response, but `allowed_stale` still rules out serving it stale.
+        must_revalidate=cache_control.must_revalidate or bool(cache_control.no_cache),
+        stale_while_revalidate=cache_control.stale_while_revalidate,
+        stale_if_error=cache_control.stale_if_error,
+        immutable=cache_control.immutable,
+    )
+
+
+def get_entry_freshness(entry: Entry) -> Freshness:
+    """
+    The freshness record a storage saved with the entry, or a freshly parsed one.
+    """
+    freshness = entry.extra.get(FRESHNESS_KEY)
+    if isinstance(freshness, Freshness):
+        return freshness
+    return get_freshness(entry.response)
+
+
+def resolve_byte_ranges(ranges: list[tuple[Optional[int], Optional[int]]], length: int) -> list[tuple[int, int]]:
+    """
+    Turn parsed byte ranges into the inclusive `(first, last)` offsets they
+    select in a representation of `length` bytes (RFC 9110 Section 14.1.2).
+
+    Unsatisfiable ranges are dropped. The rest are sorted and overlapping or
+    adjacent ranges are coalesced, as RFC 9110 Section 14.6 allows.
+    """
+    resolved: list[tuple[int, int]] = []
+    for first, last in ranges:
+        if first is None:
+            # Suffix range: the final `last` bytes.
+            if not last:
+                continue
+            first, last = max(length - last, 0), length - 1
+        elif first >= length:
+            continue
+        else:
+            last = length - 1 if last is None else min(last, length - 1)
+        resolved.append((first, last))
+
+    resolved.sort()
+    merged: list[tuple[int, int]] = []
+    for first, last in resolved:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def if_range_matches(if_range: str, response: Response) -> bool:
+    """
+    Evaluate an If-Range condition against a stored response (RFC 9110 Section 13.1.5).
+
+    An entity-tag matches only a strong, identical ETag. A date matches only a
+    Last-Modified that is the same date and strong, meaning at least one
+    second older than the response's Date.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        etag = response.headers.get("etag")
+        return etag is not None and not if_range.startswith("W/") and etag.strip() == if_range
+
+    last_modified = response.headers.get("last-modified")
+    date = response.headers.get("date")
+    if last_modified is None or date is None:
+        return False
+    if_range_date = parse_date(if_range)
+    last_modified_date = parse_date(last_modified)
+    response_date = parse_date(date)
+    return (
+        if_range_date is not None
+        and last_modified_date is not None
+        and response_date is not None
+        and if_range_date == last_modified_date
+        and response_date - last_modified_date >= 1
+    )
+
+
 def make_conditional_request(request: Request, response: Response) -> Request:
     """
     Converts a regular request into a conditional request for validation.
@@ -1127,14 +1336,14 @@ class IdleClient(State):
     Entry state of the cache state machine. Decides whether an incoming request
     is served from cache, needs revalidation, or goes to the origin.
 
-    Transitions: CacheMiss | FromCache | NeedRevalidation
+    Transitions: CacheMiss | FromCache | NeedRevalidation | CouldNotBeStored
 
     See RFC 9111 §4 for the reuse rules this state enforces.
     """
 
     def next(
         self, request: Request, associated_entries: list[Entry]
-    ) -> Union["CacheMiss", "FromCache", "NeedRevalidation"]:
+    ) -> Union["CacheMiss", "FromCache", "NeedRevalidation", "CouldNotBeStored"]:
         """
         Implements the cache lookup algorithm from RFC 9111 §4.
 
@@ -1148,14 +1357,21 @@ class IdleClient(State):
             it, since §4.3 explicitly permits serving it after successful
             validation.
         A request `Cache-Control: no-cache` is treated as a soft failure for
-        every entry (§5.2.1.4).
+        every entry (§5.2.1.4) except fresh `immutable` responses (RFC 8246 §2).
+
+        The request's `min-fresh` and `max-stale` directives narrow and widen
+        which entries count as fresh enough (§5.2.1.1, §5.2.1.3). With
+        `only-if-cached` (§5.2.1.7), a request that can't be answered from the
+        cache gets a 504 response instead of going to the origin.
         """
 
-        # Range requests are punted to the origin — see §3.3 for the full rules
-        # we'd otherwise need to implement.
-        request_range = Range.try_from_str(request.headers["range"]) if "range" in request.headers else None
-        if request_range is not None:
-            return CacheMiss(options=self.options, request=request)
+        if "range" in request.headers:
+            if self.options.serve_ranges and request.method.upper() == "GET":
+                return self._next_for_range(request, associated_entries)
+            # Range requests are punted to the origin — see §3.3 for the full rules
+            # we'd otherwise need to implement.
+            if Range.try_from_str(request.headers["range"]) is not None:
+                return self._miss(request)
 
         # §4: unsafe methods must be written through to the origin.
         if request.method.upper() not in SAFE_METHODS:
@@ -1163,10 +1379,18 @@ class IdleClient(State):
 
         # Parsed once — applies uniformly to every candidate.
         request_cache_control = parse_cache_control(request.headers.get("cache-control"))
-        request_forces_revalidation = request_cache_control.no_cache is True
+        request_no_cache = request_cache_control.no_cache is True
+        min_fresh = request_cache_control.min_fresh or 0
+        max_stale = request_cache_control.max_stale
 
         ready_to_use: list[Entry] = []
         need_revalidation: list[Entry] = []
+        # Stale entries that RFC 5861 lets us serve while they are revalidated.
+        stale_while_revalidating: list[Entry] = []
+
+        # Storages precompute each entry's freshness record when it's written,
+        # so this loop doesn't parse response headers for stored entries.
+        freshness: dict[uuid.UUID, Freshness] = {}
 
         for pair in associated_entries:
             # Hard conditions — drop the entry entirely.
@@ -1178,34 +1402,64 @@ class IdleClient(State):
             # Soft conditions — any failure demotes to revalidation.
             vary_ok = vary_headers_match(request, pair)
 
-            response_cc = parse_cache_control(pair.response.headers.get("cache-control"))
-            has_no_cache = response_cc.no_cache is True
+            pair_freshness = freshness[pair.id] = get_entry_freshness(pair)
+            has_no_cache = pair_freshness.no_cache
+            can_be_stale = not pair_freshness.must_revalidate
 
-            freshness_lifetime = get_freshness_lifetime(pair.response, self.options.shared)
-            age = get_age(pair.response)
-            is_fresh = freshness_lifetime is not None and age < freshness_lifetime
-            fresh_or_stale_ok = is_fresh or allowed_stale(pair.response, allow_stale_option=self.options.allow_stale)
+            freshness_lifetime = pair_freshness.lifetime(self.options.shared)
+            age = pair_freshness.age()
+            is_fresh = freshness_lifetime is not None and age + min_fresh < freshness_lifetime
+            # §5.2.1.1: the client accepts responses that have been stale for
+            # at most `max_stale` seconds.
+            within_max_stale = max_stale is not None and age - (freshness_lifetime or 0) <= max_stale
+            fresh_or_stale_ok = is_fresh or (can_be_stale and (self.options.allow_stale or within_max_stale))
+            # RFC 8246 §2: a reload shouldn't revalidate a fresh immutable response.
+            request_forces_revalidation = request_no_cache and not (is_fresh and pair_freshness.immutable)
 
             if not has_no_cache and vary_ok and fresh_or_stale_ok and not request_forces_revalidation:
                 ready_to_use.append(pair)
             else:
                 need_revalidation.append(pair)
+                if (
+                    self.options.stale_while_revalidate
+                    and not has_no_cache
+                    and vary_ok
+                    and not request_forces_revalidation
+                    and freshness_lifetime is not None
+                    and pair_freshness.stale_while_revalidate is not None
+                    and age < freshness_lifetime + pair_freshness.stale_while_revalidate
+                    and can_be_stale
+                ):
+                    stale_while_revalidating.append(pair)
 
         # §4: "When more than one suitable response is stored, a cache MUST use
         # the most recent one (as determined by the Date header field)."
+        now = int(time.time())
+
         def _date_key(pair: Entry) -> int:
-            return parse_date(
-                pair.response.headers.get("date", str(int(time.time()))),
-            ) or int(time.time())
+            return freshness[pair.id].date or now
 
         ready_to_use.sort(key=_date_key, reverse=True)
         need_revalidation.sort(key=_date_key, reverse=True)
+        stale_while_revalidating.sort(key=_date_key, reverse=True)
+
+        background_revalidation: Optional[NeedRevalidation] = None
+        if not ready_to_use and stale_while_revalidating:
+            # RFC 5861 §3: serve the stale response right away and let the
+            # caller revalidate every candidate asynchronously.
+            ready_to_use = stale_while_revalidating[:1]
+            background_revalidation = NeedRevalidation(
+                request=make_conditional_request(request, need_revalidation[0].response),
+                revalidating_entries=need_revalidation,
+                options=self.options,
+                original_request=request,
+            )
 
         if ready_to_use:
             # §4: when reusing without validation, the cache MUST emit an Age
             # header equal to the stored response's current_age.
             selected_pair = ready_to_use[0]
-            current_age = get_age(selected_pair.response)
+            current_age = freshness[selected_pair.id].age()
             return FromCache(
                 entry=replace(
                     selected_pair,
@@ -1220,9 +1474,10 @@ class IdleClient(State):
                     ),
                 ),
                 options=self.options,
+                background_revalidation=background_revalidation,
             )
 
-        elif need_revalidation:
+        elif need_revalidation and not request_cache_control.only_if_cached:
             # Build the conditional request from the most recent candidate's
             # validators (§4.3).
             return NeedRevalidation(
@@ -1232,10 +1487,59 @@ class IdleClient(State):
                 original_request=request,
             )
         else:
-            return CacheMiss(
-                request=request,
-                options=self.options,
-            )
+            return self._miss(request)
+
+    def _miss(self, request: Request) -> Union["CacheMiss", "CouldNotBeStored"]:
+        """
+        A cache miss, or a 504 (Gateway Timeout) response when the request has
+        `only-if-cached` and must not be forwarded to the origin (§5.2.1.7).
+        """
+        if parse_cache_control(request.headers.get("cache-control")).only_if_cached:
+            return CouldNotBeStored(response=Response(status_code=504), options=self.options)
+        return CacheMiss(request=request, options=self.options)
+
+    def _next_for_range(
+        self, request: Request, associated_entries: list[Entry]
+    ) -> Union["CacheMiss", "FromCache", "CouldNotBeStored"]:
+        """
+        Serves a Range request (RFC 9110 §14.2) from a complete stored response.
+
+        The lookup runs as for the same request without `Range` and `If-Range`.
+        When it yields a fresh stored 200 with a Content-Length, the result
+        carries the byte ranges to send in a 206 response. When an If-Range
+        condition fails, the Range header is ignored (RFC 9110 §13.1.5) and the
+        full response is served. Anything else, including stale entries, goes
+        to the origin with the Range header intact.
+        """
+        byte_ranges = parse_byte_ranges(request.headers["range"])
+        if byte_ranges is None:
+            return self._miss(request)
+
+        full_request = replace(
+            request,
+            headers=Headers(
+                {
+                    name: request.headers.get_list(name) or []
+                    for name in request.headers
+                    if name not in ("range", "if-range")
+                }
+            ),
+        )
+        state = self.next(full_request, associated_entries)
+
+        if_range = request.headers.get("if-range")
+        if isinstance(state, FromCache) and state.background_revalidation is None:
+            response = state.entry.response
+            content_length = response.headers.get("content-length", "")
+            if if_range is not None and not if_range_matches(if_range, response):
+                return state
+            if response.status_code == 200 and content_length.isdigit():
+                ranges = resolve_byte_ranges(byte_ranges, int(content_length))
+                if ranges:
+                    state.ranges = ranges
+                    return state
+
+        return self._miss(request)
 
 
 @dataclass
@@ -1537,49 +1841,56 @@ class CacheMiss(State):
             # One or more storage requirements failed. Log the specific reason
             # and return a CouldNotBeStored state.
 
-            # Detailed logging for debugging (only when DEBUG level is enabled)
-            if logger.isEnabledFor(logging.DEBUG):
-                if not method_understood_by_cache:
-                    logger.debug(
-                        "Cannot store the response because the request method is not understood by the cache. "
-                        "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.1.1"
-                    )
-                elif not response_status_code_is_final:
-                    logger.debug(
-                        f"Cannot store the response because the response status code ({response.status_code}) "
-                        "is not final. See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.2.1"
-                    )
-                elif not understands_how_to_cache:
-                    logger.debug(
-                        "Cannot store the response because the cache does not understand how to cache the response. "
-                        "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.3.2"
-                    )
-                elif not no_store_is_not_present:
-                    logger.debug(
-                        "Cannot store the response because the no-store cache directive is present in the response. "
-                        "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.4.1"
-                    )
-                elif not private_directive_allows_storing:
-                    logger.debug(
-                        "Cannot store the response because the `private` response directive does not "
-                        "allow shared caches to store it. See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.5.1"
-                    )
-                elif not can_cache_auth_request:
-                    logger.debug(
-                        "Cannot store the response because the request contained an Authorization header "
-                        "and there was no explicit directive allowing shared caching. "
-                        "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-5"
-                    )
-                elif not contains_required_component:
-                    logger.debug(
-                        "Cannot store the response because it does not contain any of the required components. "
-                        "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.7.1"
-                    )
+            reason: UnstorableReason
+            if not method_understood_by_cache:
+                reason = "method"
+                logger.debug(
+                    "Cannot store the response because the request method is not understood by the cache. "
+                    "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.1.1"
+                )
+            elif not response_status_code_is_final:
+                reason = "status"
+                logger.debug(
+                    f"Cannot store the response because the response status code ({response.status_code}) "
+                    "is not final. See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.2.1"
+                )
+            elif not understands_how_to_cache:
+                reason = "not-understood"
+                logger.debug(
+                    "Cannot store the response because the cache does not understand how to cache the response. "
+                    "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.3.2"
+                )
+            elif not no_store_is_not_present:
+                reason = "no-store"
+                logger.debug(
+                    "Cannot store the response because the no-store cache directive is present in the response. "
+                    "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.4.1"
+                )
+            elif not private_directive_allows_storing:
+                reason = "private"
+                logger.debug(
+                    "Cannot store the response because the `private` response directive does not "
+                    "allow shared caches to store it. See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.5.1"
+                )
+            elif not can_cache_auth_request:
+                reason = "authorization"
+                logger.debug(
+                    "Cannot store the response because the request contained an Authorization header "
+                    "and there was no explicit directive allowing shared caching. "
+                    "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-5"
+                )
+            else:
+                reason = "missing-freshness"
+                logger.debug(
+                    "Cannot store the response because it does not contain any of the required components. "
+                    "See: https://www.rfc-editor.org/rfc/rfc9111.html#section-3-2.7.1"
+                )
 
             return CouldNotBeStored(
                 response=response,
                 options=self.options,
                 after_revalidation=self.after_revalidation,
+                reason=reason,
             )
 
         # --------------------------------------------------------------------
@@ -1620,6 +1931,7 @@ class NeedRevalidation(State):
     - NeedToBeUpdated: 304 response received, cached responses can be freshened
     - InvalidateEntries + CacheMiss: 2xx/5xx response received, new response must be cached
     - CacheMiss: No matching responses found during freshening
+    - FromCache: 5xx response received and `stale_if_error` allows serving a stored response
 
     RFC 9111 References:
     -------------------
@@ -1709,8 +2021,8 @@ class NeedRevalidation(State):
         --------------------
         - All revalidating pairs except the last are invalidated when receiving 2xx/5xx
         - The last pair's ID is reused for storing the new response
-        - 5xx responses are treated the same as 2xx (both invalidate and store new response)
-        - A full implementation might serve stale responses on 5xx errors
+        - 5xx responses are treated the same as 2xx (both invalidate and store new response),
+          unless `stale_if_error` is enabled and a stale response can be served (see `serve_stale_on_error`)
 
         Examples:
         --------
@@ -1807,6 +2119,11 @@ class NeedRevalidation(State):
         # This implementation chooses option A: forward the error and store it.
         # A full implementation might check allowed_stale and serve cached content.
         elif revalidation_response.status_code // 100 == 5:
+            # RFC 5861 Section 4: with stale-if-error, act as if the server
+            # failed to respond and serve a stored response instead.
+            stale = self.serve_stale_on_error()
+            if stale is not None:
+                return stale
             # Same as 2xx: invalidate old responses and store the error response
             # This ensures clients see the error rather than potentially stale data
             return InvalidateEntries(
@@ -1832,6 +2149,84 @@ class NeedRevalidation(State):
                 after_revalidation=True,
             ).next(revalidation_response)
 
+    def serve_stale_on_error(self) -> Optional["FromCache"]:
+        """
+        Picks the stored response to serve when revalidation fails.
+
+        RFC 5861 Section 4: "The stale-if-error Cache-Control extension indicates
+        that when an error is encountered, a cached stale response MAY be used to
+        satisfy the request, regardless of other freshness information."
+
+        With `stale_if_error` enabled, this returns the newest candidate that
+        matches the request's Vary headers, can be served stale, and is within
+        the stale-if-error window of its response or of the original request.
+        The caller calls it when the origin returned a 5xx response or could
+        not be reached, and the candidates are kept.
+
+        Returns:
+        -------
+        Optional[FromCache]
+            The stale response to serve, or None if there is none.
+        """
+        if not self.options.stale_if_error:
+            return None
+
+        request_stale_if_error = parse_cache_control(self.original_request.headers.get("cache-control")).stale_if_error
+        for entry in self.revalidating_entries:
+            if not vary_headers_match(self.original_request, entry):
+                continue
+            freshness = get_entry_freshness(entry)
+            lifetime = freshness.lifetime(self.options.shared)
+            windows = [window for window in (freshness.stale_if_error, request_stale_if_error) if window is not None]
+            if freshness.must_revalidate or lifetime is None or not windows:
+                continue
+            age = freshness.age()
+            if age >= lifetime + max(windows):
+                continue
+
+            logger.debug("Serving a stale response because the origin failed to revalidate it")
+            return self._serve_stale(entry, age)
+        return None
+
+    def serve_stale_past_deadline(self) -> Optional["FromCache"]:
+        """
+        Picks the stored response to serve when revalidation takes longer than
+        the request's `hishel_deadline`.
+
+        This is the newest candidate that matches the request's Vary headers
+        and can be served stale (RFC 9111 §4.2.4), however stale it is. Nothing
+        is returned when the original request has `no-cache`, since the client
+        asked for a validated response.
+
+        Returns:
+        -------
+        Optional[FromCache]
+            The stale response to serve, or None if there is none.
+        """
+        if parse_cache_control(self.original_request.headers.get("cache-control")).no_cache is True:
+            return None
+
+        for entry in self.revalidating_entries:
+            if not vary_headers_match(self.original_request, entry):
+                continue
+            freshness = get_entry_freshness(entry)
+            if freshness.must_revalidate:
+                continue
+            return self._serve_stale(entry, freshness.age())
+        return None
+
+    def _serve_stale(self, entry: Entry, age: int) -> "FromCache":
+        return FromCache(
+            entry=replace(
+                entry,
+                response=replace(
+                    entry.response,
+                    headers=Headers({**entry.response.headers, "age": str(age)}),
+                ),
+            ),
+            options=self.options,
+        )
+
     def _opaque_tag(self, etag: str) -> str:
         """
         Return the opaque-tag portion of an entity-tag, dropping the weakness flag.
@@ -2041,6 +2436,9 @@ class CouldNotBeStored(State):
         The unique identifier for the cache pair.
     after_revalidation : bool
         Indicates if the storage attempt occurred after a revalidation process.
+    reason : UnstorableReason | None
+        The first storage requirement the response failed, or None when the
+        state was reached for another reason.
     """
 
     def __init__(
@@ -2048,9 +2446,11 @@ class CouldNotBeStored(State):
         response: Response,
         options: CacheOptions,
         after_revalidation: bool = False,
+        reason: Optional[UnstorableReason] = None,
     ) -> None:
         super().__init__(options)
         self.response = response
+        self.reason = reason
         response_meta = ResponseMetadata(
             hishel_created_at=time.time(),
             hishel_from_cache=False,
@@ -2078,15 +2478,35 @@ class InvalidateEntries(State):
 
 
 class FromCache(State):
+    """
+    The state that indicates that the stored response can be served.
+
+    Attributes:
+    ----------
+    entry : Entry
+        The stored entry to serve.
+    after_revalidation : bool
+        Indicates if the entry is served after a revalidation process.
+    background_revalidation : Optional[NeedRevalidation]
+        Set when a stale entry is served under RFC 5861 `stale-while-revalidate`.
+        The caller is expected to carry out this revalidation without delaying the response.
+    ranges : Optional[list[tuple[int, int]]]
+        Set when a Range request is served from the entry: the sorted, inclusive
+        byte ranges of the stored body to send in a 206 response.
+    """
+
     def __init__(
         self,
         entry: Entry,
         options: CacheOptions,
         after_revalidation: bool = False,
+        background_revalidation: Optional[NeedRevalidation] = None,
     ) -> None:
         super().__init__(options)
         self.entry = entry
         self.after_revalidation = after_revalidation
+        self.background_revalidation = background_revalidation
+        self.ranges: Optional[list[tuple[int, int]]] = None
         response_meta = ResponseMetadata(
             hishel_created_at=entry.meta.created_at,
             hishel_from_cache=True,
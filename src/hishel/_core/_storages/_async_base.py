@@ -5,6 +5,8 @@ import time
 import typing as tp
 import uuid
 
+from hishel._utils import slice_async_stream
+
 from ..models import Entry, Request, Response
 
 
@@ -17,6 +19,39 @@ class AsyncBaseStorage(abc.ABC):
     async def get_entries(self, key: str) -> tp.List[Entry]:
         raise NotImplementedError()
 
+    async def might_have_entries(self, key: str) -> bool:
+        """
+        Return False only if nothing is stored under `key`, so the caller can
+        skip `get_entries`.
+
+        Storages configured with a key filter (see `BloomFilter`) answer from
+        memory; the default always returns True.
+        """
+        return True
+
+    async def get_variant_entries(self, key: str, request: Request) -> tp.List[Entry]:
+        """
+        Get the entries stored under `key` that `request` may select.
+
+        Storages that index entries by variant (see `get_variant_key`) return
+        only the entries whose Vary-nominated request headers match `request`.
+        The default returns every entry, like `get_entries`.
+        """
+        return await self.get_entries(key)
+
+    async def stream_entry_range(self, entry: Entry, first: int, last: int) -> tp.AsyncIterator[bytes]:
+        """
+        Yield bytes `first` to `last` (inclusive) of the body of `entry`, as
+        returned by `get_entries`.
+
+        Storages that can seek into stored bodies start reading at the chunk
+        that holds `first`. The default reads the entry's response stream from
+        the beginning and drops the bytes before `first`.
+        """
+        assert isinstance(entry.response.stream, tp.AsyncIterator)
+        async for chunk in slice_async_stream(entry.response.stream, first, last):
+            yield chunk
+
     @abc.abstractmethod
     async def update_entry(
         self,
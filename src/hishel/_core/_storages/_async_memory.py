@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import functools
+import heapq
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from hishel._core._headers import Headers
+from hishel._core._spec import FRESHNESS_KEY, get_freshness, get_variant_key, normalize_vary
+from hishel._core._storages._async_base import AsyncBaseStorage
+from hishel._core._storages._packing import filter_out_hishel_metadata
+from hishel._core.models import Entry, EntryMeta, Request, Response
+from hishel._utils import make_async_iterator, notify_async_stream
+
+# 100 MB
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+# Seconds an entry may wait for its response stream to be read before it is dropped.
+PENDING_BODY_TIMEOUT = 300.0
+
+
+def _copy_headers(headers: Headers) -> Headers:
+    # Callers may mutate the headers they pass in or get back, so stored
+    # entries never share them.
+    return Headers({name: headers.get_list(name) or [] for name in headers})
+
+
+@dataclass
+class _Record:
+    entry: Entry
+    # None until the response stream has been fully consumed.
+    body: Optional[bytes] = None
+    expires_at: Optional[float] = None
+    # When the record is dropped if its body still hasn't been stored.
+    pending_until: Optional[float] = None
+    # The normalized Vary set and variant key of the stored entry.
+    vary: str = ""
+    variant_key: Optional[bytes] = None
+
+
+class AsyncInMemoryStorage(AsyncBaseStorage):
+    """
+    Storage that keeps entries and response bodies in process memory.
+
+    Entries are kept in least-recently-used order. When `max_entries` or
+    `max_size` (total size of the stored bodies, in bytes) is exceeded, the
+    least recently used entries are evicted. Expired entries are dropped using
+    an expiry heap, so no operation has to scan the whole cache.
+
+    Removed entries are dropped immediately; streams that were already handed
+    out keep a reference to their body and can still be read. Entries whose
+    response stream is closed or dropped before it is fully read, or is left
+    unread for `PENDING_BODY_TIMEOUT` seconds, are dropped as well.
+    """
+
+    def __init__(
+        self,
+        *,
+        default_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_size: Optional[int] = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        # Records in LRU order: the least recently used entry comes first.
+        self._records: OrderedDict[uuid.UUID, _Record] = OrderedDict()
+        # Cache key -> ids of the entries stored under that key.
+        self._index: Dict[str, List[uuid.UUID]] = {}
+        # (expires_at, id) pairs. Refreshing a TTL pushes a new pair and leaves
+        # the old one behind; stale pairs are skipped when they reach the top.
+        self._expiry_heap: List[Tuple[float, uuid.UUID]] = []
+        self._size = 0
+        # Every critical section is free of awaits, so a plain lock is enough
+        # and also makes the storage safe to share between threads.
+        self._lock = threading.RLock()
+
+    async def create_entry(self, request: Request, response: Response, key: str, id_: uuid.UUID | None = None) -> Entry:
+        pair_id = id_ if id_ is not None else uuid.uuid4()
+        entry = Entry(
+            id=pair_id,
+            request=request,
+            response=response,
+            meta=EntryMeta(created_at=time.time()),
+            cache_key=key.encode("utf-8"),
+        )
+
+        pending_until = time.time() + PENDING_BODY_TIMEOUT
+        record = _Record(entry=self._detach(entry), pending_until=pending_until)
+        with self._lock:
+            self._evict_expired()
+            self._insert(record)
+            heapq.heappush(self._expiry_heap, (pending_until, pair_id))
+            self._evict_over_limits()
+
+        assert isinstance(response.stream, (AsyncIterator, AsyncIterable))
+        # Unlike the generator's own cleanup, this also runs for streams that are never started.
+        stream = notify_async_stream(
+            self._save_stream(response.stream, record), functools.partial(self._drop_if_pending, record)
+        )
+        return replace(entry, response=replace(response, stream=stream))
+
+    async def get_entries(self, key: str) -> List[Entry]:
+        return self._get_entries(key, None)
+
+    async def might_have_entries(self, key: str) -> bool:
+        # The index is exact, so no key filter is needed.
+        with self._lock:
+            self._evict_expired()
+            return key in self._index
+
+    async def get_variant_entries(self, key: str, request: Request) -> List[Entry]:
+        return self._get_entries(key, request)
+
+    def _get_entries(self, key: str, request: Optional[Request]) -> List[Entry]:
+        entries: List[Entry] = []
+        # Variant keys of `request`, one per Vary set stored under the key.
+        variant_keys: Dict[str, Optional[bytes]] = {}
+
+        with self._lock:
+            self._evict_expired()
+            for entry_id in self._index.get(key, []):
+                record = self._records[entry_id]
+                # Skip entries whose response is still being streamed
+                if record.body is None:
+                    continue
+                if request is not None:
+                    if record.vary not in variant_keys:
+                        variant_keys[record.vary] = get_variant_key(record.vary, request)
+                    if record.variant_key is None or record.variant_key != variant_keys[record.vary]:
+                        continue
+                self._records.move_to_end(entry_id)
+                entries.append(self._attach(record.entry, record.body))
+
+        return entries
+
+    async def update_entry(
+        self,
+        id: uuid.UUID,
+        new_entry: Union[Entry, Callable[[Entry], Entry]],
+    ) -> Optional[Entry]:
+        with self._lock:
+            self._evict_expired()
+            record = self._records.get(id)
+            if record is None:
+                return None
+
+            if isinstance(new_entry, Entry):
+                updated = new_entry
+            else:
+                updated = new_entry(self._attach(record.entry, record.body or b""))
+
+            if record.entry.id != updated.id:
+                raise ValueError("Entry ID mismatch")
+
+            old_key = record.entry.cache_key.decode("utf-8")
+            new_key = updated.cache_key.decode("utf-8")
+            if old_key != new_key:
+                self._unindex(old_key, id)
+                self._index.setdefault(new_key, []).append(id)
+
+            record.entry = self._detach(updated)
+            self._index_variant(record)
+            self._schedule_expiry(record)
+            return updated
+
+    async def refresh_entry_ttl(self, id: uuid.UUID) -> None:
+        await self.update_entry(
+            id,
+            lambda pair: replace(
+                pair,
+                meta=replace(pair.meta, created_at=time.time()),
+            ),
+        )
+
+    async def remove_entry(self, id: uuid.UUID) -> None:
+        with self._lock:
+            self._delete(id)
+
+    async def _save_stream(self, stream: AsyncIterator[bytes], record: _Record) -> AsyncIterator[bytes]:
+        """
+        Wrapper around an async iterator that also collects the response body
+        and stores it in `record` once the stream is exhausted.
+
+        Bodies larger than `max_size` are not kept; the entry is removed instead.
+        If the record was replaced by a newer one with the same ID meanwhile,
+        the newer one is left alone.
+        """
+        entry_id = record.entry.id
+        chunks: List[bytes] = []
+        collected_size = 0
+        too_large = False
+
+        try:
+            async for chunk in stream:
+                if not too_large:
+                    collected_size += len(chunk)
+                    if self.max_size is not None and collected_size > self.max_size:
+                        too_large = True
+                        chunks.clear()
+                    else:
+                        chunks.append(chunk)
+                yield chunk
+        except BaseException:
+            # Upstream errored or the consumer stopped early; the body is incomplete.
+            with self._lock:
+                if self._records.get(entry_id) is record:
+                    self._delete(entry_id)
+            raise
+
+        with self._lock:
+            if self._records.get(entry_id) is not record:
+                # Evicted, removed or replaced while streaming.
+                return
+            if too_large:
+                self._delete(entry_id)
+                return
+            record.body = b"".join(chunks)
+            record.pending_until = None
+            self._size += len(record.body)
+            self._records.move_to_end(entry_id)
+            self._evict_over_limits()
+
+    def _drop_if_pending(self, record: _Record) -> None:
+        """
+        Drop `record` if its body was never stored and it wasn't replaced meanwhile.
+        """
+        with self._lock:
+            if record.body is None and self._records.get(record.entry.id) is record:
+                self._delete(record.entry.id)
+
+    def _ttl(self, entry: Entry) -> Optional[float]:
+        ttl: Optional[float] = entry.request.metadata.get("hishel_ttl") or self.default_ttl
+        return ttl
+
+    def _insert(self, record: _Record) -> None:
+        entry_id = record.entry.id
+        # An entry stored again under the same ID replaces the old one.
+        self._delete(entry_id)
+        self._records[entry_id] = record
+        self._index.setdefault(record.entry.cache_key.decode("utf-8"), []).append(entry_id)
+        self._index_variant(record)
+        self._schedule_expiry(record)
+
+    def _index_variant(self, record: _Record) -> None:
+        record.vary = normalize_vary(record.entry.response.headers.get("vary"))
+        record.variant_key = get_variant_key(record.vary, record.entry.request)
+
+    def _schedule_expiry(self, record: _Record) -> None:
+        ttl = self._ttl(record.entry)
+        expires_at = None if ttl is None else record.entry.meta.created_at + ttl
+        if expires_at == record.expires_at:
+            return
+        record.expires_at = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, record.entry.id))
+            if len(self._expiry_heap) > 2 * len(self._records) + 64:
+                self._compact_expiry_heap()
+
+    def _compact_expiry_heap(self) -> None:
+        self._expiry_heap = [
+            (deadline, entry_id)
+            for entry_id, record in self._records.items()
+            for deadline in (record.expires_at, record.pending_until)
+            if deadline is not None
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            expires_at, entry_id = heapq.heappop(self._expiry_heap)
+            record = self._records.get(entry_id)
+            if record is None:
+                continue
+            # The TTL may have been refreshed, or the body stored, since this pair was pushed.
+            if record.expires_at == expires_at or (record.body is None and record.pending_until == expires_at):
+                self._delete(entry_id)
+
+    def _evict_over_limits(self) -> None:
+        while self._records and (
+            (self.max_entries is not None and len(self._records) > self.max_entries)
+            or (self.max_size is not None and self._size > self.max_size)
+        ):
+            entry_id = next(iter(self._records))
+            self._delete(entry_id)
+
+    def _delete(self, entry_id: uuid.UUID) -> None:
+        record = self._records.pop(entry_id, None)
+        if record is None:
+            return
+        if record.body is not None:
+            self._size -= len(record.body)
+        self._unindex(record.entry.cache_key.decode("utf-8"), entry_id)
+
+    def _unindex(self, key: str, entry_id: uuid.UUID) -> None:
+        ids = self._index.get(key)
+        if ids is None:
+            return
+        ids.remove(entry_id)
+        if not ids:
+            del self._index[key]
+
+    def _detach(self, entry: Entry) -> Entry:
+        """
+        Copy of the entry without streams or runtime-only metadata, safe to keep in memory.
+        """
+        return Entry(
+            id=entry.id,
+            request=Request(
+                method=entry.request.method,
+                url=entry.request.url,
+                headers=_copy_headers(entry.request.headers),
+                metadata=filter_out_hishel_metadata(entry.request.metadata),
+            ),
+            response=Response(
+                status_code=entry.response.status_code,
+                headers=_copy_headers(entry.response.headers),
+                metadata=filter_out_hishel_metadata(entry.response.metadata),
+            ),
+            meta=replace(entry.meta),
+            cache_key=entry.cache_key,
+            # Parsed once per write instead of on every lookup.
+            extra={**entry.extra, FRESHNESS_KEY: get_freshness(entry.response)},
+        )
+
+    def _attach(self, entry: Entry, body: bytes) -> Entry:
+        """
+        Copy of a stored entry with a fresh response stream, safe to hand out to callers.
+        """
+        return replace(
+            entry,
+            request=replace(
+                entry.request, headers=_copy_headers(entry.request.headers), metadata=dict(entry.request.metadata)
+            ),
+            response=replace(
+                entry.response,
+                headers=_copy_headers(entry.response.headers),
+                metadata=dict(entry.response.metadata),
+                stream=make_async_iterator([body]),
+            ),
+            meta=replace(entry.meta),
+        )
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import time
 import uuid
 import warnings
+from collections import OrderedDict
 from dataclasses import replace
 from pathlib import Path
 from typing import (
@@ -16,7 +18,10 @@ from typing import (
     Union,
 )
 
+from hishel._core._spec import get_variant_key, normalize_vary
 from hishel._core._storages._async_base import AsyncBaseStorage
+from hishel._core._storages._bloom import BloomFilter
+from hishel._core._storages._codecs import BODY_CODEC_KEY, BodyCodec, BodyCompression, decompress_async_stream
 from hishel._core._storages._packing import pack, unpack
 from hishel._core.models import (
     Entry,
@@ -24,7 +29,7 @@ from hishel._core.models import (
     Request,
     Response,
 )
-from hishel._utils import ensure_cache_dict
+from hishel._utils import ensure_cache_dict, make_async_iterator, slice_async_stream
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +40,16 @@ BATCH_CLEANUP_INTERVAL = 3600
 BATCH_CLEANUP_START_DELAY = 5 * 60
 # Number of rows to process per chunk when cleaning
 BATCH_CLEANUP_CHUNK_SIZE = 200
+# Number of body chunks fetched per query when reading a cached stream
+STREAM_READ_BATCH_SIZE = 16
+# Default limits for buffering body chunks before they are written in one transaction
+# 1 MB
+STREAM_WRITE_BATCH_SIZE = 1024 * 1024
+STREAM_WRITE_BATCH_CHUNKS = 64
+# Default number of seconds between rebuilds of the key filter from the database
+KEY_FILTER_REFRESH_INTERVAL = 60.0
+# Number of cache keys whose stored Vary sets are remembered for variant lookups
+VARY_SETS_CACHE_SIZE = 1024
 
 
 try:
@@ -43,6 +58,14 @@ try:
 
     class AsyncSqliteStorage(AsyncBaseStorage):
         _COMPLETE_CHUNK_NUMBER = -1
+        # Complete entries stored under a cache key; an inline body, a shared
+        # body or a stream completion marker makes an entry complete.
+        _ENTRIES_QUERY = (
+            "SELECT e.id, e.data, e.body, e.body_hash, e.vary FROM entries e"
+            " LEFT JOIN streams s ON s.entry_id = e.id AND s.chunk_number = ?"
+            " WHERE e.cache_key = ? AND e.deleted_at IS NULL"
+            " AND (e.body IS NOT NULL OR e.body_hash IS NOT NULL OR s.entry_id IS NOT NULL)"
+        )
 
         def __init__(
             self,
@@ -51,6 +74,13 @@ try:
             database_path: Union[str, Path] = "hishel_cache.db",
             default_ttl: Optional[float] = None,
             refresh_ttl_on_access: bool | None = None,
+            write_batch_size: int = STREAM_WRITE_BATCH_SIZE,
+            write_batch_chunks: int = STREAM_WRITE_BATCH_CHUNKS,
+            inline_body_threshold: Optional[int] = None,
+            compression: Optional[BodyCompression] = None,
+            deduplicate_bodies: bool = False,
+            key_filter: Optional[BloomFilter] = None,
+            key_filter_refresh_interval: float = KEY_FILTER_REFRESH_INTERVAL,
         ) -> None:
             if isinstance(refresh_ttl_on_access, bool):
                 warnings.warn("The 'refresh_ttl_on_access' parameter is deprecated and has no effect. ")
@@ -58,6 +88,31 @@ try:
             self.connection = connection
             self.database_path: Path = database_path if isinstance(database_path, Path) else Path(database_path)
             self.default_ttl = default_ttl
+            # Body chunks are buffered until either limit is reached and then
+            # written in a single transaction.
+            self.write_batch_size = write_batch_size
+            self.write_batch_chunks = write_batch_chunks
+            # Bodies smaller than this many bytes are stored in the entries
+            # row itself instead of the streams table. None disables it.
+            self.inline_body_threshold = inline_body_threshold
+            # Decides which bodies are stored compressed. None stores them as received.
+            self.compression = compression
+            # Store identical bodies once, keyed by their SHA-256, and share
+            # them between entries.
+            self.deduplicate_bodies = deduplicate_bodies
+            # Filter over the stored cache keys, built from the database when
+            # the connection is set up and rebuilt by the batch cleanup and by
+            # the first write after `key_filter_refresh_interval` seconds, never
+            # by a lookup. The rebuild drops the keys of removed entries and
+            # picks up keys stored by other processes sharing the database file.
+            self.key_filter = key_filter
+            self.key_filter_refresh_interval = key_filter_refresh_interval
+            self._key_filter_refreshed_at = 0.0
+            # The filter being rebuilt, if any; keys stored meanwhile go into both.
+            self._key_filter_rebuild: Optional[BloomFilter] = None
+            # Cache key -> the normalized Vary sets last seen stored under it,
+            # in least-recently-used order.
+            self._vary_sets: OrderedDict[bytes, tuple[str, ...]] = OrderedDict()
             self.last_cleanup = time.time() - BATCH_CLEANUP_INTERVAL + BATCH_CLEANUP_START_DELAY
             # When this storage instance was created. Used to delay the first cleanup.
             self._start_time = time.time()
@@ -98,6 +153,8 @@ try:
                 if not self._initialized:
                     await self._initialize_database()
                     self._initialized = True
+                    if self.key_filter is not None:
+                        await self._rebuild_key_filter(self.connection)
                 return self.connection
 
         async def _initialize_database(self) -> None:
@@ -122,10 +179,26 @@ try:
                     cache_key BLOB,
                     data BLOB NOT NULL,
                     created_at REAL NOT NULL,
-                    deleted_at REAL
+                    deleted_at REAL,
+                    body BLOB
                 )
             """)
 
+            # Databases created before inline bodies, deduplication or the
+            # variant index existed lack their columns.
+            await cursor.execute("PRAGMA table_info(entries)")
+            columns = [row[1] for row in await cursor.fetchall()]
+            if "body" not in columns:
+                await cursor.execute("ALTER TABLE entries ADD COLUMN body BLOB")
+            if "body_hash" not in columns:
+                await cursor.execute("ALTER TABLE entries ADD COLUMN body_hash BLOB")
+            if "vary" not in columns:
+                # The normalized Vary set (see `normalize_vary`) and variant key
+                # of the stored response; NULL for rows written before they
+                # were indexed, which match every request.
+                await cursor.execute("ALTER TABLE entries ADD COLUMN vary TEXT")
+                await cursor.execute("ALTER TABLE entries ADD COLUMN variant_key BLOB")
+
             # Table for storing response stream chunks only
             await cursor.execute("""
                 CREATE TABLE IF NOT EXISTS streams (
@@ -137,9 +210,28 @@ try:
                 )
             """)
 
+            # Deduplicated bodies, shared by every entry whose body_hash
+            # matches. Chunks are written under the entry ID while the body
+            # is streamed and moved to the hash once it is complete.
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bodies (
+                    hash BLOB PRIMARY KEY,
+                    refcount INTEGER NOT NULL
+                )
+            """)
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS body_chunks (
+                    body_id BLOB NOT NULL,
+                    chunk_number INTEGER NOT NULL,
+                    chunk_data BLOB NOT NULL,
+                    PRIMARY KEY (body_id, chunk_number)
+                )
+            """)
+
             # Indexes for performance
             await cursor.execute("CREATE INDEX IF NOT EXISTS idx_entries_deleted_at ON entries(deleted_at)")
             await cursor.execute("CREATE INDEX IF NOT EXISTS idx_entries_cache_key ON entries(cache_key)")
+            await cursor.execute("CREATE INDEX IF NOT EXISTS idx_entries_variant ON entries(cache_key, variant_key)")
 
             await self.connection.commit()
 
@@ -162,10 +254,12 @@ try:
                 created_at=time.time(),
             )
 
+            codec = self.compression.select(response) if self.compression is not None else None
+
             assert isinstance(response.stream, (AsyncIterator, AsyncIterable))
             response_with_stream = replace(
                 response,
-                stream=self._save_stream(response.stream, pair_id.bytes),
+                stream=self._save_stream(response.stream, pair_id.bytes, codec),
             )
 
             complete_entry = Entry(
@@ -174,19 +268,73 @@ try:
                 response=response_with_stream,
                 meta=pair_meta,
                 cache_key=key_bytes,
+                extra={BODY_CODEC_KEY: codec.name} if codec is not None else {},
             )
 
+            vary = normalize_vary(response.headers.get("vary"))
+
             # Insert the complete entry into the database
             await cursor.execute(
-                "INSERT INTO entries (id, cache_key, data, created_at, deleted_at) VALUES (?, ?, ?, ?, ?)",
-                (pair_id.bytes, key_bytes, pack(complete_entry, kind="pair"), pair_meta.created_at, None),
+                "INSERT INTO entries (id, cache_key, data, created_at, deleted_at, vary, variant_key)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    pair_id.bytes,
+                    key_bytes,
+                    pack(complete_entry, kind="pair"),
+                    pair_meta.created_at,
+                    None,
+                    vary,
+                    get_variant_key(vary, request),
+                ),
             )
             await connection.commit()
+            self._add_to_key_filter(key)
+            if (
+                self.key_filter is not None
+                and time.time() - self._key_filter_refreshed_at >= self.key_filter_refresh_interval
+            ):
+                await self._rebuild_key_filter(connection)
 
             return complete_entry
 
+        def _add_to_key_filter(self, key: str) -> None:
+            if self.key_filter is not None:
+                self.key_filter.add(key)
+            if self._key_filter_rebuild is not None:
+                self._key_filter_rebuild.add(key)
+
+        async def might_have_entries(self, key: str) -> bool:
+            if self.key_filter is None:
+                return True
+            # The filter is first built along with the connection.
+            await self._ensure_connection()
+            return key in self.key_filter
+
+        async def _rebuild_key_filter(self, connection: anysqlite.Connection) -> None:
+            assert self.key_filter is not None
+            if self._key_filter_rebuild is not None:
+                # Already being rebuilt.
+                return
+            refreshed_at = time.time()
+            rebuilt = self._key_filter_rebuild = self.key_filter.empty_copy()
+            try:
+                cursor = await connection.cursor()
+                await cursor.execute("SELECT DISTINCT cache_key FROM entries WHERE deleted_at IS NULL")
+                for (cache_key,) in await cursor.fetchall():
+                    rebuilt.add(cache_key.decode("utf-8"))
+            finally:
+                self._key_filter_rebuild = None
+            self.key_filter.load(rebuilt.to_bytes())
+            self._key_filter_refreshed_at = refreshed_at
+
         async def get_entries(self, key: str) -> List[Entry]:
-            final_pairs: List[Entry] = []
+            return await self._get_entries(key, None)
+
+        async def get_variant_entries(self, key: str, request: Request) -> List[Entry]:
+            return await self._get_entries(key, request)
+
+        async def _get_entries(self, key: str, request: Optional[Request]) -> List[Entry]:
+            final_pairs: List[tuple[Entry, Optional[bytes], Optional[bytes]]] = []
 
             now = time.time()
             if now - self.last_cleanup >= BATCH_CLEANUP_INTERVAL:
@@ -206,50 +354,135 @@ try:
 
             connection = await self._ensure_connection()
             cursor = await connection.cursor()
-            # Query entries directly by cache_key. anysqlite serialises this
-            # cursor's calls against any other concurrent operation on the
-            # connection, so we don't need an application-level lock.
-            await cursor.execute(
-                "SELECT id, data FROM entries WHERE cache_key = ?",
-                (key.encode("utf-8"),),
-            )
+            key_bytes = key.encode("utf-8")
 
-            for row in await cursor.fetchall():
-                pair_data = unpack(row[1], kind="pair")
+            # A single query returns only the entries that are complete (an
+            # inline body, a shared body or a stream completion marker), so a hit costs one
+            # round trip regardless of the number of variants. anysqlite
+            # serialises this cursor's calls against any other concurrent
+            # operation on the connection, so we don't need an
+            # application-level lock.
+            if request is None:
+                await cursor.execute(self._ENTRIES_QUERY, (self._COMPLETE_CHUNK_NUMBER, key_bytes))
+                rows = await cursor.fetchall()
+            else:
+                rows = await self._get_variant_rows(cursor, key_bytes, request)
 
-                if pair_data is None:
-                    continue
+            for row in rows:
+                # Only the head is decoded up front, so rows rejected below
+                # never build their request, response or headers.
+                head = unpack(row[1], kind="head")
 
-                # Skip entries without a response (incomplete)
-                if not await self._is_stream_complete(pair_data.id, cursor=cursor):
+                if head is None:
                     continue
 
                 # Skip expired entries
-                if await self._is_pair_expired(pair_data, cursor=cursor):
+                if self._is_expired(head.created_at, head.ttl):
                     continue
 
                 # Skip soft-deleted entries
-                if self.is_soft_deleted(pair_data):
+                if head.deleted_at is not None and head.deleted_at > 0:
                     continue
 
-                final_pairs.append(pair_data)
+                final_pairs.append((head.to_entry(), row[2], row[3]))
 
             pairs_with_streams: List[Entry] = []
 
             # Only restore response streams from cache
-            for pair in final_pairs:
-                pairs_with_streams.append(
-                    replace(
-                        pair,
-                        response=replace(
-                            pair.response,
-                            stream=self._stream_data_from_cache(pair.id.bytes),
-                        ),
-                    )
-                )
+            for pair, body, body_hash in final_pairs:
+                if body is not None:
+                    stream = make_async_iterator([body])
+                elif body_hash is not None:
+                    stream = self._stream_data_from_cache(body_hash, deduplicated=True)
+                else:
+                    stream = self._stream_data_from_cache(pair.id.bytes)
+                codec_name = pair.extra.get(BODY_CODEC_KEY)
+                if codec_name is not None:
+                    stream = decompress_async_stream(stream, codec_name)
+                pairs_with_streams.append(replace(pair, response=replace(pair.response, stream=stream)))
 
             return pairs_with_streams
 
+        async def _get_variant_rows(self, cursor: anysqlite.Cursor, key_bytes: bytes, request: Request) -> List[Any]:
+            """
+            Select the complete entries under the key that `request` may select.
+
+            Variant keys depend on the Vary sets stored under the key, which are
+            remembered from the previous lookup and checked by the same query.
+            The query is only repeated when they have changed since, so a lookup
+            is normally a single query using the (cache_key, variant_key) index.
+            """
+            varies = self._vary_sets.get(key_bytes, ())
+            while True:
+                variant_keys = [
+                    variant_key for vary in varies if (variant_key := get_variant_key(vary, request)) is not None
+                ]
+                await cursor.execute(
+                    "SELECT NULL, NULL, NULL, NULL, vary FROM"
+                    " (SELECT DISTINCT vary FROM entries WHERE cache_key = ? AND vary IS NOT NULL)"
+                    " UNION ALL "
+                    + self._ENTRIES_QUERY
+                    + f" AND (e.vary IS NULL OR e.variant_key IN ({', '.join('?' * len(variant_keys))}))",
+                    (key_bytes, self._COMPLETE_CHUNK_NUMBER, key_bytes, *variant_keys),
+                )
+                rows = await cursor.fetchall()
+                stored_varies = tuple(sorted(row[4] for row in rows if row[0] is None))
+                self._remember_vary_sets(key_bytes, stored_varies)
+                if stored_varies == varies:
+                    return [row for row in rows if row[0] is not None]
+                varies = stored_varies
+
+        def _remember_vary_sets(self, key_bytes: bytes, varies: tuple[str, ...]) -> None:
+            self._vary_sets[key_bytes] = varies
+            self._vary_sets.move_to_end(key_bytes)
+            if len(self._vary_sets) > VARY_SETS_CACHE_SIZE:
+                self._vary_sets.popitem(last=False)
+
+        async def stream_entry_range(self, entry: Entry, first: int, last: int) -> AsyncIterator[bytes]:
+            """
+            Yield bytes `first` to `last` (inclusive) of the entry's stored body.
+
+            Reading starts at the chunk that holds `first`, found from the chunk
+            sizes without reading chunk data. Compressed bodies can't be seeked
+            into and are read from the beginning.
+            """
+            if entry.extra.get(BODY_CODEC_KEY) is not None:
+                async for chunk in super().stream_entry_range(entry, first, last):
+                    yield chunk
+                return
+
+            connection = await self._ensure_connection()
+            cursor = await connection.cursor()
+            await cursor.execute("SELECT body, body_hash FROM entries WHERE id = ?", (entry.id.bytes,))
+            row = await cursor.fetchone()
+            if row is None:
+                return
+            body, body_hash = row
+            if body is not None:
+                yield body[first : last + 1]
+                return
+
+            body_id, table, column = (
+                (body_hash, "body_chunks", "body_id")
+                if body_hash is not None
+                else (entry.id.bytes, "streams", "entry_id")
+            )
+            # The first chunk whose running total of sizes passes `first`.
+            await cursor.execute(
+                f"SELECT chunk_number, total - size FROM ("
+                f"SELECT chunk_number, length(chunk_data) AS size,"
+                f" SUM(length(chunk_data)) OVER (ORDER BY chunk_number) AS total"
+                f" FROM {table} WHERE {column} = ? AND chunk_number >= 0"
+                f") WHERE total > ? ORDER BY chunk_number LIMIT 1",
+                (body_id, first),
+            )
+            start = await cursor.fetchone()
+            if start is None:
+                return
+            stream = self._stream_data_from_cache(body_id, deduplicated=body_hash is not None, first_chunk=start[0])
+            async for chunk in slice_async_stream(stream, first, last, offset=start[1]):
+                yield chunk
+
         async def update_entry(
             self,
             id: uuid.UUID,
@@ -281,14 +514,24 @@ try:
                 if pair.id != complete_pair.id:
                     raise ValueError("Pair ID mismatch")
 
-                # Single UPDATE setting both columns avoids an extra round trip.
+                # Single UPDATE setting every column avoids extra round trips.
+                # A revalidation may have changed the Vary set.
+                vary = normalize_vary(complete_pair.response.headers.get("vary"))
                 await cursor.execute(
-                    "UPDATE entries SET data = ?, cache_key = ? WHERE id = ?",
-                    (pack(complete_pair, kind="pair"), complete_pair.cache_key, id.bytes),
+                    "UPDATE entries SET data = ?, cache_key = ?, vary = ?, variant_key = ? WHERE id = ?",
+                    (
+                        pack(complete_pair, kind="pair"),
+                        complete_pair.cache_key,
+                        vary,
+                        get_variant_key(vary, complete_pair.request),
+                        id.bytes,
+                    ),
                 )
 
                 await connection.commit()
 
+                self._add_to_key_filter(complete_pair.cache_key.decode("utf-8"))
+
                 return complete_pair
 
         async def refresh_entry_ttl(self, id: uuid.UUID) -> None:
@@ -331,10 +574,12 @@ try:
                 self._initialized = False
 
         async def _is_stream_complete(self, pair_id: uuid.UUID, cursor: anysqlite.Cursor) -> bool:
-            # Check if there's a completion marker (chunk_number = -1) for response stream
+            # Check if the body was stored inline or shared, or there's a
+            # completion marker (chunk_number = -1) for the response stream
             await cursor.execute(
-                "SELECT 1 FROM streams WHERE entry_id = ? AND chunk_number = ? LIMIT 1",
-                (pair_id.bytes, self._COMPLETE_CHUNK_NUMBER),
+                "SELECT 1 FROM entries WHERE id = ? AND (body IS NOT NULL OR body_hash IS NOT NULL)"
+                " UNION ALL SELECT 1 FROM streams WHERE entry_id = ? AND chunk_number = ? LIMIT 1",
+                (pair_id.bytes, pair_id.bytes, self._COMPLETE_CHUNK_NUMBER),
             )
             return await cursor.fetchone() is not None
 
@@ -360,8 +605,10 @@ try:
             """
             Check if the pair is expired.
             """
-            ttl = pair.request.metadata.get("hishel_ttl") or self.default_ttl
-            created_at = pair.meta.created_at
+            return self._is_expired(pair.meta.created_at, pair.request.metadata.get("hishel_ttl"))
+
+        def _is_expired(self, created_at: float, ttl: Optional[float]) -> bool:
+            ttl = ttl or self.default_ttl
             if ttl is None:
                 return False
             return created_at + ttl < time.time()
@@ -423,8 +670,14 @@ try:
             for pair in should_hard_delete:
                 await self._hard_delete_pair(pair, cursor)
 
+            await self._collect_bodies(cursor)
+
             await connection.commit()
 
+            if self.key_filter is not None:
+                # Drop the keys of the entries removed above.
+                await self._rebuild_key_filter(connection)
+
             # Record completion time so we don't immediately re-run on the
             # next get_entries call.
             self.last_cleanup = time.time()
@@ -440,75 +693,207 @@ try:
             Permanently delete the pair from the database.
 
             Stream chunks are removed automatically via ON DELETE CASCADE
-            (foreign_keys pragma is enabled in _initialize_database).
+            (foreign_keys pragma is enabled in _initialize_database). A shared
+            body only loses a reference; _collect_bodies removes it once
+            nothing refers to it.
             """
+            await cursor.execute(
+                "UPDATE bodies SET refcount = refcount - 1 WHERE hash = (SELECT body_hash FROM entries WHERE id = ?)",
+                (pair.id.bytes,),
+            )
             await cursor.execute("DELETE FROM entries WHERE id = ?", (pair.id.bytes,))
 
+        async def _collect_bodies(self, cursor: anysqlite.Cursor) -> None:
+            """
+            Delete shared bodies without references, and chunks left behind
+            by deduplicated streams that never completed.
+            """
+            await cursor.execute(
+                "DELETE FROM body_chunks WHERE body_id IN (SELECT hash FROM bodies WHERE refcount <= 0)"
+            )
+            await cursor.execute("DELETE FROM bodies WHERE refcount <= 0")
+            await cursor.execute(
+                "DELETE FROM body_chunks WHERE body_id NOT IN (SELECT hash FROM bodies)"
+                " AND body_id NOT IN (SELECT id FROM entries)"
+            )
+
         async def _save_stream(
             self,
             stream: AsyncIterator[bytes],
             entry_id: bytes,
+            codec: Optional[BodyCodec] = None,
         ) -> AsyncIterator[bytes]:
             """
             Wrapper around an async iterator that also saves the response data
             to the cache in chunks.
 
-            No locking needed: each INSERT is a single statement and atomic at
-            the SQLite level, anysqlite serialises cursor calls on the
-            connection internally, and only this entry's own writer can be
-            inserting into its (entry_id, chunk_number) key space (a duplicate
-            would be a caller bug, not a race).
+            Chunks are buffered until `write_batch_size` bytes or
+            `write_batch_chunks` chunks are collected and then written with a
+            single commit. The completion marker is committed together with
+            the final batch, so a stream that is aborted halfway never looks
+            complete; its partial rows are removed by the batch cleanup.
+
+            When `inline_body_threshold` is set, nothing is written until the
+            body reaches the threshold; bodies that end below it are stored in
+            the entries row with a single UPDATE.
+
+            With a `codec`, chunks are compressed as they pass through and the
+            compressed output is what gets stored; the caller still receives
+            the chunks as received.
+
+            With `deduplicate_bodies`, chunks go to the body_chunks table
+            under the entry ID instead, and the stored bytes are hashed as
+            they are written. Once the stream ends, the entry either shares an
+            existing body with the same hash or its chunks become that body.
+
+            No locking needed: each batch is committed in one go, anysqlite
+            serialises cursor calls on the connection internally, and only
+            this entry's own writer can be inserting into its (entry_id,
+            chunk_number) key space (a duplicate would be a caller bug, not a
+            race).
             """
+            batch: List[tuple[bytes, int, bytes]] = []
+            batch_size = 0
             chunk_number = 0
+            # Reset to None as soon as the body is too large to be stored inline.
+            inline_threshold = self.inline_body_threshold
+            compressor = codec.compressor() if codec is not None else None
+            hasher = hashlib.sha256() if self.deduplicate_bodies else None
             async for chunk in stream:
+                data = compressor.compress(chunk) if compressor is not None else chunk
+                if not data:
+                    # The compressor is still buffering.
+                    yield chunk
+                    continue
+                if hasher is not None:
+                    hasher.update(data)
+                batch.append((entry_id, chunk_number, data))
+                batch_size += len(data)
+                chunk_number += 1
+                if inline_threshold is not None and batch_size < inline_threshold:
+                    yield chunk
+                    continue
+                inline_threshold = None
+                if batch_size >= self.write_batch_size or len(batch) >= self.write_batch_chunks:
+                    await self._write_stream_batch(batch, deduplicated=hasher is not None)
+                    batch = []
+                    batch_size = 0
+                yield chunk
+
+            if compressor is not None:
+                tail = compressor.flush()
+                if hasher is not None:
+                    hasher.update(tail)
+                batch.append((entry_id, chunk_number, tail))
+                batch_size += len(tail)
+
+            if inline_threshold is not None and batch_size < inline_threshold:
                 connection = await self._ensure_connection()
                 cursor = await connection.cursor()
                 await cursor.execute(
-                    "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)",
-                    (entry_id, chunk_number, chunk),
+                    "UPDATE entries SET body = ? WHERE id = ?",
+                    (b"".join(chunk_data for _, _, chunk_data in batch), entry_id),
                 )
                 await connection.commit()
-                chunk_number += 1
-                yield chunk
+                return
+
+            if hasher is not None:
+                await self._write_stream_batch(batch, deduplicated=True)
+                await self._share_body(entry_id, hasher.digest())
+                return
 
             # Mark end of stream with chunk_number = -1
+            batch.append((entry_id, self._COMPLETE_CHUNK_NUMBER, b""))
+            await self._write_stream_batch(batch)
+
+        async def _write_stream_batch(self, batch: List[tuple[bytes, int, bytes]], deduplicated: bool = False) -> None:
             connection = await self._ensure_connection()
             cursor = await connection.cursor()
-            await cursor.execute(
-                "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)",
-                (entry_id, self._COMPLETE_CHUNK_NUMBER, b""),
+            await cursor.executemany(
+                (
+                    "INSERT INTO body_chunks (body_id, chunk_number, chunk_data) VALUES (?, ?, ?)"
+                    if deduplicated
+                    else "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)"
+                ),
+                batch,
             )
             await connection.commit()
 
+        async def _share_body(self, entry_id: bytes, body_hash: bytes) -> None:
+            """
+            Point the entry at the shared body with `body_hash`.
+
+            If the body is already stored, the chunks just written under the
+            entry ID are dropped; otherwise they become the shared body.
+            """
+            # The bodies row is read and then written, so this must not
+            # interleave with another stream of the same body or a cleanup.
+            async with self._write_lock:
+                connection = await self._ensure_connection()
+                cursor = await connection.cursor()
+                await cursor.execute("UPDATE entries SET body_hash = ? WHERE id = ?", (body_hash, entry_id))
+                if cursor.rowcount == 0:
+                    # The entry was deleted while its body was streamed.
+                    await cursor.execute("DELETE FROM body_chunks WHERE body_id = ?", (entry_id,))
+                else:
+                    await cursor.execute("SELECT 1 FROM bodies WHERE hash = ?", (body_hash,))
+                    if await cursor.fetchone() is not None:
+                        await cursor.execute("UPDATE bodies SET refcount = refcount + 1 WHERE hash = ?", (body_hash,))
+                        await cursor.execute("DELETE FROM body_chunks WHERE body_id = ?", (entry_id,))
+                    else:
+                        await cursor.execute("INSERT INTO bodies (hash, refcount) VALUES (?, 1)", (body_hash,))
+                        await cursor.execute(
+                            "UPDATE body_chunks SET body_id = ? WHERE body_id = ?",
+                            (body_hash, entry_id),
+                        )
+                await connection.commit()
+
         async def _stream_data_from_cache(
             self,
             entry_id: bytes,
+            deduplicated: bool = False,
+            first_chunk: int = 0,
         ) -> AsyncIterator[bytes]:
             """
             Get an async iterator that yields the response stream data from the cache.
 
-            Iteration terminates when no row exists for the next sequential
-            chunk_number (the completion marker lives at chunk_number = -1 and
-            is queried separately by _is_stream_complete, not here).
+            Chunks are fetched STREAM_READ_BATCH_SIZE at a time with a range
+            query over (entry_id, chunk_number), which the primary key serves
+            directly. Iteration terminates at the first missing chunk_number
+            (the completion marker lives at chunk_number = -1 and is never
+            part of the range).
+
+            With `deduplicated`, `entry_id` is the hash of a shared body and
+            its chunks are read from the body_chunks table instead.
 
-            No locking needed: each iteration is a single SELECT, and
-            anysqlite serialises cursor calls on the connection internally.
+            Reading starts at `first_chunk`, which must exist.
+
+            No locking needed: each page is a single SELECT, and anysqlite
+            serialises cursor calls on the connection internally.
             """
-            chunk_number = 0
+            query = (
+                "SELECT chunk_number, chunk_data FROM body_chunks"
+                " WHERE body_id = ? AND chunk_number >= ? ORDER BY chunk_number LIMIT ?"
+                if deduplicated
+                else "SELECT chunk_number, chunk_data FROM streams"
+                " WHERE entry_id = ? AND chunk_number >= ? ORDER BY chunk_number LIMIT ?"
+            )
+            chunk_number = first_chunk
 
             while True:
                 connection = await self._ensure_connection()
                 cursor = await connection.cursor()
-                await cursor.execute(
-                    "SELECT chunk_data FROM streams WHERE entry_id = ? AND chunk_number = ?",
-                    (entry_id, chunk_number),
-                )
-                result = await cursor.fetchone()
+                await cursor.execute(query, (entry_id, chunk_number, STREAM_READ_BATCH_SIZE))
+                rows = await cursor.fetchall()
 
-                if result is None:
+                for row in rows:
+                    if row[0] != chunk_number:
+                        return
+                    yield row[1]
+                    chunk_number += 1
+
+                if len(rows) < STREAM_READ_BATCH_SIZE:
                     break
-                yield result[0]
-                chunk_number += 1
 
 except ImportError as _import_error:
     _original_error = _import_error
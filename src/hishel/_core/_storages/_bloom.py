@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import List
+
+
+class BloomFilter:
+    """
+    A Bloom filter over cache keys, used to skip storage lookups for keys that
+    were never stored.
+
+    `key in filter` is False only when the key was definitely never added, and
+    True with a false positive rate of about `error_rate` once `capacity` keys
+    have been added.
+
+    Bit `i` is the `i % 8`-th most significant bit of byte `i // 8`, which is
+    the layout Redis uses for SETBIT and GETBIT, so the bits can be shared
+    between processes through a Redis string.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal number of bits and hash functions for the capacity and error rate.
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = (bits + 7) // 8 * 8
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(self.size // 8)
+
+    def positions(self, key: str) -> List[int]:
+        """The bits that are set for `key`."""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        # Double hashing: k positions from two independent 64-bit hashes.
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str) -> None:
+        for position in self.positions(key):
+            self._bits[position >> 3] |= 0x80 >> (position & 7)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return all(self._bits[position >> 3] & (0x80 >> (position & 7)) for position in self.positions(key))
+
+    def clear(self) -> None:
+        self._bits = bytearray(self.size // 8)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    def load(self, data: bytes) -> None:
+        """
+        Replace the filter's bits with `data`, as returned by `to_bytes`.
+
+        Shorter data is padded with zeros, since Redis strings only grow as far
+        as the highest bit that was set.
+        """
+        if len(data) > len(self._bits):
+            raise ValueError("Bloom filter data does not match the filter size")
+        self._bits = bytearray(data.ljust(len(self._bits), b"\x00"))
+
+    def empty_copy(self) -> "BloomFilter":
+        """A new, empty filter with the same size and hash functions."""
+        return BloomFilter(self.capacity, self.error_rate)
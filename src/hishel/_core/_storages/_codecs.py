@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import lzma
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Type
+
+from typing_extensions import Protocol
+
+from hishel._core.models import Response
+
+# Key in `Entry.extra` that records the codec a stored body was compressed with.
+BODY_CODEC_KEY = "hishel_body_codec"
+
+DEFAULT_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "image/svg+xml",
+    "+json",
+    "+xml",
+)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes, /) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Decompressor(Protocol):
+    def decompress(self, data: bytes, /) -> bytes: ...
+
+
+class BodyCodec(ABC):
+    """
+    A streaming compression format for stored response bodies.
+
+    The codec's `name` is stored with every entry it compresses, so a codec
+    must be registered with `register_codec` under the same name wherever the
+    entries are read back.
+    """
+
+    name: str
+
+    @abstractmethod
+    def compressor(self) -> Compressor: ...
+
+    @abstractmethod
+    def decompressor(self) -> Decompressor: ...
+
+
+_CODECS: Dict[str, Type[BodyCodec]] = {}
+
+
+def register_codec(codec: Type[BodyCodec]) -> Type[BodyCodec]:
+    """
+    Make a codec available for reading entries by its name.
+
+    Can be used as a class decorator.
+    """
+    _CODECS[codec.name] = codec
+    return codec
+
+
+def get_codec(name: str) -> BodyCodec:
+    try:
+        return _CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown body codec: {name!r}") from None
+
+
+@register_codec
+class ZlibCodec(BodyCodec):
+    name = "zlib"
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compressor(self) -> Compressor:
+        return zlib.compressobj(self.level)
+
+    def decompressor(self) -> Decompressor:
+        return zlib.decompressobj()
+
+
+@register_codec
+class LzmaCodec(BodyCodec):
+    name = "lzma"
+
+    def __init__(self, preset: int = 6) -> None:
+        self.preset = preset
+
+    def compressor(self) -> Compressor:
+        return lzma.LZMACompressor(preset=self.preset)
+
+    def decompressor(self) -> Decompressor:
+        return lzma.LZMADecompressor()
+
+
+@register_codec
+class ZstdCodec(BodyCodec):
+    """Zstandard compression. Requires the `zstandard` package."""
+
+    name = "zstd"
+
+    def __init__(self, level: int = 3) -> None:
+        try:
+            import zstandard  # type: ignore[import-not-found, unused-ignore]
+        except ImportError as error:  # pragma: no cover
+            raise ImportError(
+                "The 'zstandard' library is required to use the `ZstdCodec`. Install it with 'pip install zstandard'."
+            ) from error
+
+        self.level = level
+        self._zstandard: Any = zstandard
+
+    def compressor(self) -> Compressor:
+        return self._zstandard.ZstdCompressor(level=self.level).compressobj()  # type: ignore[no-any-return]
+
+    def decompressor(self) -> Decompressor:
+        return self._zstandard.ZstdDecompressor().decompressobj()  # type: ignore[no-any-return]
+
+
+@dataclass
+class BodyCompression:
+    """
+    Decides which stored response bodies are compressed and with which codec.
+
+    A body is compressed when its Content-Type starts or ends with one of
+    `content_types` (entries starting with "+" match media type suffixes such
+    as `application/problem+json`), it has no Content-Encoding of its own, and
+    its Content-Length, when known, is at least `min_size` bytes.
+    """
+
+    codec: BodyCodec = field(default_factory=ZlibCodec)
+    min_size: int = 1024
+    content_types: Sequence[str] = DEFAULT_COMPRESSIBLE_TYPES
+
+    def select(self, response: Response) -> Optional[BodyCodec]:
+        encoding = response.headers.get("content-encoding")
+        if encoding is not None and encoding.strip().lower() != "identity":
+            return None
+
+        content_length = response.headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) < self.min_size:
+            return None
+
+        content_type = response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        for pattern in self.content_types:
+            if content_type.endswith(pattern) if pattern.startswith("+") else content_type.startswith(pattern):
+                return self.codec
+        return None
+
+
+async def decompress_async_stream(stream: AsyncIterator[bytes], codec_name: str) -> AsyncIterator[bytes]:
+    decompressor = get_codec(codec_name).decompressor()
+    async for chunk in stream:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+
+
+def decompress_sync_stream(stream: Iterator[bytes], codec_name: str) -> Iterator[bytes]:
+    decompressor = get_codec(codec_name).decompressor()
+    for chunk in stream:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
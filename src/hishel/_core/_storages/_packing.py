@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import uuid
-from typing import TYPE_CHECKING, Any, Mapping, Optional, Union, overload
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, List, Mapping, Optional, Union, overload
 
 import msgpack
 from typing_extensions import Literal, cast
 
 from hishel._core._headers import Headers
+from hishel._core._spec import FRESHNESS_KEY, Freshness, get_freshness
+from hishel._core._storages._codecs import BODY_CODEC_KEY
 from hishel._core.models import EntryMeta, Request, Response
 
 
@@ -17,6 +20,89 @@ def filter_out_hishel_metadata(data: Mapping[str, Any]) -> dict[str, Any]:
 if TYPE_CHECKING:
     from hishel import Entry
 
+# Entries written by `pack` start with this byte followed by FORMAT_VERSION.
+# 0xc1 is never used by msgpack, so it can't be confused with the first byte
+# of blobs written before the format was versioned.
+FORMAT_MARKER = 0xC1
+# Bump whenever the layout changes, and keep decoding the older versions:
+# 1: freshness records end at stale_while_revalidate.
+# 2: freshness records also hold stale_if_error and immutable.
+FORMAT_VERSION = 2
+
+# Header names that are stored as their index in this table instead of as a
+# string. Indexes are part of the stored format: only ever append to it.
+HEADER_NAMES = (
+    # Names from the HPACK static table (RFC 7541, Appendix A).
+    "accept-charset",
+    "accept-encoding",
+    "accept-language",
+    "accept-ranges",
+    "accept",
+    "access-control-allow-origin",
+    "age",
+    "allow",
+    "authorization",
+    "cache-control",
+    "content-disposition",
+    "content-encoding",
+    "content-language",
+    "content-length",
+    "content-location",
+    "content-range",
+    "content-type",
+    "cookie",
+    "date",
+    "etag",
+    "expect",
+    "expires",
+    "from",
+    "host",
+    "if-match",
+    "if-modified-since",
+    "if-none-match",
+    "if-range",
+    "if-unmodified-since",
+    "last-modified",
+    "link",
+    "location",
+    "max-forwards",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "range",
+    "referer",
+    "refresh",
+    "retry-after",
+    "server",
+    "set-cookie",
+    "strict-transport-security",
+    "transfer-encoding",
+    "user-agent",
+    "vary",
+    "via",
+    "www-authenticate",
+    # Other names that are common in cached responses.
+    "access-control-allow-credentials",
+    "access-control-allow-headers",
+    "access-control-allow-methods",
+    "access-control-expose-headers",
+    "alt-svc",
+    "connection",
+    "content-security-policy",
+    "cross-origin-opener-policy",
+    "cross-origin-resource-policy",
+    "keep-alive",
+    "pragma",
+    "permissions-policy",
+    "referrer-policy",
+    "report-to",
+    "x-content-type-options",
+    "x-frame-options",
+    "x-xss-protection",
+    "x-cache",
+    "x-request-id",
+)
+_HEADER_INDEXES = {name: index for index, name in enumerate(HEADER_NAMES)}
+
 
 @overload
 def pack(
@@ -46,33 +132,250 @@ def pack(
         return value.bytes
     elif kind == "pair":
         assert isinstance(value, Entry)
-        return cast(
+        # A format marker followed by two levels: the outer array holds the
+        # cheap fields needed to pick an entry, while header dictionaries are
+        # nested as opaque blobs that are only decoded when something reads
+        # them (see `_PackedHeaders`).
+        return bytes((FORMAT_MARKER, FORMAT_VERSION)) + cast(
             bytes,
             msgpack.packb(
-                {
-                    "id": value.id.bytes,
-                    "request": {
-                        "method": value.request.method,
-                        "url": value.request.url,
-                        "headers": value.request.headers._headers,
-                        "extra": filter_out_hishel_metadata(value.request.metadata),
-                    },
-                    "response": {
-                        "status_code": value.response.status_code,
-                        "headers": value.response.headers._headers,
-                        "extra": filter_out_hishel_metadata(value.response.metadata),
-                    },
-                    "meta": {
-                        "created_at": value.meta.created_at,
-                        "deleted_at": value.meta.deleted_at,
-                    },
-                    "cache_key": value.cache_key,
-                }
+                [
+                    value.id.bytes,
+                    value.cache_key,
+                    value.request.method,
+                    value.request.url,
+                    value.meta.created_at,
+                    value.meta.deleted_at,
+                    filter_out_hishel_metadata(value.request.metadata),
+                    value.response.status_code,
+                    filter_out_hishel_metadata(value.response.metadata),
+                    value.response.headers.get("vary"),
+                    _pack_headers(value.request.headers),
+                    _pack_headers(value.response.headers),
+                    value.extra.get(BODY_CODEC_KEY),
+                    _pack_freshness(value),
+                ]
             ),
         )
     assert False, f"Unexpected kind: {kind}"
 
 
+def _pack_headers(headers: Headers) -> bytes:
+    if isinstance(headers, _PackedHeaders) and headers._decoded is None:
+        # Never read since it was loaded, so the stored form is still current.
+        return headers._packed
+    # A flat array of alternating names and values. Known names are stored as
+    # their index in HEADER_NAMES, and single values are stored unwrapped.
+    flat: List[Any] = []
+    for name, values in headers._headers.items():
+        flat.append(_HEADER_INDEXES.get(name, name))
+        flat.append(values[0] if len(values) == 1 else values)
+    return cast(bytes, msgpack.packb(flat))
+
+
+def _pack_freshness(entry: "Entry") -> List[Any]:
+    freshness = entry.extra.get(FRESHNESS_KEY)
+    headers = entry.response.headers
+    if not (isinstance(freshness, Freshness) and isinstance(headers, _PackedHeaders) and headers._decoded is None):
+        # Parsed here, on the write path, so lookups never have to.
+        freshness = get_freshness(entry.response)
+    return [
+        freshness.date,
+        freshness.lifetime_shared,
+        freshness.lifetime_private,
+        freshness.no_cache,
+        freshness.must_revalidate,
+        freshness.stale_while_revalidate,
+        freshness.stale_if_error,
+        freshness.immutable,
+    ]
+
+
+def _unpack_headers(packed: bytes) -> dict[str, list[str]]:
+    data = msgpack.unpackb(packed)
+    headers: dict[str, list[str]] = {}
+    for i in range(0, len(data), 2):
+        name, values = data[i], data[i + 1]
+        headers[HEADER_NAMES[name] if isinstance(name, int) else name] = [values] if isinstance(values, str) else values
+    return headers
+
+
+class _PackedHeaders(Headers):
+    """
+    Headers that keep their packed form and decode it on first access.
+
+    Most candidate entries are rejected before their headers are looked at,
+    so deferring the decode keeps msgpack and `Headers` construction out of
+    the lookup path for everything but the entries that are actually used.
+    """
+
+    def __init__(self, packed: bytes) -> None:
+        self._packed = packed
+        self._decoded: Optional[dict[str, list[str]]] = None
+
+    @property
+    def _headers(self) -> dict[str, list[str]]:
+        if self._decoded is None:
+            self._decoded = _unpack_headers(self._packed)
+        return self._decoded
+
+    @_headers.setter
+    def _headers(self, value: dict[str, list[str]]) -> None:
+        self._decoded = value
+
+
+@dataclass
+class EntryHead:
+    """
+    The part of a packed entry that is needed to decide whether to use it.
+
+    Decoding a head only unpacks the outer msgpack array; no `Request`,
+    `Response` or `Headers` objects are built until `to_entry` is called.
+    """
+
+    id: uuid.UUID
+    cache_key: bytes
+    method: str
+    url: str
+    created_at: float
+    deleted_at: Optional[float]
+    ttl: Optional[float]
+    """The entry's own TTL from the `hishel_ttl` request metadata, if any."""
+    vary: Optional[str]
+    """The value of the stored response's Vary header, if any."""
+    body_codec: Optional[str]
+    """The name of the codec the stored body is compressed with, if any."""
+    freshness: Optional[Freshness]
+    """The freshness record computed when the entry was stored, if any."""
+    _fields: List[Any] = field(repr=False, compare=False)
+
+    def to_entry(self) -> "Entry":
+        from hishel import Entry
+
+        fields = self._fields
+        if isinstance(fields[0], Entry):
+            # Legacy map-based blobs are decoded eagerly.
+            return fields[0]
+
+        extra: dict[str, Any] = {}
+        if self.body_codec is not None:
+            extra[BODY_CODEC_KEY] = self.body_codec
+        if self.freshness is not None:
+            extra[FRESHNESS_KEY] = self.freshness
+
+        return Entry(
+            id=self.id,
+            request=Request(
+                method=self.method,
+                url=self.url,
+                headers=_PackedHeaders(fields[10]),
+                metadata=fields[6],
+                stream=iter([]),
+            ),
+            response=Response(
+                status_code=fields[7],
+                headers=_PackedHeaders(fields[11]),
+                metadata=fields[8],
+                stream=iter([]),
+            ),
+            meta=EntryMeta(created_at=self.created_at, deleted_at=self.deleted_at),
+            cache_key=self.cache_key,
+            extra=extra,
+        )
+
+
+def _unpack_head(value: bytes) -> EntryHead:
+    version = 0
+    if value[0] == FORMAT_MARKER:
+        version = value[1]
+        if not 1 <= version <= FORMAT_VERSION:
+            raise ValueError(f"Unsupported entry format version: {version}")
+        data = msgpack.unpackb(memoryview(value)[2:])
+    else:
+        # Written before the format was versioned, as a map that is decoded eagerly.
+        data = msgpack.unpackb(value)
+        if not isinstance(data, dict):
+            raise ValueError("Unsupported entry format")
+    if isinstance(data, dict):
+        entry = _unpack_legacy_pair(data)
+        return EntryHead(
+            id=entry.id,
+            cache_key=entry.cache_key,
+            method=entry.request.method,
+            url=entry.request.url,
+            created_at=entry.meta.created_at,
+            deleted_at=entry.meta.deleted_at,
+            ttl=entry.request.metadata.get("hishel_ttl"),
+            vary=entry.response.headers.get("vary"),
+            body_codec=None,
+            freshness=None,
+            _fields=[entry],
+        )
+    return EntryHead(
+        id=uuid.UUID(bytes=data[0]),
+        cache_key=data[1],
+        method=data[2],
+        url=data[3],
+        created_at=data[4],
+        deleted_at=data[5],
+        ttl=data[6].get("hishel_ttl"),
+        vary=data[9],
+        # Missing from arrays written before bodies could be compressed.
+        body_codec=data[12] if len(data) > 12 else None,
+        # Missing from arrays written before freshness records were stored.
+        freshness=_unpack_freshness(data[13], version) if len(data) > 13 else None,
+        _fields=data,
+    )
+
+
+def _unpack_freshness(fields: List[Any], version: int) -> Freshness:
+    date, lifetime_shared, lifetime_private, no_cache, must_revalidate, stale_while_revalidate = fields[:6]
+    if version == 1:
+        # Written before these directives were recorded; they are treated as absent.
+        stale_if_error, immutable = None, False
+    else:
+        stale_if_error, immutable = fields[6:8]
+    return Freshness(
+        date=date,
+        lifetime_shared=lifetime_shared,
+        lifetime_private=lifetime_private,
+        no_cache=no_cache,
+        must_revalidate=must_revalidate,
+        stale_while_revalidate=stale_while_revalidate,
+        stale_if_error=stale_if_error,
+        immutable=immutable,
+    )
+
+
+def _unpack_legacy_pair(data: dict[str, Any]) -> "Entry":
+    """Decode an entry written as a msgpack map by older versions."""
+    from hishel import Entry
+
+    return Entry(
+        id=uuid.UUID(bytes=data["id"]),
+        request=Request(
+            method=data["request"]["method"],
+            url=data["request"]["url"],
+            headers=Headers(data["request"]["headers"]),
+            metadata=data["request"]["extra"],
+            stream=iter([]),
+        ),
+        response=(
+            Response(
+                status_code=data["response"]["status_code"],
+                headers=Headers(data["response"]["headers"]),
+                metadata=data["response"]["extra"],
+                stream=iter([]),
+            )
+        ),
+        meta=EntryMeta(
+            created_at=data["meta"]["created_at"],
+            deleted_at=data["meta"]["deleted_at"],
+        ),
+        cache_key=data["cache_key"],
+    )
+
+
 @overload
 def unpack(
     value: bytes,
@@ -81,6 +384,14 @@ def unpack(
 ) -> "Entry": ...
 
 
+@overload
+def unpack(
+    value: bytes,
+    /,
+    kind: Literal["head"],
+) -> EntryHead: ...
+
+
 @overload
 def unpack(
     value: bytes,
@@ -97,6 +408,14 @@ def unpack(
 ) -> Optional["Entry"]: ...
 
 
+@overload
+def unpack(
+    value: Optional[bytes],
+    /,
+    kind: Literal["head"],
+) -> Optional[EntryHead]: ...
+
+
 @overload
 def unpack(
     value: Optional[bytes],
@@ -108,37 +427,14 @@ def unpack(
 def unpack(
     value: Optional[bytes],
     /,
-    kind: Literal["pair", "entry_db_key_index"],
-) -> Union["Entry", uuid.UUID, None]:
-    from hishel import Entry
-
+    kind: Literal["pair", "head", "entry_db_key_index"],
+) -> Union["Entry", EntryHead, uuid.UUID, None]:
     if value is None:
         return None
     if kind == "entry_db_key_index":
         return uuid.UUID(bytes=value)
+    elif kind == "head":
+        return _unpack_head(value)
     elif kind == "pair":
-        data = msgpack.unpackb(value)
-        id = uuid.UUID(bytes=data["id"])
-        return Entry(
-            id=id,
-            request=Request(
-                method=data["request"]["method"],
-                url=data["request"]["url"],
-                headers=Headers(data["request"]["headers"]),
-                metadata=data["request"]["extra"],
-                stream=iter([]),
-            ),
-            response=(
-                Response(
-                    status_code=data["response"]["status_code"],
-                    headers=Headers(data["response"]["headers"]),
-                    metadata=data["response"]["extra"],
-                    stream=iter([]),
-                )
-            ),
-            meta=EntryMeta(
-                created_at=data["meta"]["created_at"],
-                deleted_at=data["meta"]["deleted_at"],
-            ),
-            cache_key=data["cache_key"],
-        )
+        return _unpack_head(value).to_entry()
+    assert False, f"Unexpected kind: {kind}"
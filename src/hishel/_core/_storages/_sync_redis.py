@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import bisect
 import contextlib
+import hashlib
+import struct
 from collections.abc import Iterator, Callable
 from dataclasses import replace
 from time import time
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, cast
 from uuid import UUID, uuid4
 
+from hishel._core._spec import get_variant_key, normalize_vary
 from hishel._core._storages._sync_base import SyncBaseStorage
-from hishel._core._storages._packing import pack, unpack
+from hishel._core._storages._bloom import BloomFilter
+from hishel._core._storages._codecs import BODY_CODEC_KEY, BodyCodec, BodyCompression, decompress_sync_stream
+from hishel._core._storages._packing import EntryHead, pack, unpack
 from hishel._core.models import Entry, EntryMeta, Request, Response
+from hishel._utils import slice_sync_stream
 
 if TYPE_CHECKING:
     from redis import RedisError
@@ -22,6 +29,49 @@ else:
         RedisError = None
         Redis = None
 
+# Number of body chunks fetched per LRANGE when reading a cached stream
+STREAM_READ_BATCH_SIZE = 16
+# Default limits for buffering body chunks before they are flushed with one RPUSH
+# 1 MB
+STREAM_WRITE_BATCH_SIZE = 1024 * 1024
+STREAM_WRITE_BATCH_CHUNKS = 64
+
+# Value of the done marker for bodies stored under the entry's own stream key.
+# Deduplicated bodies store the hash of the shared body instead.
+STREAM_DONE = b"1"
+
+# Uncompressed bodies record the end offset of every stored chunk as a
+# big-endian unsigned 64-bit integer, so range reads can seek without walking the chunks.
+CHUNK_OFFSET = struct.Struct(">Q")
+
+# Default number of seconds between reloads of the shared key filter
+KEY_FILTER_REFRESH_INTERVAL = 60.0
+# Default number of seconds between rebuilds of the shared key filter, which
+# drop the keys of entries that no longer exist
+KEY_FILTER_REBUILD_INTERVAL = 3600.0
+
+# Returns the packed data and done marker of every complete entry in the index
+# sets KEYS, flattened into one list, and removes members whose entry blob no
+# longer exists. ARGV[1] is the key prefix.
+GET_ENTRIES_SCRIPT = """
+local result = {}
+for _, idx_key in ipairs(KEYS) do
+    for _, member in ipairs(redis.call('SMEMBERS', idx_key)) do
+        local data = redis.call('GET', ARGV[1] .. ':entry:' .. member)
+        if not data then
+            redis.call('SREM', idx_key, member)
+        else
+            local done = redis.call('GET', ARGV[1] .. ':stream_done:' .. member)
+            if done then
+                table.insert(result, data)
+                table.insert(result, done)
+            end
+        end
+    end
+end
+return result
+"""
+
 
 class RedisStorage(SyncBaseStorage):
     def __init__(
@@ -31,6 +81,14 @@ class RedisStorage(SyncBaseStorage):
         key_prefix: str = "hishel",
         soft_delete_ttl: int = 180,
         max_stream_size: int | None = 10 * 1024 * 1024,
+        write_batch_size: int = STREAM_WRITE_BATCH_SIZE,
+        write_batch_chunks: int = STREAM_WRITE_BATCH_CHUNKS,
+        use_lua_scripts: bool = False,
+        compression: BodyCompression | None = None,
+        deduplicate_bodies: bool = False,
+        key_filter: BloomFilter | None = None,
+        key_filter_refresh_interval: float = KEY_FILTER_REFRESH_INTERVAL,
+        key_filter_rebuild_interval: float = KEY_FILTER_REBUILD_INTERVAL,
     ) -> None:
         if Redis is None:
             raise ImportError(
@@ -43,6 +101,23 @@ class RedisStorage(SyncBaseStorage):
         self._key_prefix = key_prefix
         self._soft_delete_ttl = soft_delete_ttl
         self._max_stream_size = max_stream_size
+        self._write_batch_size = write_batch_size
+        self._write_batch_chunks = write_batch_chunks
+        # The script touches keys derived from the index members, which are not
+        # declared up front, so this mode is meant for non-clustered Redis.
+        self._get_entries_script = client.register_script(GET_ENTRIES_SCRIPT) if use_lua_scripts else None
+        self._compression = compression
+        self._deduplicate_bodies = deduplicate_bodies
+        # The filter's bits are shared by every process through a Redis string
+        # and reloaded from it every `key_filter_refresh_interval` seconds.
+        # Rebuilds scan the whole keyspace, so they run on the write path.
+        self._key_filter = key_filter
+        self._key_filter_refresh_interval = key_filter_refresh_interval
+        self._key_filter_rebuild_interval = key_filter_rebuild_interval
+        self._key_filter_refreshed_at = 0.0
+        self._key_filter_rebuild_checked_at = 0.0
+        # False until the shared bits have been loaded at least once.
+        self._key_filter_loaded = False
 
     def _effective_ttl(self, request: Request) -> int | float:
         """Determine the effective TTL for a request, prioritizing request-specific metadata over the default TTL."""
@@ -63,10 +138,12 @@ class RedisStorage(SyncBaseStorage):
         key_bytes = key.encode()
         safe_ttl_ms = self._safe_ttl_ms(request)
 
+        codec = self._compression.select(response) if self._compression is not None else None
+
         assert isinstance(response.stream, Iterator), "Response stream must be an Iterator"
         response_with_stream = replace(
             response,
-            stream=self._save_stream(response.stream, pair_id, safe_ttl_ms),
+            stream=self._save_stream(response.stream, pair_id, safe_ttl_ms, codec),
         )
 
         entry = Entry(
@@ -75,27 +152,168 @@ class RedisStorage(SyncBaseStorage):
             response=response_with_stream,
             meta=EntryMeta(created_at=time()),
             cache_key=key_bytes,
+            extra={BODY_CODEC_KEY: codec.name} if codec is not None else {},
         )
 
         packed = pack(entry, kind="pair")
         entry_key = f"{self._key_prefix}:entry:{pair_id.hex}"
         idx_key = f"{self._key_prefix}:idx:{key}"
 
+        if (
+            self._key_filter is not None
+            and time() - self._key_filter_rebuild_checked_at >= self._key_filter_refresh_interval
+        ):
+            # Before the key is added below, so a missing filter isn't
+            # recreated holding just this key.
+            with contextlib.suppress(RedisError):
+                self._maybe_rebuild_key_filter()
+
         with self._client.pipeline(transaction=True) as pipe:
             pipe.set(entry_key, packed, px=safe_ttl_ms)
             pipe.sadd(idx_key, pair_id.hex)
             pipe.pexpire(idx_key, safe_ttl_ms)
+            self._add_to_variant_index(pipe, entry, safe_ttl_ms)
+            self._add_to_key_filter(pipe, key)
             pipe.execute()
 
         return entry
 
-    def _save_stream(self, stream: Iterator[bytes], pair_id: UUID, safe_ttl_ms: int) -> Iterator[bytes]:
+    def _varies_key(self, key: str) -> str:
+        return f"{self._key_prefix}:varies:{key}"
+
+    def _variant_idx_key(self, key: str, variant_key: bytes) -> str:
+        return f"{self._key_prefix}:vidx:{key}:{variant_key.hex()}"
+
+    def _variant_of(self, entry: Entry) -> tuple[str, bytes | None]:
+        """
+        The normalized Vary set and variant key of a stored entry.
+        """
+        vary = normalize_vary(entry.response.headers.get("vary"))
+        return vary, get_variant_key(vary, entry.request)
+
+    def _add_to_variant_index(self, pipe: Any, entry: Entry, ttl_ms: int) -> None:
+        """
+        Record the entry's Vary set under its cache key and its ID under its
+        variant key, so `get_variant_entries` can read only matching variants.
+        """
+        key = entry.cache_key.decode()
+        vary, variant_key = self._variant_of(entry)
+        pipe.sadd(self._varies_key(key), vary)
+        pipe.pexpire(self._varies_key(key), ttl_ms)
+        if variant_key is not None:
+            variant_idx_key = self._variant_idx_key(key, variant_key)
+            pipe.sadd(variant_idx_key, entry.id.hex)
+            pipe.pexpire(variant_idx_key, ttl_ms)
+
+    def _remove_from_variant_index(self, pipe: Any, entry: Entry) -> None:
+        # The Vary set stays recorded; a set without matching entries only
+        # costs an empty SMEMBERS until the key expires.
+        _, variant_key = self._variant_of(entry)
+        if variant_key is not None:
+            pipe.srem(self._variant_idx_key(entry.cache_key.decode(), variant_key), entry.id.hex)
+
+    def _add_to_key_filter(self, pipe: Any, key: str) -> None:
+        if self._key_filter is None:
+            return
+        self._key_filter.add(key)
+        for position in self._key_filter.positions(key):
+            pipe.setbit(self._key_filter_key(), position, 1)
+
+    def _key_filter_key(self) -> str:
+        # Filters of different sizes hash keys differently, so each size gets its own bits.
+        assert self._key_filter is not None
+        return f"{self._key_prefix}:key_filter:{self._key_filter.size}:{self._key_filter.hash_count}"
+
+    def might_have_entries(self, key: str) -> bool:
+        if self._key_filter is None:
+            return True
+        if time() - self._key_filter_refreshed_at >= self._key_filter_refresh_interval:
+            try:
+                self._load_key_filter()
+            except RedisError:
+                # Without an up-to-date filter, fall back to looking the key up.
+                return True
+        if not self._key_filter_loaded:
+            # Not built yet; the next write builds it.
+            return True
+        return key in self._key_filter
+
+    def _load_key_filter(self) -> None:
+        """
+        Load the shared filter bits, if they exist.
+        """
+        assert self._key_filter is not None
+        data = self._client.get(self._key_filter_key())
+        self._key_filter_refreshed_at = time()
+        if data is not None:
+            self._key_filter.load(cast(bytes, data))
+            self._key_filter_loaded = True
+
+    def _maybe_rebuild_key_filter(self) -> None:
+        """
+        Rebuild the shared filter bits from the stored index keys if they are
+        missing or due for a rebuild, and load them.
+
+        One process rebuilds at a time, guarded by a key that expires after
+        `key_filter_rebuild_interval` seconds. Keys stored while a rebuild is
+        scanning may be missed; their next cache miss stores and adds them again.
+        """
+        assert self._key_filter is not None
+        self._key_filter_rebuild_checked_at = time()
+        filter_key = self._key_filter_key()
+        rebuild_due = self._client.set(
+            f"{filter_key}:rebuilt",
+            b"1",
+            nx=True,
+            px=int(self._key_filter_rebuild_interval * 1000),
+        )
+        if not rebuild_due and self._client.exists(filter_key):
+            return
+        rebuilt = self._key_filter.empty_copy()
+        idx_prefix = f"{self._key_prefix}:idx:"
+        for idx_key in self._client.scan_iter(match=f"{idx_prefix}*", count=1000):
+            name = idx_key.decode() if isinstance(idx_key, bytes) else idx_key
+            rebuilt.add(name[len(idx_prefix) :])
+        data = rebuilt.to_bytes()
+        self._client.set(filter_key, data)
+        self._key_filter.load(data)
+        self._key_filter_loaded = True
+        self._key_filter_refreshed_at = time()
+
+    def _save_stream(
+        self,
+        stream: Iterator[bytes],
+        pair_id: UUID,
+        safe_ttl_ms: int,
+        codec: BodyCodec | None = None,
+    ) -> Iterator[bytes]:
+        """
+        Wrapper around an async iterator that also saves the response data to Redis.
+
+        Chunks are buffered until `write_batch_size` bytes or `write_batch_chunks`
+        chunks are collected and then appended with a single RPUSH. The last batch,
+        the sentinel, the done marker and the expiries are written in one MULTI.
+
+        With a `codec`, the compressed output is stored instead of the chunks;
+        `max_stream_size` still applies to the body as received.
+
+        With `deduplicate_bodies`, the stored bytes are hashed as they are
+        written and the finished list is shared under the hash (see
+        `_share_body`); the done marker then holds the hash.
+        """
         stream_key = f"{self._key_prefix}:stream:{pair_id.hex}"
         done_key = f"{self._key_prefix}:stream_done:{pair_id.hex}"
+        offsets_key = self._offsets_key(stream_key)
         completed = False
         aborted = False
-        ttl_set = False
         total_size = 0
+        batch: list[bytes] = []
+        batch_size = 0
+        compressor = codec.compressor() if codec is not None else None
+        hasher = hashlib.sha256() if self._deduplicate_bodies else None
+        # End offsets of the chunks stored so far and of those in `batch`.
+        stored_size = 0
+        offsets = bytearray()
 
         try:
             for chunk in stream:
@@ -103,24 +321,54 @@ class RedisStorage(SyncBaseStorage):
                     total_size += len(chunk)
                     if self._max_stream_size is not None and total_size > self._max_stream_size:
                         aborted = True
+                        batch = []
                         with contextlib.suppress(RedisError):
-                            self._client.delete(stream_key, done_key)
+                            self._client.delete(stream_key, done_key, offsets_key)
                     else:
-                        self._client.rpush(stream_key, chunk)
-                        if not ttl_set:
-                            # Set a TTL immediately after the first write so the key
-                            # can't outlive the process if we die mid-stream (SIGKILL,
-                            # OOM, host failure) before reaching the cleanup block.
-                            self._client.pexpire(stream_key, safe_ttl_ms)
-                            ttl_set = True
+                        data = compressor.compress(chunk) if compressor is not None else chunk
+                        if data:
+                            batch.append(data)
+                            batch_size += len(data)
+                            if hasher is not None:
+                                hasher.update(data)
+                            if compressor is None:
+                                stored_size += len(data)
+                                offsets += CHUNK_OFFSET.pack(stored_size)
+                        if batch_size >= self._write_batch_size or len(batch) >= self._write_batch_chunks:
+                            with self._client.pipeline(transaction=False) as pipe:
+                                pipe.rpush(stream_key, *batch)
+                                # Set the TTL together with every write so the key
+                                # can't outlive the process if we die mid-stream
+                                # (SIGKILL, OOM, host failure) before reaching the
+                                # cleanup block.
+                                pipe.pexpire(stream_key, safe_ttl_ms)
+                                self._append_offsets(pipe, offsets_key, offsets, safe_ttl_ms)
+                                pipe.execute()
+                            batch = []
+                            batch_size = 0
+                            offsets = bytearray()
                 yield chunk
 
-            if not aborted:
-                # sentinel to mark end of stream
-                self._client.rpush(stream_key, b"")
-                self._client.set(done_key, b"1")
-                self._client.pexpire(stream_key, safe_ttl_ms)
-                self._client.pexpire(done_key, safe_ttl_ms)
+            if not aborted and hasher is not None:
+                if compressor is not None:
+                    batch.append(compressor.flush())
+                    hasher.update(batch[-1])
+                with self._client.pipeline(transaction=True) as pipe:
+                    pipe.rpush(stream_key, *batch, b"")
+                    pipe.pexpire(stream_key, safe_ttl_ms)
+                    self._append_offsets(pipe, offsets_key, offsets, safe_ttl_ms)
+                    pipe.execute()
+                self._share_body(stream_key, done_key, hasher.hexdigest(), safe_ttl_ms)
+            elif not aborted:
+                if compressor is not None:
+                    batch.append(compressor.flush())
+                with self._client.pipeline(transaction=True) as pipe:
+                    # remaining chunks followed by the sentinel that marks the end of stream
+                    pipe.rpush(stream_key, *batch, b"")
+                    pipe.set(done_key, STREAM_DONE, px=safe_ttl_ms)
+                    pipe.pexpire(stream_key, safe_ttl_ms)
+                    self._append_offsets(pipe, offsets_key, offsets, safe_ttl_ms)
+                    pipe.execute()
             completed = True
         finally:
             if not completed:
@@ -130,62 +378,212 @@ class RedisStorage(SyncBaseStorage):
                 # Redis errors here — we're already on an error path and don't
                 # want to mask the original exception.
                 with contextlib.suppress(RedisError):
-                    self._client.delete(stream_key, done_key)
+                    self._client.delete(stream_key, done_key, offsets_key)
 
-    def _is_stream_complete(self, entry_id: UUID) -> bool:
-        result = self._client.exists(f"{self._key_prefix}:stream_done:{entry_id.hex}")
-        return bool(result)
+    def _offsets_key(self, list_key: str) -> str:
+        """
+        The key holding the chunk end offsets of the stream or shared body at
+        `list_key`, e.g. `{prefix}:stream_offsets:{id}` for `{prefix}:stream:{id}`.
+        """
+        kind, _, name = list_key[len(self._key_prefix) + 1 :].partition(":")
+        return f"{self._key_prefix}:{kind}_offsets:{name}"
 
-    def _is_pair_expired(self, pair: Entry) -> bool:
-        return pair.meta.created_at + self._effective_ttl(pair.request) < time()
+    def _append_offsets(self, pipe: Any, offsets_key: str, offsets: bytearray, ttl_ms: int) -> None:
+        if offsets:
+            pipe.append(offsets_key, bytes(offsets))
+            pipe.pexpire(offsets_key, ttl_ms)
 
-    def _stream_from_cache(self, entry_id: UUID) -> Iterator[bytes]:
-        stream_key = f"{self._key_prefix}:stream:{entry_id.hex}"
-        length = self._client.llen(stream_key)
-        for i in range(length - 1):  # -1 excludes the sentinel
-            chunk = self._client.lindex(stream_key, i)
-            if chunk is not None:
-                yield chunk.encode() if isinstance(chunk, str) else chunk
+    def _share_body(self, stream_key: str, done_key: str, body_hash: str, safe_ttl_ms: int) -> None:
+        """
+        Make the finished list at `stream_key` available as the shared body `body_hash`.
 
-    def get_entries(self, key: str) -> list[Entry]:
-        idx_key = f"{self._key_prefix}:idx:{key}"
-        members = self._client.smembers(idx_key)
+        If no body with that hash exists, the list is renamed to it. Otherwise
+        the list is dropped and the existing body's TTL is extended to cover
+        this entry, so a shared body lives as long as its longest-lived entry.
+        """
+        body_key = f"{self._key_prefix}:body:{body_hash}"
+        while not self._client.renamenx(stream_key, body_key):
+            with self._client.pipeline(transaction=True) as pipe:
+                pipe.pexpire(body_key, safe_ttl_ms, gt=True)
+                pipe.pexpire(self._offsets_key(body_key), safe_ttl_ms, gt=True)
+                pipe.exists(body_key)
+                _, _, exists = pipe.execute()
+            if exists:
+                self._client.delete(stream_key, self._offsets_key(stream_key))
+                break
+            # The existing body expired between the two calls; retry the rename.
+        else:
+            # The offsets describe the chunks of the list they were written
+            # with, so they move along with it.
+            with contextlib.suppress(RedisError):
+                self._client.rename(self._offsets_key(stream_key), self._offsets_key(body_key))
+
+        self._client.set(done_key, body_hash.encode(), px=safe_ttl_ms)
+
+    def _is_head_expired(self, head: EntryHead) -> bool:
+        ttl = head.ttl if head.ttl is not None else self._default_ttl
+        return head.created_at + ttl < time()
+
+    def _stream_from_cache(self, stream_key: str, first_chunk: int = 0) -> Iterator[bytes]:
+        """
+        Yield the cached body from chunk `first_chunk` on, STREAM_READ_BATCH_SIZE
+        chunks per LRANGE.
 
-        result: list[Entry] = []
-        for member in members:
-            hex_str = member.decode() if isinstance(member, bytes) else member
-            entry_key = f"{self._key_prefix}:entry:{hex_str}"
+        The length and the first page are fetched in the same round trip, so
+        bodies of up to STREAM_READ_BATCH_SIZE chunks cost a single one.
+        """
+        with self._client.pipeline(transaction=False) as pipe:
+            pipe.llen(stream_key)
+            pipe.lrange(stream_key, first_chunk, first_chunk + STREAM_READ_BATCH_SIZE - 1)
+            length, chunks = pipe.execute()
+
+        last = length - 2  # index of the last chunk; the sentinel comes after it
+        start = first_chunk
+        while start <= last:
+            if start > first_chunk:
+                chunks = self._client.lrange(stream_key, start, min(start + STREAM_READ_BATCH_SIZE - 1, last))
+            if not chunks:
+                return
+            for chunk in chunks[: last - start + 1]:
+                yield chunk.encode() if isinstance(chunk, str) else chunk
+            start += STREAM_READ_BATCH_SIZE
 
-            data = self._client.get(entry_key)
+    def _fetch_complete_entries(self, *idx_keys: str) -> list[tuple[bytes, bytes]]:
+        """
+        Return the packed data and done marker of every complete entry in the index sets.
+
+        Index members whose entry blob no longer exists are removed from the sets.
+        """
+        if self._get_entries_script is not None:
+            # One server-side call; nothing can change between reading the
+            # index and reading the entries.
+            replies = self._get_entries_script(keys=list(idx_keys), args=[self._key_prefix])
+            return list(zip(replies[::2], replies[1::2]))
+
+        if len(idx_keys) == 1:
+            members = list(self._client.smembers(idx_keys[0]))
+        else:
+            members = list(self._client.sunion(list(idx_keys)))
+        if not members:
+            return []
+
+        # Fetch every entry blob and its done marker in a single round trip.
+        with self._client.pipeline(transaction=False) as pipe:
+            for member in members:
+                hex_str = member.decode() if isinstance(member, bytes) else member
+                pipe.get(f"{self._key_prefix}:entry:{hex_str}")
+                pipe.get(f"{self._key_prefix}:stream_done:{hex_str}")
+            replies = pipe.execute()
+
+        complete: list[tuple[bytes, bytes]] = []
+        dangling = []
+        for member, data, done in zip(members, replies[::2], replies[1::2]):
             if data is None:
-                self._client.srem(idx_key, member)
-                continue
+                dangling.append(member)
+            elif done is not None:
+                complete.append((data, done))
 
-            entry = unpack(data, kind="pair")
-            if entry is None:
-                continue
+        if dangling:
+            with self._client.pipeline(transaction=False) as pipe:
+                for idx_key in idx_keys:
+                    pipe.srem(idx_key, *dangling)
+                pipe.execute()
+
+        return complete
+
+    def get_entries(self, key: str) -> list[Entry]:
+        return self._to_entries(self._fetch_complete_entries(f"{self._key_prefix}:idx:{key}"))
+
+    def get_variant_entries(self, key: str, request: Request) -> list[Entry]:
+        """
+        Get the entries stored under `key` that `request` may select.
 
-            if not self._is_stream_complete(entry.id):
+        The Vary sets recorded for the key give the request's variant keys, and
+        only the entries indexed under those are read. Keys without recorded
+        Vary sets (entries stored before the variant index) fall back to
+        `get_entries`; once a key has an indexed entry, older unindexed ones
+        are no longer selected and simply expire.
+        """
+        varies = self._client.smembers(self._varies_key(key))
+        if not varies:
+            return self.get_entries(key)
+
+        variant_idx_keys = []
+        for vary in varies:
+            variant_key = get_variant_key(vary.decode() if isinstance(vary, bytes) else vary, request)
+            if variant_key is not None:
+                variant_idx_keys.append(self._variant_idx_key(key, variant_key))
+        if not variant_idx_keys:
+            return []
+        return self._to_entries(self._fetch_complete_entries(*variant_idx_keys))
+
+    def _to_entries(self, fetched: list[tuple[bytes, bytes]]) -> list[Entry]:
+        """
+        Build the entries for packed data and done markers, skipping expired
+        and soft-deleted ones.
+        """
+        result: list[Entry] = []
+        for data, done in fetched:
+            # Only the head is decoded up front, so entries rejected below
+            # never build their request, response or headers.
+            head = unpack(data, kind="head")
+            if head is None:
                 continue
 
-            if self._is_pair_expired(entry):
+            soft_deleted = head.deleted_at is not None and head.deleted_at > 0
+            if self._is_head_expired(head):
                 # Logically expired but still present in Redis: soft-delete it now.
-                if not self.is_soft_deleted(entry):
-                    self.remove_entry(entry.id)
+                if not soft_deleted:
+                    self.remove_entry(head.id)
                 continue
 
-            if self.is_soft_deleted(entry):
+            if soft_deleted:
                 continue
 
-            result.append(
-                replace(
-                    entry,
-                    response=replace(entry.response, stream=self._stream_from_cache(entry.id)),
-                )
-            )
+            entry = head.to_entry()
+            if done == STREAM_DONE:
+                stream = self._stream_from_cache(f"{self._key_prefix}:stream:{entry.id.hex}")
+            else:
+                stream = self._stream_from_cache(f"{self._key_prefix}:body:{done.decode()}")
+            if head.body_codec is not None:
+                stream = decompress_sync_stream(stream, head.body_codec)
+            result.append(replace(entry, response=replace(entry.response, stream=stream)))
 
         return result
 
+    def stream_entry_range(self, entry: Entry, first: int, last: int) -> Iterator[bytes]:
+        """
+        Yield bytes `first` to `last` (inclusive) of the entry's stored body.
+
+        Reading starts at the chunk that holds `first`, found from the chunk
+        offsets recorded at write time. Compressed bodies, and bodies stored
+        without offsets, are read from the beginning.
+        """
+        if entry.extra.get(BODY_CODEC_KEY) is not None:
+            for chunk in super().stream_entry_range(entry, first, last):
+                yield chunk
+            return
+
+        done = cast("bytes | None", self._client.get(f"{self._key_prefix}:stream_done:{entry.id.hex}"))
+        if done is None:
+            return
+        if done == STREAM_DONE:
+            stream_key = f"{self._key_prefix}:stream:{entry.id.hex}"
+        else:
+            stream_key = f"{self._key_prefix}:body:{done.decode()}"
+
+        first_chunk, offset = 0, 0
+        packed = cast("bytes | None", self._client.get(self._offsets_key(stream_key)))
+        if packed:
+            ends = [end for (end,) in CHUNK_OFFSET.iter_unpack(packed)]
+            first_chunk = bisect.bisect_right(ends, first)
+            if first_chunk == len(ends):
+                return
+            offset = ends[first_chunk - 1] if first_chunk else 0
+
+        for chunk in slice_sync_stream(self._stream_from_cache(stream_key, first_chunk), first, last, offset):
+            yield chunk
+
     def update_entry(
         self,
         id: UUID,  # noqa: A002
@@ -219,6 +617,17 @@ class RedisStorage(SyncBaseStorage):
             new_key = updated.cache_key.decode() if isinstance(updated.cache_key, bytes) else updated.cache_key
             self._client.srem(f"{self._key_prefix}:idx:{old_key}", id.hex)
             self._client.sadd(f"{self._key_prefix}:idx:{new_key}", id.hex)
+            if self._key_filter is not None:
+                with self._client.pipeline(transaction=False) as pipe:
+                    self._add_to_key_filter(pipe, new_key)
+                    pipe.execute()
+
+        if existing.cache_key != updated.cache_key or self._variant_of(existing) != self._variant_of(updated):
+            # A revalidation may have changed the Vary set.
+            with self._client.pipeline(transaction=False) as pipe:
+                self._remove_from_variant_index(pipe, existing)
+                self._add_to_variant_index(pipe, updated, self._safe_ttl_ms(updated.request))
+                pipe.execute()
 
         return updated
 
@@ -240,8 +649,21 @@ class RedisStorage(SyncBaseStorage):
 
         self._client.pexpire(entry_key, safe_ttl_ms)
         self._client.pexpire(stream_key, safe_ttl_ms)
+        self._client.pexpire(self._offsets_key(stream_key), safe_ttl_ms)
         self._client.pexpire(done_key, safe_ttl_ms)
         self._client.pexpire(idx_key, safe_ttl_ms)
+        with self._client.pipeline(transaction=False) as pipe:
+            self._add_to_variant_index(pipe, entry, safe_ttl_ms)
+            pipe.execute()
+
+        done = self._client.get(done_key)
+        if done is not None and done != STREAM_DONE:
+            # A shared body must outlive every entry that refers to it, so
+            # only ever extend its TTL.
+            body_hash = done.decode() if isinstance(done, bytes) else done
+            body_key = f"{self._key_prefix}:body:{body_hash}"
+            self._client.pexpire(body_key, safe_ttl_ms, gt=True)
+            self._client.pexpire(self._offsets_key(body_key), safe_ttl_ms, gt=True)
 
     def remove_entry(self, id: UUID) -> None:  # noqa: A002
         entry_key = f"{self._key_prefix}:entry:{id.hex}"
@@ -260,9 +682,13 @@ class RedisStorage(SyncBaseStorage):
             # behind with a short TTL so any in-flight stream reader can
             # finish; Redis reclaims the keys when soft_delete_ttl elapses.
             idx_key = f"{self._key_prefix}:idx:{entry.cache_key.decode()}"
-            self._client.srem(idx_key, id.hex)
+            with self._client.pipeline(transaction=False) as pipe:
+                pipe.srem(idx_key, id.hex)
+                self._remove_from_variant_index(pipe, entry)
+                pipe.execute()
             self._client.expire(entry_key, self._soft_delete_ttl)
             self._client.expire(stream_key, self._soft_delete_ttl)
+            self._client.expire(self._offsets_key(stream_key), self._soft_delete_ttl)
             self._client.expire(done_key, self._soft_delete_ttl)
 
     def close(self) -> None:
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import threading
 import time
 import uuid
 import warnings
+from collections import OrderedDict
 from dataclasses import replace
 from pathlib import Path
 from typing import (
@@ -17,7 +19,15 @@ from typing import (
     Union,
 )
 
+from hishel._core._spec import get_variant_key, normalize_vary
+from hishel._core._storages._bloom import BloomFilter
 from hishel._core._storages._sync_base import SyncBaseStorage
+from hishel._core._storages._codecs import (
+    BODY_CODEC_KEY,
+    BodyCodec,
+    BodyCompression,
+    decompress_sync_stream,
+)
 from hishel._core._storages._packing import pack, unpack
 from hishel._core.models import (
     Entry,
@@ -25,7 +35,7 @@ from hishel._core.models import (
     Request,
     Response,
 )
-from hishel._utils import ensure_cache_dict
+from hishel._utils import ensure_cache_dict, make_sync_iterator, slice_sync_stream
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +46,16 @@ BATCH_CLEANUP_INTERVAL = 3600
 BATCH_CLEANUP_START_DELAY = 5 * 60
 # Number of rows to process per chunk when cleaning
 BATCH_CLEANUP_CHUNK_SIZE = 200
+# Number of body chunks fetched per query when reading a cached stream
+STREAM_READ_BATCH_SIZE = 16
+# Default limits for buffering body chunks before they are written in one transaction
+# 1 MB
+STREAM_WRITE_BATCH_SIZE = 1024 * 1024
+STREAM_WRITE_BATCH_CHUNKS = 64
+# Default number of seconds between rebuilds of the key filter from the database
+KEY_FILTER_REFRESH_INTERVAL = 60.0
+# Number of cache keys whose stored Vary sets are remembered for variant lookups
+VARY_SETS_CACHE_SIZE = 1024
 
 
 def _connection_is_cross_thread_safe(connection: "sqlite3.Connection") -> bool:
@@ -71,6 +91,15 @@ try:
 
     class SyncSqliteStorage(SyncBaseStorage):
         _COMPLETE_CHUNK_NUMBER = -1
+        # Complete entries stored under a cache key; an inline body, a shared
+        # body or a stream completion marker makes an entry complete.
+        _ENTRIES_QUERY = (
+            "SELECT e.id, e.data, e.body, e.body_hash, e.vary FROM entries e"
+            " LEFT JOIN streams s ON s.entry_id = e.id AND s.chunk_number = ?"
+            " WHERE e.cache_key = ? AND e.deleted_at IS NULL"
+            " AND (e.body IS NOT NULL OR e.body_hash IS NOT NULL"
+            " OR s.entry_id IS NOT NULL)"
+        )
 
         def __init__(
             self,
@@ -79,6 +108,13 @@ try:
             database_path: Union[str, Path] = "hishel_cache.db",
             default_ttl: Optional[float] = None,
             refresh_ttl_on_access: bool | None = None,
+            write_batch_size: int = STREAM_WRITE_BATCH_SIZE,
+            write_batch_chunks: int = STREAM_WRITE_BATCH_CHUNKS,
+            inline_body_threshold: Optional[int] = None,
+            compression: Optional[BodyCompression] = None,
+            deduplicate_bodies: bool = False,
+            key_filter: Optional[BloomFilter] = None,
+            key_filter_refresh_interval: float = KEY_FILTER_REFRESH_INTERVAL,
         ) -> None:
             if isinstance(refresh_ttl_on_access, bool):
                 warnings.warn(
@@ -114,6 +150,30 @@ try:
                 database_path if isinstance(database_path, Path) else Path(database_path)
             )
             self.default_ttl = default_ttl
+            # Body chunks are buffered until either limit is reached and then
+            # written in a single transaction.
+            self.write_batch_size = write_batch_size
+            self.write_batch_chunks = write_batch_chunks
+            # Bodies smaller than this many bytes are stored in the entries
+            # row itself instead of the streams table. None disables it.
+            self.inline_body_threshold = inline_body_threshold
+            # Decides which bodies are stored compressed. None stores them as received.
+            self.compression = compression
+            # Store identical bodies once, keyed by their SHA-256, and share
+            # them between entries.
+            self.deduplicate_bodies = deduplicate_bodies
+            # Filter over the stored cache keys, built from the database when
+            # the connection is set up and rebuilt by the batch cleanup and
+            # by the first write after `key_filter_refresh_interval` seconds,
+            # never by a lookup. The rebuild drops the keys of removed entries
+            # and picks up keys stored by other processes sharing the database
+            # file.
+            self.key_filter = key_filter
+            self.key_filter_refresh_interval = key_filter_refresh_interval
+            self._key_filter_refreshed_at = 0.0
+            # Cache key -> the normalized Vary sets last seen stored under it,
+            # in least-recently-used order.
+            self._vary_sets: OrderedDict[bytes, tuple[str, ...]] = OrderedDict()
             self.last_cleanup = (
                 time.time() - BATCH_CLEANUP_INTERVAL + BATCH_CLEANUP_START_DELAY
             )
@@ -161,6 +221,8 @@ try:
             if not self._initialized:
                 self._initialize_database()
                 self._initialized = True
+                if self.key_filter is not None:
+                    self._rebuild_key_filter(self.connection)
             return self.connection
 
         def _initialize_database(self) -> None:
@@ -190,11 +252,27 @@ try:
                     cache_key BLOB,
                     data BLOB NOT NULL,
                     created_at REAL NOT NULL,
-                    deleted_at REAL
+                    deleted_at REAL,
+                    body BLOB
                 )
                 """
             )
 
+            # Databases created before inline bodies, deduplication or the
+            # variant index existed lack their columns.
+            cursor.execute("PRAGMA table_info(entries)")
+            columns = [row[1] for row in cursor.fetchall()]
+            if "body" not in columns:
+                cursor.execute("ALTER TABLE entries ADD COLUMN body BLOB")
+            if "body_hash" not in columns:
+                cursor.execute("ALTER TABLE entries ADD COLUMN body_hash BLOB")
+            if "vary" not in columns:
+                # The normalized Vary set (see `normalize_vary`) and variant
+                # key of the stored response; NULL for rows written before
+                # they were indexed, which match every request.
+                cursor.execute("ALTER TABLE entries ADD COLUMN vary TEXT")
+                cursor.execute("ALTER TABLE entries ADD COLUMN variant_key BLOB")
+
             # Table for storing response stream chunks only
             cursor.execute(
                 """
@@ -208,6 +286,28 @@ try:
                 """
             )
 
+            # Deduplicated bodies, shared by every entry whose body_hash
+            # matches. Chunks are written under the entry ID while the body
+            # is streamed and moved to the hash once it is complete.
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bodies (
+                    hash BLOB PRIMARY KEY,
+                    refcount INTEGER NOT NULL
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS body_chunks (
+                    body_id BLOB NOT NULL,
+                    chunk_number INTEGER NOT NULL,
+                    chunk_data BLOB NOT NULL,
+                    PRIMARY KEY (body_id, chunk_number)
+                )
+                """
+            )
+
             # Indexes for performance
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_entries_deleted_at ON entries(deleted_at)"
@@ -215,6 +315,10 @@ try:
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_entries_cache_key ON entries(cache_key)"
             )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_variant"
+                " ON entries(cache_key, variant_key)"
+            )
 
             self.connection.commit()
 
@@ -232,10 +336,16 @@ try:
             pair_id = id_ if id_ is not None else uuid.uuid4()
             pair_meta = EntryMeta(created_at=time.time())
 
+            codec = (
+                self.compression.select(response)
+                if self.compression is not None
+                else None
+            )
+
             assert isinstance(response.stream, (Iterator, Iterable))
             response_with_stream = replace(
                 response,
-                stream=self._save_stream(response.stream, pair_id.bytes),
+                stream=self._save_stream(response.stream, pair_id.bytes, codec),
             )
 
             complete_entry = Entry(
@@ -244,28 +354,68 @@ try:
                 response=response_with_stream,
                 meta=pair_meta,
                 cache_key=key_bytes,
+                extra={BODY_CODEC_KEY: codec.name} if codec is not None else {},
             )
 
+            vary = normalize_vary(response.headers.get("vary"))
+
             with self._lock:
                 connection = self._ensure_connection()
                 cursor = connection.cursor()
                 cursor.execute(
-                    "INSERT INTO entries (id, cache_key, data, created_at, deleted_at)"
-                    " VALUES (?, ?, ?, ?, ?)",
+                    "INSERT INTO entries"
+                    " (id, cache_key, data, created_at, deleted_at, vary, variant_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
                     (
                         pair_id.bytes,
                         key_bytes,
                         pack(complete_entry, kind="pair"),
                         pair_meta.created_at,
                         None,
+                        vary,
+                        get_variant_key(vary, request),
                     ),
                 )
                 connection.commit()
+                if self.key_filter is not None:
+                    self.key_filter.add(key)
+                    if (
+                        time.time() - self._key_filter_refreshed_at
+                        >= self.key_filter_refresh_interval
+                    ):
+                        self._rebuild_key_filter(connection)
 
             return complete_entry
 
+        def might_have_entries(self, key: str) -> bool:
+            if self.key_filter is None:
+                return True
+            with self._lock:
+                # The filter is first built along with the connection.
+                self._ensure_connection()
+            return key in self.key_filter
+
+        def _rebuild_key_filter(self, connection: sqlite3.Connection) -> None:
+            # Called with the lock held, so no entry can be stored meanwhile.
+            assert self.key_filter is not None
+            rebuilt = self.key_filter.empty_copy()
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT DISTINCT cache_key FROM entries WHERE deleted_at IS NULL"
+            )
+            for (cache_key,) in cursor.fetchall():
+                rebuilt.add(cache_key.decode("utf-8"))
+            self.key_filter.load(rebuilt.to_bytes())
+            self._key_filter_refreshed_at = time.time()
+
         def get_entries(self, key: str) -> List[Entry]:
-            final_pairs: List[Entry] = []
+            return self._get_entries(key, None)
+
+        def get_variant_entries(self, key: str, request: Request) -> List[Entry]:
+            return self._get_entries(key, request)
+
+        def _get_entries(self, key: str, request: Optional[Request]) -> List[Entry]:
+            final_pairs: List[tuple[Entry, Optional[bytes], Optional[bytes]]] = []
 
             with self._lock:
                 if time.time() - self.last_cleanup >= BATCH_CLEANUP_INTERVAL:
@@ -278,49 +428,155 @@ try:
 
                 connection = self._ensure_connection()
                 cursor = connection.cursor()
-                cursor.execute(
-                    "SELECT id, data FROM entries WHERE cache_key = ?",
-                    (key.encode("utf-8"),),
-                )
+                key_bytes = key.encode("utf-8")
 
-                for row in cursor.fetchall():
-                    pair_data = unpack(row[1], kind="pair")
+                # A single query returns only the entries that are complete
+                # (an inline body, a shared body or a stream completion
+                # marker), so a hit costs one round trip regardless of the
+                # number of variants.
+                if request is None:
+                    cursor.execute(
+                        self._ENTRIES_QUERY, (self._COMPLETE_CHUNK_NUMBER, key_bytes)
+                    )
+                    rows = cursor.fetchall()
+                else:
+                    rows = self._get_variant_rows(cursor, key_bytes, request)
 
-                    if pair_data is None:
-                        continue
+                for row in rows:
+                    # Only the head is decoded up front, so rows rejected below
+                    # never build their request, response or headers.
+                    head = unpack(row[1], kind="head")
 
-                    # Skip entries without a complete response stream
-                    if not self._is_stream_complete(pair_data.id, cursor=cursor):
+                    if head is None:
                         continue
 
                     # Skip expired entries
-                    if self._is_pair_expired(pair_data, cursor=cursor):
+                    if self._is_expired(head.created_at, head.ttl):
                         continue
 
                     # Skip soft-deleted entries
-                    if self.is_soft_deleted(pair_data):
+                    if head.deleted_at is not None and head.deleted_at > 0:
                         continue
 
-                    final_pairs.append(pair_data)
+                    final_pairs.append((head.to_entry(), row[2], row[3]))
 
             pairs_with_streams: List[Entry] = []
 
             # Wrap response streams as lazy generators that take the lock
             # per chunk inside _stream_data_from_cache. We deliberately do
             # NOT hold the lock across user iteration of the stream.
-            for pair in final_pairs:
+            for pair, body, body_hash in final_pairs:
+                if body is not None:
+                    stream = make_sync_iterator([body])
+                elif body_hash is not None:
+                    stream = self._stream_data_from_cache(body_hash, deduplicated=True)
+                else:
+                    stream = self._stream_data_from_cache(pair.id.bytes)
+                codec_name = pair.extra.get(BODY_CODEC_KEY)
+                if codec_name is not None:
+                    stream = decompress_sync_stream(stream, codec_name)
                 pairs_with_streams.append(
-                    replace(
-                        pair,
-                        response=replace(
-                            pair.response,
-                            stream=self._stream_data_from_cache(pair.id.bytes),
-                        ),
-                    )
+                    replace(pair, response=replace(pair.response, stream=stream))
                 )
 
             return pairs_with_streams
 
+        def _get_variant_rows(
+            self, cursor: sqlite3.Cursor, key_bytes: bytes, request: Request
+        ) -> List[Any]:
+            """
+            Select the complete entries under the key that `request` may select.
+
+            Variant keys depend on the Vary sets stored under the key, which are
+            remembered from the previous lookup and checked by the same query.
+            The query is only repeated when they have changed since, so a lookup
+            is normally a single query using the (cache_key, variant_key) index.
+
+            Caller must hold self._lock.
+            """
+            varies = self._vary_sets.get(key_bytes, ())
+            while True:
+                variant_keys = [
+                    variant_key
+                    for vary in varies
+                    if (variant_key := get_variant_key(vary, request)) is not None
+                ]
+                placeholders = ", ".join("?" * len(variant_keys))
+                cursor.execute(
+                    "SELECT NULL, NULL, NULL, NULL, vary FROM"
+                    " (SELECT DISTINCT vary FROM entries"
+                    " WHERE cache_key = ? AND vary IS NOT NULL)"
+                    " UNION ALL "
+                    + self._ENTRIES_QUERY
+                    + f" AND (e.vary IS NULL OR e.variant_key IN ({placeholders}))",
+                    (key_bytes, self._COMPLETE_CHUNK_NUMBER, key_bytes, *variant_keys),
+                )
+                rows = cursor.fetchall()
+                stored_varies = tuple(sorted(row[4] for row in rows if row[0] is None))
+                self._remember_vary_sets(key_bytes, stored_varies)
+                if stored_varies == varies:
+                    return [row for row in rows if row[0] is not None]
+                varies = stored_varies
+
+        def _remember_vary_sets(self, key_bytes: bytes, varies: tuple[str, ...]) -> None:
+            self._vary_sets[key_bytes] = varies
+            self._vary_sets.move_to_end(key_bytes)
+            if len(self._vary_sets) > VARY_SETS_CACHE_SIZE:
+                self._vary_sets.popitem(last=False)
+
+        def stream_entry_range(
+            self, entry: Entry, first: int, last: int
+        ) -> Iterator[bytes]:
+            """
+            Yield bytes `first` to `last` (inclusive) of the entry's stored body.
+
+            Reading starts at the chunk that holds `first`, found from the chunk
+            sizes without reading chunk data. Compressed bodies can't be seeked
+            into and are read from the beginning.
+            """
+            if entry.extra.get(BODY_CODEC_KEY) is not None:
+                yield from super().stream_entry_range(entry, first, last)
+                return
+
+            with self._lock:
+                connection = self._ensure_connection()
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT body, body_hash FROM entries WHERE id = ?",
+                    (entry.id.bytes,),
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return
+                body, body_hash = row
+                body_id, table, column = (
+                    (body_hash, "body_chunks", "body_id")
+                    if body_hash is not None
+                    else (entry.id.bytes, "streams", "entry_id")
+                )
+                start = None
+                if body is None:
+                    # The first chunk whose running total of sizes passes `first`.
+                    cursor.execute(
+                        f"SELECT chunk_number, total - size FROM ("
+                        f"SELECT chunk_number, length(chunk_data) AS size,"
+                        f" SUM(length(chunk_data)) OVER (ORDER BY chunk_number) AS total"
+                        f" FROM {table} WHERE {column} = ? AND chunk_number >= 0"
+                        f") WHERE total > ? ORDER BY chunk_number LIMIT 1",
+                        (body_id, first),
+                    )
+                    start = cursor.fetchone()
+
+            if body is not None:
+                yield body[first : last + 1]
+                return
+            if start is None:
+                return
+            stream = self._stream_data_from_cache(
+                body_id, deduplicated=body_hash is not None, first_chunk=start[0]
+            )
+            yield from slice_sync_stream(stream, first, last, offset=start[1])
+
         def update_entry(
             self,
             id: uuid.UUID,
@@ -352,17 +608,25 @@ try:
                 if pair.id != complete_pair.id:
                     raise ValueError("Pair ID mismatch")
 
-                # Single UPDATE setting both columns avoids an extra round trip.
+                # Single UPDATE setting every column avoids extra round trips.
+                # A revalidation may have changed the Vary set.
+                vary = normalize_vary(complete_pair.response.headers.get("vary"))
                 cursor.execute(
-                    "UPDATE entries SET data = ?, cache_key = ? WHERE id = ?",
+                    "UPDATE entries"
+                    " SET data = ?, cache_key = ?, vary = ?, variant_key = ?"
+                    " WHERE id = ?",
                     (
                         pack(complete_pair, kind="pair"),
                         complete_pair.cache_key,
+                        vary,
+                        get_variant_key(vary, complete_pair.request),
                         id.bytes,
                     ),
                 )
 
                 connection.commit()
+                if self.key_filter is not None:
+                    self.key_filter.add(complete_pair.cache_key.decode("utf-8"))
 
                 return complete_pair
 
@@ -402,8 +666,10 @@ try:
         ) -> bool:
             """Caller must hold self._lock."""
             cursor.execute(
-                "SELECT 1 FROM streams WHERE entry_id = ? AND chunk_number = ? LIMIT 1",
-                (pair_id.bytes, self._COMPLETE_CHUNK_NUMBER),
+                "SELECT 1 FROM entries WHERE id = ?"
+                " AND (body IS NOT NULL OR body_hash IS NOT NULL)"
+                " UNION ALL SELECT 1 FROM streams WHERE entry_id = ? AND chunk_number = ? LIMIT 1",
+                (pair_id.bytes, pair_id.bytes, self._COMPLETE_CHUNK_NUMBER),
             )
             return cursor.fetchone() is not None
 
@@ -431,8 +697,10 @@ try:
             """
             Check if the pair is expired.
             """
-            ttl = pair.request.metadata.get("hishel_ttl") or self.default_ttl
-            created_at = pair.meta.created_at
+            return self._is_expired(pair.meta.created_at, pair.request.metadata.get("hishel_ttl"))
+
+        def _is_expired(self, created_at: float, ttl: Optional[float]) -> bool:
+            ttl = ttl or self.default_ttl
             if ttl is None:
                 return False
             return created_at + ttl < time.time()
@@ -496,8 +764,14 @@ try:
             for pair in should_hard_delete:
                 self._hard_delete_pair(pair, cursor)
 
+            self._collect_bodies(cursor)
+
             connection.commit()
 
+            if self.key_filter is not None:
+                # Drop the keys of the entries removed above.
+                self._rebuild_key_filter(connection)
+
             # Record completion time so we don't immediately re-run on the
             # next get_entries call.
             self.last_cleanup = time.time()
@@ -516,78 +790,230 @@ try:
             Permanently delete the pair from the database.
 
             Stream chunks are removed automatically via ON DELETE CASCADE
-            (foreign_keys pragma is enabled in _initialize_database).
+            (foreign_keys pragma is enabled in _initialize_database). A shared
+            body only loses a reference; _collect_bodies removes it once
+            nothing refers to it.
 
             Caller must hold self._lock.
             """
+            cursor.execute(
+                "UPDATE bodies SET refcount = refcount - 1"
+                " WHERE hash = (SELECT body_hash FROM entries WHERE id = ?)",
+                (pair.id.bytes,),
+            )
             cursor.execute("DELETE FROM entries WHERE id = ?", (pair.id.bytes,))
 
+        def _collect_bodies(self, cursor: sqlite3.Cursor) -> None:
+            """
+            Delete shared bodies without references, and chunks left behind
+            by deduplicated streams that never completed.
+
+            Caller must hold self._lock.
+            """
+            cursor.execute(
+                "DELETE FROM body_chunks WHERE body_id IN"
+                " (SELECT hash FROM bodies WHERE refcount <= 0)"
+            )
+            cursor.execute("DELETE FROM bodies WHERE refcount <= 0")
+            cursor.execute(
+                "DELETE FROM body_chunks WHERE body_id NOT IN (SELECT hash FROM bodies)"
+                " AND body_id NOT IN (SELECT id FROM entries)"
+            )
+
         def _save_stream(
             self,
             stream: Iterator[bytes],
             entry_id: bytes,
+            codec: Optional[BodyCodec] = None,
         ) -> Iterator[bytes]:
             """
             Wrapper around an iterator that also saves the response data
             to the cache in chunks.
 
-            Each chunk insert takes self._lock; the lock is released between
-            chunks so user iteration of the stream does not block other DB
+            Chunks are buffered until `write_batch_size` bytes or
+            `write_batch_chunks` chunks are collected and then written with a
+            single commit. The completion marker is committed together with
+            the final batch, so a stream that is aborted halfway never looks
+            complete; its partial rows are removed by the batch cleanup.
+
+            When `inline_body_threshold` is set, nothing is written until the
+            body reaches the threshold; bodies that end below it are stored in
+            the entries row with a single UPDATE.
+
+            With a `codec`, chunks are compressed as they pass through and the
+            compressed output is what gets stored; the caller still receives
+            the chunks as received.
+
+            With `deduplicate_bodies`, chunks go to the body_chunks table
+            under the entry ID instead, and the stored bytes are hashed as
+            they are written. Once the stream ends, the entry either shares an
+            existing body with the same hash or its chunks become that body.
+
+            Each batch write takes self._lock; the lock is released between
+            batches so user iteration of the stream does not block other DB
             operations.
             """
+            batch: List[tuple[bytes, int, bytes]] = []
+            batch_size = 0
             chunk_number = 0
+            # Reset to None as soon as the body is too large to be stored inline.
+            inline_threshold = self.inline_body_threshold
+            compressor = codec.compressor() if codec is not None else None
+            hasher = hashlib.sha256() if self.deduplicate_bodies else None
             for chunk in stream:
+                data = compressor.compress(chunk) if compressor is not None else chunk
+                if not data:
+                    # The compressor is still buffering.
+                    yield chunk
+                    continue
+                if hasher is not None:
+                    hasher.update(data)
+                batch.append((entry_id, chunk_number, data))
+                batch_size += len(data)
+                chunk_number += 1
+                if inline_threshold is not None and batch_size < inline_threshold:
+                    yield chunk
+                    continue
+                inline_threshold = None
+                if (
+                    batch_size >= self.write_batch_size
+                    or len(batch) >= self.write_batch_chunks
+                ):
+                    self._write_stream_batch(batch, deduplicated=hasher is not None)
+                    batch = []
+                    batch_size = 0
+                yield chunk
+
+            if compressor is not None:
+                tail = compressor.flush()
+                if hasher is not None:
+                    hasher.update(tail)
+                batch.append((entry_id, chunk_number, tail))
+                batch_size += len(tail)
+
+            if inline_threshold is not None and batch_size < inline_threshold:
                 with self._lock:
                     connection = self._ensure_connection()
                     cursor = connection.cursor()
                     cursor.execute(
-                        "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)",
-                        (entry_id, chunk_number, chunk),
+                        "UPDATE entries SET body = ? WHERE id = ?",
+                        (b"".join(chunk_data for _, _, chunk_data in batch), entry_id),
                     )
                     connection.commit()
-                chunk_number += 1
-                yield chunk
+                return
+
+            if hasher is not None:
+                self._write_stream_batch(batch, deduplicated=True)
+                self._share_body(entry_id, hasher.digest())
+                return
 
             # Mark end of stream with chunk_number = -1
+            batch.append((entry_id, self._COMPLETE_CHUNK_NUMBER, b""))
+            self._write_stream_batch(batch)
+
+        def _write_stream_batch(
+            self, batch: List[tuple[bytes, int, bytes]], deduplicated: bool = False
+        ) -> None:
+            with self._lock:
+                connection = self._ensure_connection()
+                cursor = connection.cursor()
+                cursor.executemany(
+                    (
+                        "INSERT INTO body_chunks (body_id, chunk_number, chunk_data) VALUES (?, ?, ?)"
+                        if deduplicated
+                        else "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)"
+                    ),
+                    batch,
+                )
+                connection.commit()
+
+        def _share_body(self, entry_id: bytes, body_hash: bytes) -> None:
+            """
+            Point the entry at the shared body with `body_hash`.
+
+            If the body is already stored, the chunks just written under the
+            entry ID are dropped; otherwise they become the shared body.
+            """
             with self._lock:
                 connection = self._ensure_connection()
                 cursor = connection.cursor()
                 cursor.execute(
-                    "INSERT INTO streams (entry_id, chunk_number, chunk_data) VALUES (?, ?, ?)",
-                    (entry_id, self._COMPLETE_CHUNK_NUMBER, b""),
+                    "UPDATE entries SET body_hash = ? WHERE id = ?", (body_hash, entry_id)
                 )
+                if cursor.rowcount == 0:
+                    # The entry was deleted while its body was streamed.
+                    cursor.execute("DELETE FROM body_chunks WHERE body_id = ?", (entry_id,))
+                else:
+                    cursor.execute("SELECT 1 FROM bodies WHERE hash = ?", (body_hash,))
+                    if cursor.fetchone() is not None:
+                        cursor.execute(
+                            "UPDATE bodies SET refcount = refcount + 1 WHERE hash = ?",
+                            (body_hash,),
+                        )
+                        cursor.execute(
+                            "DELETE FROM body_chunks WHERE body_id = ?", (entry_id,)
+                        )
+                    else:
+                        cursor.execute(
+                            "INSERT INTO bodies (hash, refcount) VALUES (?, 1)", (body_hash,)
+                        )
+                        cursor.execute(
+                            "UPDATE body_chunks SET body_id = ? WHERE body_id = ?",
+                            (body_hash, entry_id),
+                        )
                 connection.commit()
 
         def _stream_data_from_cache(
             self,
             entry_id: bytes,
+            deduplicated: bool = False,
+            first_chunk: int = 0,
         ) -> Iterator[bytes]:
             """
             Get an iterator that yields the response stream data from the cache.
 
-            Iteration terminates when no row exists for the next sequential
-            chunk_number (the completion marker lives at chunk_number = -1
-            and is queried separately by _is_stream_complete, not here).
+            Chunks are fetched STREAM_READ_BATCH_SIZE at a time with a range
+            query over (entry_id, chunk_number), which the primary key serves
+            directly. Iteration terminates at the first missing chunk_number
+            (the completion marker lives at chunk_number = -1 and is never
+            part of the range).
+
+            With `deduplicated`, `entry_id` is the hash of a shared body and
+            its chunks are read from the body_chunks table instead.
+
+            Reading starts at `first_chunk`, which must exist.
 
-            Each chunk read takes self._lock; the lock is released between
-            chunks so user iteration does not block other DB operations.
+            Each page takes self._lock; the lock is released between pages
+            so user iteration does not block other DB operations.
             """
-            chunk_number = 0
+            query = (
+                "SELECT chunk_number, chunk_data FROM body_chunks"
+                " WHERE body_id = ? AND chunk_number >= ?"
+                " ORDER BY chunk_number LIMIT ?"
+                if deduplicated
+                else "SELECT chunk_number, chunk_data FROM streams"
+                " WHERE entry_id = ? AND chunk_number >= ?"
+                " ORDER BY chunk_number LIMIT ?"
+            )
+            chunk_number = first_chunk
 
             while True:
                 with self._lock:
                     connection = self._ensure_connection()
                     cursor = connection.cursor()
                     cursor.execute(
-                        "SELECT chunk_data FROM streams WHERE entry_id = ? AND chunk_number = ?",
-                        (entry_id, chunk_number),
+                        query, (entry_id, chunk_number, STREAM_READ_BATCH_SIZE)
                     )
-                    result = cursor.fetchone()
+                    rows = cursor.fetchall()
 
-                if result is None:
+                for row in rows:
+                    if row[0] != chunk_number:
+                        return
+                    yield row[1]
+                    chunk_number += 1
+
+                if len(rows) < STREAM_READ_BATCH_SIZE:
                     break
-                yield result[0]
-                chunk_number += 1
 
 except ImportError as _import_error:
     _original_error = _import_error
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import functools
+import threading
+import uuid
+import weakref
+from dataclasses import replace
+from typing import (
+    Iterator,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from hishel._core._storages._sync_base import SyncBaseStorage
+from hishel._core.models import Entry, Request, Response
+from hishel._utils import notify_sync_stream
+
+
+class SyncTieredStorage(SyncBaseStorage):
+    """
+    Storage that layers a small, fast tier in front of one or more backing tiers.
+
+    Lookups go through the tiers in order (the memory tier first) and merge
+    what they find, so variants held only by a backing tier stay visible.
+    Variant lookups (`get_variant_entries`) stop at the first tier with a
+    matching variant, which lets the memory tier answer them on its own.
+    Entries found in a backing tier are promoted into every tier in front of
+    it while the caller reads the response; range reads are served by the
+    backing tier and leave the promotion to a later full read.
+
+    New entries are written through to every tier with the same ID, so updates,
+    removals and TTL refreshes can be propagated to all of them. Writes are not
+    deferred (write-behind): every tier stores the body during the same pass
+    over the response stream, so there is no backlog to lose on shutdown.
+
+    Args:
+        memory: The fast tier that is checked first, usually an `SyncInMemoryStorage`.
+        backing: The slower tiers, checked in order after the memory tier.
+    """
+
+    def __init__(self, memory: SyncBaseStorage, backing: Sequence[SyncBaseStorage]) -> None:
+        if not backing:
+            raise ValueError("At least one backing storage is required")
+
+        self.memory = memory
+        self.backing = list(backing)
+        self._tiers: List[SyncBaseStorage] = [memory, *self.backing]
+        # IDs of entries whose promotion is still streaming into the front tiers.
+        self._promoting: Set[uuid.UUID] = set()
+        # Response stream of each entry returned from a backing tier -> that
+        # tier and the entry as it returned it, for range reads.
+        self._sources: weakref.WeakKeyDictionary[object, Tuple[SyncBaseStorage, Entry]] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def create_entry(self, request: Request, response: Response, key: str, id_: uuid.UUID | None = None) -> Entry:
+        pair_id = id_ if id_ is not None else uuid.uuid4()
+
+        # Each tier wraps the stream returned by the previous one, so a single
+        # pass over the final stream stores the body in every tier.
+        entry: Optional[Entry] = None
+        for tier in self._tiers:
+            entry = tier.create_entry(request, response, key, id_=pair_id)
+            response = entry.response
+
+        assert entry is not None
+        return entry
+
+    def get_entries(self, key: str) -> List[Entry]:
+        return self._get_from_tiers(key, None)
+
+    def might_have_entries(self, key: str) -> bool:
+        for tier in self._tiers:
+            if tier.might_have_entries(key):
+                return True
+        return False
+
+    def get_variant_entries(self, key: str, request: Request) -> List[Entry]:
+        return self._get_from_tiers(key, request)
+
+    def _get_from_tiers(self, key: str, request: Optional[Request]) -> List[Entry]:
+        found: List[Entry] = []
+        seen: Set[uuid.UUID] = set()
+        for index, tier in enumerate(self._tiers):
+            entries = (tier.get_entries(key) if request is None else tier.get_variant_entries(key, request))
+            for entry in entries:
+                # Entries are written through with the same ID, so a front tier's copy wins.
+                if entry.id in seen:
+                    continue
+                seen.add(entry.id)
+                if index > 0:
+                    promoted = self._maybe_promote(entry, key, self._tiers[:index])
+                    with self._lock:
+                        self._sources[promoted.response.stream] = (tier, entry)
+                    entry = promoted
+                found.append(entry)
+            if found and request is not None:
+                # Every entry found already matches the requested variant.
+                break
+        return found
+
+    def stream_entry_range(self, entry: Entry, first: int, last: int) -> Iterator[bytes]:
+        """
+        Yield bytes `first` to `last` (inclusive) of the entry's body from the
+        tier that holds the complete body.
+
+        A pending promotion needs the whole body, so it is abandoned here and
+        happens on a later full read instead.
+        """
+        with self._lock:
+            source = self._sources.pop(entry.response.stream, None)
+        if source is None:
+            for chunk in self._tiers[0].stream_entry_range(entry, first, last):
+                yield chunk
+            return
+
+        tier, stored = source
+        if entry.response.stream is not stored.response.stream:
+            close = getattr(entry.response.stream, "close", None)
+            if close is not None:
+                close()
+        for chunk in tier.stream_entry_range(stored, first, last):
+            yield chunk
+
+    def update_entry(
+        self,
+        id: uuid.UUID,
+        new_entry: Union[Entry, Callable[[Entry], Entry]],
+    ) -> Optional[Entry]:
+        result: Optional[Entry] = None
+        for tier in self._tiers:
+            updated = tier.update_entry(id, new_entry)
+            if result is None:
+                result = updated
+        return result
+
+    def remove_entry(self, id: uuid.UUID) -> None:
+        for tier in self._tiers:
+            tier.remove_entry(id)
+
+    def refresh_entry_ttl(self, id: uuid.UUID) -> None:
+        for tier in self._tiers:
+            tier.refresh_entry_ttl(id)
+
+    def close(self) -> None:
+        for tier in self._tiers:
+            tier.close()
+
+    def _maybe_promote(self, entry: Entry, key: str, tiers: Sequence[SyncBaseStorage]) -> Entry:
+        """
+        Promote an entry unless an earlier lookup is already promoting it.
+        """
+        with self._lock:
+            if entry.id in self._promoting:
+                return entry
+            self._promoting.add(entry.id)
+        try:
+            promoted = self._promote(entry, key, tiers)
+        except BaseException:
+            self._promoting.discard(entry.id)
+            raise
+        assert isinstance(promoted.response.stream, Iterator)
+        return replace(
+            promoted,
+            response=replace(
+                promoted.response,
+                stream=notify_sync_stream(
+                    promoted.response.stream, functools.partial(self._promoting.discard, entry.id)
+                ),
+            ),
+        )
+
+    def _promote(self, entry: Entry, key: str, tiers: Sequence[SyncBaseStorage]) -> Entry:
+        """
+        Copy an entry found in a slower tier into `tiers`.
+
+        The body is copied lazily: the returned entry's stream stores it in
+        every tier while the caller reads it.
+        """
+        response = entry.response
+        for tier in tiers:
+            promoted = tier.create_entry(entry.request, response, key, id_=entry.id)
+            # Keep the original creation time so the entry doesn't outlive its TTL.
+            tier.update_entry(entry.id, lambda pair: replace(pair, meta=replace(entry.meta)))
+            response = promoted.response
+
+        return replace(entry, response=response)
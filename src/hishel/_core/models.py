@@ -67,6 +67,12 @@ class RequestMetadata(TypedDict, total=False):
     This is useful for caching POST or QUERY requests with different bodies.
     """
 
+    hishel_deadline: float | None
+    """
+    When specified, a revalidation that takes longer than this number of seconds
+    is left running in the background, and a stale stored response is served instead.
+    """
+
 
 def extract_metadata_from_headers(
     headers: Mapping[str, str],
@@ -89,6 +95,11 @@ def extract_metadata_from_headers(
             metadata["hishel_spec_ignore"] = True
         elif value in ("0", "false", "no", "off"):
             metadata["hishel_spec_ignore"] = False
+    if "X-Hishel-Deadline" in headers:
+        try:
+            metadata["hishel_deadline"] = float(headers["X-Hishel-Deadline"])
+        except ValueError:
+            pass
     return metadata
 
 
@@ -117,8 +128,12 @@ class Request:
             async for chunk in self.stream:
                 yield chunk
             return
-        else:
-            raise TypeError("Request stream is not an AsyncIterator")
+        if isinstance(self.stream, (Iterator, Iterable)):
+            # Sync bodies (e.g. a list of chunks) are accepted by async clients too.
+            for chunk in self.stream:
+                yield chunk
+            return
+        raise TypeError("Request stream is not an AsyncIterator or Iterator")
 
     def read(self) -> bytes:
         """
@@ -6,6 +6,7 @@ from dataclasses import dataclass, field
 from typing import Generic
 
 from hishel import Request, Response
+from hishel._cache_keys import CacheKeyBuilder
 from hishel._core._spec import (
     CacheOptions,
 )
@@ -16,9 +17,59 @@ T = t.TypeVar("T", Request, Response)
 
 
 class CachePolicy(abc.ABC):
+    key_builder: CacheKeyBuilder = CacheKeyBuilder()
+    """How cache keys are computed from requests, including URL canonicalization."""
+
     use_body_key: bool = False
     """Whether to include request body in cache key calculation."""
 
+    body_key_spool_size: int = 1024 * 1024
+    """
+    Number of bytes of a request body that are kept in memory while it is hashed
+    for the cache key. Larger bodies spill to a temporary file until they are sent.
+    """
+
+    coalesce_requests: bool = False
+    """
+    Whether concurrent cache misses for the same cache key should be coalesced.
+
+    When enabled, only the first request goes to the origin; the others wait until
+    its response is stored and then serve it from the cache.
+    """
+
+    coalesce_timeout: float | None = 30.0
+    """
+    Maximum number of seconds a coalesced request waits for the leading request
+    before going to the origin on its own. None means wait indefinitely.
+    """
+
+    use_variant_index: bool = False
+    """
+    Whether to look up only the stored variants whose Vary-nominated request
+    headers match the request (see `get_variant_entries`), instead of every
+    entry stored for the URL.
+
+    Non-matching variants are then never used as revalidation candidates, so
+    a request for a variant that isn't stored is a cache miss.
+    """
+
+    remember_uncacheable: bool = False
+    """
+    Whether to remember cache keys whose responses could not be stored because
+    of `no-store`, `private` or missing freshness information.
+
+    For `uncacheable_ttl` seconds after such a response, requests for the same
+    cache key go straight to the origin without looking up the storage. A
+    response that turns out to be storable is stored as usual and makes the
+    key forgotten.
+    """
+
+    uncacheable_ttl: float = 60.0
+    """Number of seconds a cache key is remembered as uncacheable."""
+
+    uncacheable_max_size: int = 1024
+    """Maximum number of cache keys remembered as uncacheable at once."""
+
 
 class BaseFilter(abc.ABC, Generic[T]):
     @abc.abstractmethod
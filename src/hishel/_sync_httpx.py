@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import ssl
 import typing as t
+from types import TracebackType
 from typing import (
     Iterable,
     Iterator,
@@ -67,7 +68,7 @@ def _internal_to_httpx(
         return httpx.Response(
             status_code=value.status_code,
             headers=value.headers,
-            stream=_IteratorStream(value._iter_stream()),
+            stream=_IteratorStream(value._iter_stream(), value.stream),
             extensions=value.metadata,
         )
 
@@ -98,6 +99,7 @@ def _httpx_to_internal(
             hishel_ttl=value.extensions.get("hishel_ttl"),
             hishel_spec_ignore=value.extensions.get("hishel_spec_ignore"),
             hishel_body_key=value.extensions.get("hishel_body_key"),
+            hishel_deadline=value.extensions.get("hishel_deadline"),
         )
         headers_metadata = extract_metadata_from_headers(value.headers)
 
@@ -145,14 +147,25 @@ def _httpx_to_internal(
 
 
 class _IteratorStream(httpx.SyncByteStream, httpx.AsyncByteStream):
-    def __init__(self, iterator: Iterator[bytes] | Iterator[bytes]) -> None:
+    def __init__(
+        self,
+        iterator: Iterator[bytes] | Iterator[bytes],
+        source: object = None,
+    ) -> None:
         self.iterator = iterator
+        # The stream `iterator` reads from, closed with the response even if it was never read.
+        self.source = source
 
     def __iter__(self) -> Iterator[bytes]:
         assert isinstance(self.iterator, (Iterator, Iterable))
         for chunk in self.iterator:
             yield chunk
 
+    def close(self) -> None:
+        close = getattr(self.source, "close", None)
+        if close is not None:
+            close()
+
 
 class SyncCacheTransport(httpx.BaseTransport):
     def __init__(
@@ -178,7 +191,22 @@ class SyncCacheTransport(httpx.BaseTransport):
         response = _internal_to_httpx(internal_response)
         return response
 
+    def __enter__(self) -> "SyncCacheTransport":
+        self._cache_proxy.__enter__()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        # Let background revalidations finish before the storage is closed.
+        self._cache_proxy.__exit__(exc_type, exc_value, traceback)
+        super().__exit__(exc_type, exc_value, traceback)
+
     def close(self) -> None:
+        self._cache_proxy.close()
         self.next_transport.close()
         self.storage.close()
         super().close()
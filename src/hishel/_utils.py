@@ -3,11 +3,14 @@ from __future__ import annotations
 import calendar
 import time
 import typing as tp
+import weakref
 from email.utils import formatdate, parsedate_tz
 from pathlib import Path
 from typing import AsyncIterator, Iterable, Iterator
 
 HEADERS_ENCODING = "iso-8859-1"
+# Size of the chunks a spooled request body is read back in.
+SPOOL_CHUNK_SIZE = 65536
 
 T = tp.TypeVar("T")
 
@@ -85,6 +88,171 @@ def make_sync_iterator(iterable: Iterable[bytes]) -> Iterator[bytes]:
         yield item
 
 
+async def slice_async_stream(
+    stream: AsyncIterator[bytes], first: int, last: int, offset: int = 0
+) -> AsyncIterator[bytes]:
+    """
+    Yield bytes `first` to `last` (inclusive) of a body whose stream starts at byte `offset`.
+    """
+    position = offset
+    async for chunk in stream:
+        end = position + len(chunk)
+        if end > first:
+            yield chunk[max(first - position, 0) : last + 1 - position]
+        position = end
+        if position > last:
+            return
+
+
+def slice_sync_stream(stream: Iterator[bytes], first: int, last: int, offset: int = 0) -> Iterator[bytes]:
+    """
+    Yield bytes `first` to `last` (inclusive) of a body whose stream starts at byte `offset`.
+    """
+    position = offset
+    for chunk in stream:
+        end = position + len(chunk)
+        if end > first:
+            yield chunk[max(first - position, 0) : last + 1 - position]
+        position = end
+        if position > last:
+            return
+
+
+def _spool_on_disk(file: tp.IO[bytes], size: int = 0) -> bool:
+    """
+    Whether `file` is backed by a file on disk, or will be once `size` more
+    bytes are written to it. Only a `SpooledTemporaryFile` can be in memory.
+    """
+    if getattr(file, "_rolled", True):
+        return True
+    max_size: int = getattr(file, "_max_size", 0)
+    return bool(max_size) and file.tell() + size > max_size
+
+
+async def write_async_spool(file: tp.IO[bytes], data: bytes) -> None:
+    """
+    Write `data` to a spooled file, in a worker thread once the file spills
+    to disk, so blocking I/O never runs on the event loop.
+    """
+    if _spool_on_disk(file, len(data)):
+        import anyio
+
+        await anyio.to_thread.run_sync(file.write, data)
+    else:
+        file.write(data)
+
+
+def write_sync_spool(file: tp.IO[bytes], data: bytes) -> None:
+    """
+    Write `data` to a spooled file.
+    """
+    file.write(data)
+
+
+async def spooled_async_stream(file: tp.IO[bytes], chunk_size: int = SPOOL_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Yield a body spooled to `file` from its start, closing the file once it is consumed.
+
+    A file that spilled to disk is read in a worker thread.
+    """
+    try:
+        file.seek(0)
+        if not _spool_on_disk(file):
+            while chunk := file.read(chunk_size):
+                yield chunk
+            return
+
+        import anyio
+
+        while chunk := await anyio.to_thread.run_sync(file.read, chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+def spooled_sync_stream(file: tp.IO[bytes], chunk_size: int = SPOOL_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a body spooled to `file` from its start, closing the file once it is consumed.
+    """
+    try:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+class _NotifyingAsyncStream:
+    def __init__(self, stream: AsyncIterator[bytes], callback: tp.Callable[[], object]) -> None:
+        self._stream = stream
+        # Runs at most once. Holding no reference to the stream lets it also
+        # run when the stream is garbage collected without ever being read.
+        self._done = weakref.finalize(self, callback)
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            return await self._stream.__anext__()
+        except BaseException:
+            self._done()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            aclose = getattr(self._stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        finally:
+            self._done()
+
+
+class _NotifyingSyncStream:
+    def __init__(self, stream: Iterator[bytes], callback: tp.Callable[[], object]) -> None:
+        self._stream = stream
+        # Runs at most once, see `_NotifyingAsyncStream`.
+        self._done = weakref.finalize(self, callback)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._stream)
+        except BaseException:
+            self._done()
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._done()
+
+
+def notify_async_stream(stream: AsyncIterator[bytes], callback: tp.Callable[[], object]) -> AsyncIterator[bytes]:
+    """
+    Wrap `stream` so that `callback` is called once the stream is exhausted,
+    fails, is closed, or is dropped without being read, whichever comes first.
+
+    Unlike a `finally` block in a generator, this also covers streams that were never started.
+    """
+    return _NotifyingAsyncStream(stream, callback)
+
+
+def notify_sync_stream(stream: Iterator[bytes], callback: tp.Callable[[], object]) -> Iterator[bytes]:
+    """
+    Wrap `stream` so that `callback` is called once the stream is exhausted,
+    fails, is closed, or is dropped without being read, whichever comes first.
+
+    Unlike a `finally` block in a generator, this also covers streams that were never started.
+    """
+    return _NotifyingSyncStream(stream, callback)
+
+
 def snake_to_header(text: str) -> str:
     """
     Convert snake_case string to Header-Case format.
@@ -206,4 +206,5 @@ class CacheAdapter(HTTPAdapter):
         return _requests_to_internal(response)
 
     def close(self) -> Any:
+        self._cache_proxy.close()
         self.storage.close()
@@ -0,0 +1,390 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from time_machine import travel
+
+from hishel import AsyncInMemoryStorage, Headers, Request, Response
+from hishel._core._storages._async_memory import PENDING_BODY_TIMEOUT
+from hishel._utils import make_async_iterator
+
+
+@pytest.mark.anyio
+async def test_add_entry() -> None:
+    """Test adding a complete entry with request and response."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"chunk1", b"chunk2"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+
+    assert await entry.response.aread() == b"chunk1chunk2"
+
+    entries = await storage.get_entries("test_key")
+    assert len(entries) == 1
+    assert entries[0].id == uuid.UUID(int=0)
+    assert entries[0].cache_key == b"test_key"
+    assert await entries[0].response.aread() == b"chunk1chunk2"
+
+
+@pytest.mark.anyio
+async def test_stored_body_can_be_read_many_times() -> None:
+    """Test that every lookup gets its own stream over the stored body."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    for _ in range(3):
+        entries = await storage.get_entries("test_key")
+        assert await entries[0].response.aread() == b"data"
+
+
+@pytest.mark.anyio
+async def test_incomplete_entries() -> None:
+    """Test that entries are hidden until their response stream is consumed."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+
+    assert await storage.get_entries("test_key") == []
+
+    await entry.response.aread()
+
+    assert len(await storage.get_entries("test_key")) == 1
+
+
+@pytest.mark.anyio
+async def test_might_have_entries() -> None:
+    """Test that the storage tells exactly which keys have entries."""
+    storage = AsyncInMemoryStorage()
+    assert await storage.might_have_entries("test_key") is False
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+    assert await storage.might_have_entries("test_key") is True
+
+    await storage.remove_entry(entry.id)
+    assert await storage.might_have_entries("test_key") is False
+
+
+@pytest.mark.anyio
+async def test_multiple_entries_same_key() -> None:
+    """Test storing several entries under the same cache key."""
+    storage = AsyncInMemoryStorage()
+
+    for i in range(2):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key="shared_key",
+            id_=uuid.UUID(int=i),
+        )
+        await entry.response.aread()
+
+    entries = await storage.get_entries("shared_key")
+    assert {entry.id for entry in entries} == {uuid.UUID(int=0), uuid.UUID(int=1)}
+    assert await storage.get_entries("other_key") == []
+
+
+@pytest.mark.anyio
+async def test_create_entry_with_existing_id_replaces_it() -> None:
+    """Test that storing an entry again under the same ID replaces the old one."""
+    storage = AsyncInMemoryStorage()
+
+    first = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    second = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    await first.response.aread()
+    await second.response.aread()
+
+    entries = await storage.get_entries("test_key")
+    assert [entry.id for entry in entries] == [uuid.UUID(int=0)]
+    assert storage._size == 3
+
+    await storage.remove_entry(uuid.UUID(int=0))
+    assert await storage.get_entries("test_key") == []
+    assert storage._size == 0
+
+
+@pytest.mark.anyio
+async def test_update_entry() -> None:
+    """Test updating an entry with a callable and moving it to another cache key."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="old_key",
+    )
+    await entry.response.aread()
+
+    updated = await storage.update_entry(
+        entry.id,
+        lambda e: replace(e, response=replace(e.response, status_code=203), cache_key=b"new_key"),
+    )
+
+    assert updated is not None
+    assert await storage.get_entries("old_key") == []
+    entries = await storage.get_entries("new_key")
+    assert len(entries) == 1
+    assert entries[0].response.status_code == 203
+    assert await entries[0].response.aread() == b"data"
+
+
+@pytest.mark.anyio
+async def test_update_nonexistent_entry() -> None:
+    """Test updating an entry that does not exist."""
+    storage = AsyncInMemoryStorage()
+
+    result = await storage.update_entry(
+        uuid.UUID(int=42),
+        lambda e: e,
+    )
+
+    assert result is None
+
+
+@pytest.mark.anyio
+async def test_remove_entry() -> None:
+    """Test removing an entry."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+    entries = await storage.get_entries("test_key")
+
+    await storage.remove_entry(entry.id)
+
+    assert await storage.get_entries("test_key") == []
+    # Streams handed out before the removal can still be read.
+    assert await entries[0].response.aread() == b"data"
+
+
+@pytest.mark.anyio
+async def test_stored_entries_are_isolated_from_callers() -> None:
+    """Test that mutating returned entries does not change the stored ones."""
+    storage = AsyncInMemoryStorage()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200, headers=Headers({"content-type": "text/plain"}), stream=make_async_iterator([b"data"])
+        ),
+        key="test_key",
+    )
+    await entry.response.aread()
+    entry.response.headers["x-added"] = "by the caller"
+
+    entries = await storage.get_entries("test_key")
+    entries[0].response.metadata["hishel_from_cache"] = True  # type: ignore[index]
+    entries[0].response.headers["content-type"] = "text/html"
+    entries[0].request.headers["accept"] = "*/*"
+    storage.mark_pair_as_deleted(entries[0])
+
+    entries = await storage.get_entries("test_key")
+    assert "hishel_from_cache" not in entries[0].response.metadata
+    assert entries[0].response.headers == Headers({"content-type": "text/plain"})
+    assert entries[0].request.headers == Headers({})
+    assert not storage.is_soft_deleted(entries[0])
+
+
+@pytest.mark.anyio
+async def test_entries_with_unread_bodies_are_dropped() -> None:
+    """Test that entries whose stream is closed, dropped or left unread are not kept."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = AsyncInMemoryStorage()
+
+    async def store(key: str) -> Response:
+        entry = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key=key,
+        )
+        return entry.response
+
+    with travel(start, tick=False) as traveller:
+        closed = await store("closed")
+        await closed.stream.aclose()  # type: ignore[union-attr]
+        await store("dropped")
+        held = await store("held")
+
+        assert not await storage.might_have_entries("closed")
+        assert not await storage.might_have_entries("dropped")
+        assert await storage.might_have_entries("held")
+
+        traveller.move_to(start + timedelta(seconds=PENDING_BODY_TIMEOUT + 1))
+        assert not await storage.might_have_entries("held")
+        assert storage._records == {}
+        del held
+
+
+@pytest.mark.anyio
+async def test_expired_entries() -> None:
+    """Test that entries older than their TTL are dropped."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = AsyncInMemoryStorage(default_ttl=60)
+
+    with travel(start, tick=False) as traveller:
+        short = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key="test_key",
+        )
+        await short.response.aread()
+        long = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com", metadata={"hishel_ttl": 3600}),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key="test_key",
+        )
+        await long.response.aread()
+
+        traveller.move_to(start + timedelta(seconds=61))
+
+        entries = await storage.get_entries("test_key")
+        assert [entry.id for entry in entries] == [long.id]
+
+
+@pytest.mark.anyio
+async def test_refresh_entry_ttl() -> None:
+    """Test that refreshing the TTL keeps the entry alive."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = AsyncInMemoryStorage(default_ttl=60)
+
+    with travel(start, tick=False) as traveller:
+        entry = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key="test_key",
+        )
+        await entry.response.aread()
+
+        traveller.move_to(start + timedelta(seconds=50))
+        await storage.refresh_entry_ttl(entry.id)
+
+        traveller.move_to(start + timedelta(seconds=100))
+        assert len(await storage.get_entries("test_key")) == 1
+
+        traveller.move_to(start + timedelta(seconds=111))
+        assert await storage.get_entries("test_key") == []
+
+
+@pytest.mark.anyio
+async def test_max_entries_evicts_least_recently_used() -> None:
+    """Test that the entry-count limit evicts the least recently used entry."""
+    storage = AsyncInMemoryStorage(max_entries=2)
+
+    for key in ("a", "b"):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url=f"https://example.com/{key}"),
+            response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+            key=key,
+        )
+        await entry.response.aread()
+
+    # Touch "a" so that "b" becomes the least recently used entry.
+    await storage.get_entries("a")
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com/c"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="c",
+    )
+    await entry.response.aread()
+
+    assert len(await storage.get_entries("a")) == 1
+    assert await storage.get_entries("b") == []
+    assert len(await storage.get_entries("c")) == 1
+
+
+@pytest.mark.anyio
+async def test_max_size_evicts_least_recently_used() -> None:
+    """Test that the byte-size limit evicts the least recently used entries."""
+    storage = AsyncInMemoryStorage(max_size=10)
+
+    for key in ("a", "b", "c"):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url=f"https://example.com/{key}"),
+            response=Response(status_code=200, stream=make_async_iterator([b"12345"])),
+            key=key,
+        )
+        await entry.response.aread()
+
+    assert await storage.get_entries("a") == []
+    assert len(await storage.get_entries("b")) == 1
+    assert len(await storage.get_entries("c")) == 1
+
+
+@pytest.mark.anyio
+async def test_body_larger_than_max_size_is_not_stored() -> None:
+    """Test that a body which alone exceeds max_size is passed through but not stored."""
+    storage = AsyncInMemoryStorage(max_size=4)
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"123", b"456"])),
+        key="test_key",
+    )
+
+    assert await entry.response.aread() == b"123456"
+    assert await storage.get_entries("test_key") == []
+
+
+@pytest.mark.anyio
+async def test_get_variant_entries() -> None:
+    """Test that only the variants selected by the request's Vary headers are returned."""
+    storage = AsyncInMemoryStorage()
+
+    for encoding in ("gzip", "br"):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": encoding})),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Encoding"}),
+                stream=make_async_iterator([encoding.encode()]),
+            ),
+            key="test_key",
+        )
+        await entry.response.aread()
+
+    request = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": "br"}))
+    entries = await storage.get_variant_entries("test_key", request)
+    assert [await entry.response.aread() for entry in entries] == [b"br"]
+
+    # Revalidation may change the Vary set of a stored entry.
+    await storage.update_entry(
+        entries[0].id,
+        lambda entry: replace(entry, response=replace(entry.response, headers=Headers({}))),
+    )
+    other = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": "zstd"}))
+    assert [entry.id for entry in await storage.get_variant_entries("test_key", other)] == [entries[0].id]
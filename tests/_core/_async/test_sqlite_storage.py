@@ -1,4 +1,5 @@
 import uuid
+import zlib
 from dataclasses import replace
 from datetime import datetime
 from typing import Any, AsyncIterator
@@ -10,7 +11,7 @@ import pytest
 from inline_snapshot import snapshot
 from time_machine import travel
 
-from hishel import AsyncSqliteStorage, Request, Response
+from hishel import AsyncSqliteStorage, BloomFilter, BodyCompression, Headers, Request, Response
 from hishel._utils import make_async_iterator
 from tests.conftest import aprint_sqlite_state
 
@@ -61,6 +62,18 @@ async def test_add_entry() -> None:
 DATABASE SNAPSHOT
 ================================================================================
 
+TABLE: bodies
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
+TABLE: body_chunks
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
 TABLE: entries
 --------------------------------------------------------------------------------
 Rows: 1
@@ -68,9 +81,13 @@ Rows: 1
   Row 1:
     id              = (bytes) 0x00000000000000000000000000000000 (16 bytes)
     cache_key       = (str) 'test_key'
-    data            = (bytes) 0x85a26964c41000000000000000000000000000000000a772657175657374... (180 bytes)
+    data            = (bytes) 0xc1029ec41000000000000000000000000000000000c408746573745f6b65... (86 bytes)
     created_at      = 2024-01-01
     deleted_at      = NULL
+    body            = NULL
+    body_hash       = NULL
+    vary            = ''
+    variant_key     = (bytes) 0x7e09e12aa56148fe200ce1876b8e72ad40e7e50e10f52fd9c8f81959d37f2b69 (32 bytes)
 
 TABLE: streams
 --------------------------------------------------------------------------------
@@ -120,6 +137,18 @@ async def test_add_entry_with_stream() -> None:
 DATABASE SNAPSHOT
 ================================================================================
 
+TABLE: bodies
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
+TABLE: body_chunks
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
 TABLE: entries
 --------------------------------------------------------------------------------
 Rows: 1
@@ -127,9 +156,13 @@ Rows: 1
   Row 1:
     id              = (bytes) 0x00000000000000000000000000000000 (16 bytes)
     cache_key       = (str) 'stream_key'
-    data            = (bytes) 0x85a26964c41000000000000000000000000000000000a772657175657374... (190 bytes)
+    data            = (bytes) 0xc1029ec41000000000000000000000000000000000c40a73747265616d5f... (96 bytes)
     created_at      = 2024-01-01
     deleted_at      = NULL
+    body            = NULL
+    body_hash       = NULL
+    vary            = ''
+    variant_key     = (bytes) 0x7e09e12aa56148fe200ce1876b8e72ad40e7e50e10f52fd9c8f81959d37f2b69 (32 bytes)
 
 TABLE: streams
 --------------------------------------------------------------------------------
@@ -319,6 +352,27 @@ async def test_stream_persistence() -> None:
     assert retrieved_response_chunks == response_chunks
 
 
+@pytest.mark.anyio
+async def test_stream_persistence_across_read_batches() -> None:
+    """Test that streams spanning several read batches are retrieved in order."""
+    storage = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+
+    response_chunks = [f"chunk{i}".encode() for i in range(40)]
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator(response_chunks)),
+        key="stream_test",
+    )
+    await entry.response.aread()
+
+    entries = await storage.get_entries("stream_test")
+    assert len(entries) == 1
+
+    retrieved_response_chunks = [chunk async for chunk in entries[0].response._aiter_stream()]
+    assert retrieved_response_chunks == response_chunks
+
+
 @pytest.mark.anyio
 @travel(datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC")))
 async def test_multiple_entries_different_keys() -> None:
@@ -422,6 +476,18 @@ async def test_incomplete_entries() -> None:
 DATABASE SNAPSHOT
 ================================================================================
 
+TABLE: bodies
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
+TABLE: body_chunks
+--------------------------------------------------------------------------------
+Rows: 0
+
+  (empty)
+
 TABLE: entries
 --------------------------------------------------------------------------------
 Rows: 1
@@ -429,23 +495,121 @@ Rows: 1
   Row 1:
     id              = (bytes) 0x0000000000000000000000000000000a (16 bytes)
     cache_key       = (str) 'incomplete_key'
-    data            = (bytes) 0x85a26964c4100000000000000000000000000000000aa772657175657374... (186 bytes)
+    data            = (bytes) 0xc1029ec4100000000000000000000000000000000ac40e696e636f6d706c... (92 bytes)
     created_at      = 2024-01-01
     deleted_at      = NULL
+    body            = NULL
+    body_hash       = NULL
+    vary            = ''
+    variant_key     = (bytes) 0x7e09e12aa56148fe200ce1876b8e72ad40e7e50e10f52fd9c8f81959d37f2b69 (32 bytes)
 
 TABLE: streams
 --------------------------------------------------------------------------------
-Rows: 1
+Rows: 0
 
-  Row 1:
-    entry_id        = (bytes) 0x0000000000000000000000000000000a (16 bytes)
-    chunk_number    = 0
-    chunk_data      = (str) 'chunk1'
+  (empty)
 
 ================================================================================\
 """)
 
 
+@pytest.mark.anyio
+async def test_stream_chunks_are_written_in_batches() -> None:
+    """Test that body chunks are buffered and the completion marker is written with the last batch."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        write_batch_chunks=2,
+    )
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"1", b"2", b"3", b"4", b"5"])),
+        key="batched_key",
+    )
+
+    async def count_stream_rows() -> int:
+        cursor = await (await storage._ensure_connection()).cursor()
+        await cursor.execute("SELECT COUNT(*) FROM streams")
+        row = await cursor.fetchone()
+        assert row is not None
+        return int(row[0])
+
+    assert isinstance(entry.response.stream, AsyncIterator)
+    for _ in range(3):
+        await entry.response.stream.__anext__()
+
+    assert await count_stream_rows() == 2
+    assert await storage.get_entries("batched_key") == []
+
+    async for _ in entry.response.stream:
+        ...
+
+    # 5 chunks plus the completion marker
+    assert await count_stream_rows() == 6
+    entries = await storage.get_entries("batched_key")
+    assert len(entries) == 1
+    assert await entries[0].response.aread() == b"12345"
+
+
+@pytest.mark.anyio
+async def test_small_bodies_are_stored_inline() -> None:
+    """Test that bodies below inline_body_threshold are stored in the entries row."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        inline_body_threshold=16,
+    )
+
+    small = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com/small"),
+        response=Response(status_code=200, stream=make_async_iterator([b"small", b"body"])),
+        key="small_key",
+    )
+    await small.response.aread()
+
+    large = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com/large"),
+        response=Response(status_code=200, stream=make_async_iterator([b"a" * 10, b"b" * 10])),
+        key="large_key",
+    )
+    await large.response.aread()
+
+    cursor = await (await storage._ensure_connection()).cursor()
+    await cursor.execute("SELECT entry_id, COUNT(*) FROM streams GROUP BY entry_id")
+    assert await cursor.fetchall() == [(large.id.bytes, 3)]
+
+    small_entries = await storage.get_entries("small_key")
+    assert len(small_entries) == 1
+    assert await small_entries[0].response.aread() == b"smallbody"
+
+    large_entries = await storage.get_entries("large_key")
+    assert len(large_entries) == 1
+    assert await large_entries[0].response.aread() == b"a" * 10 + b"b" * 10
+
+
+@pytest.mark.anyio
+async def test_body_column_is_added_to_existing_database() -> None:
+    """Test that databases created without the inline body column are migrated."""
+    connection = await anysqlite.connect(":memory:", check_same_thread=False)
+    cursor = await connection.cursor()
+    await cursor.execute(
+        "CREATE TABLE entries (id BLOB PRIMARY KEY, cache_key BLOB, data BLOB NOT NULL,"
+        " created_at REAL NOT NULL, deleted_at REAL)"
+    )
+    await connection.commit()
+
+    storage = AsyncSqliteStorage(connection=connection, inline_body_threshold=1024)
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    entries = await storage.get_entries("test_key")
+    assert len(entries) == 1
+    assert await entries[0].response.aread() == b"data"
+
+
 @pytest.mark.anyio
 async def test_expired_entries() -> None:
     """Test expired entries"""
@@ -504,3 +668,320 @@ async def test_custom_ttl() -> None:
     # Verify hishel_ttl overrides default_ttl
     entries = await storage.get_entries("test_key")
     assert len(entries) == 1
+
+
+@pytest.mark.anyio
+async def test_compressed_bodies() -> None:
+    """Test that bodies selected by the compression policy are stored compressed."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        compression=BodyCompression(min_size=0),
+        write_batch_chunks=2,
+    )
+    body = [b'{"key": "value"}' * 64] * 5
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200,
+            headers=Headers({"Content-Type": "application/json"}),
+            stream=make_async_iterator(body),
+        ),
+        key="test_key",
+    )
+    assert await entry.response.aread() == b"".join(body)
+
+    cursor = await (await storage._ensure_connection()).cursor()
+    await cursor.execute("SELECT chunk_data FROM streams WHERE chunk_number >= 0 ORDER BY chunk_number")
+    stored = b"".join(row[0] for row in await cursor.fetchall())
+    assert len(stored) < len(b"".join(body))
+    assert zlib.decompress(stored) == b"".join(body)
+
+    entries = await storage.get_entries("test_key")
+    assert len(entries) == 1
+    assert entries[0].extra["hishel_body_codec"] == "zlib"
+    assert await entries[0].response.aread() == b"".join(body)
+
+
+@pytest.mark.anyio
+async def test_compressed_inline_bodies() -> None:
+    """Test that inline bodies are compressed and decompressed on read."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        compression=BodyCompression(min_size=0),
+        inline_body_threshold=1024,
+    )
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200,
+            headers=Headers({"Content-Type": "text/plain"}),
+            stream=make_async_iterator([b"a" * 2000]),
+        ),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    cursor = await (await storage._ensure_connection()).cursor()
+    await cursor.execute("SELECT body FROM entries")
+    assert zlib.decompress((await cursor.fetchone())[0]) == b"a" * 2000
+
+    entries = await storage.get_entries("test_key")
+    assert await entries[0].response.aread() == b"a" * 2000
+
+
+@pytest.mark.anyio
+async def test_uncompressible_bodies_are_stored_as_received() -> None:
+    """Test that bodies the compression policy doesn't select are stored unchanged."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        compression=BodyCompression(min_size=0),
+    )
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200,
+            headers=Headers({"Content-Type": "image/png"}),
+            stream=make_async_iterator([b"png data"]),
+        ),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    entries = await storage.get_entries("test_key")
+    assert "hishel_body_codec" not in entries[0].extra
+    assert await entries[0].response.aread() == b"png data"
+
+
+@pytest.mark.anyio
+async def test_identical_bodies_are_stored_once() -> None:
+    """Test that deduplicated entries with the same body share one stored copy."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        deduplicate_bodies=True,
+        write_batch_chunks=2,
+    )
+
+    entries = []
+    for url in ("https://example.com/a", "https://example.com/b"):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url=url),
+            response=Response(status_code=200, stream=make_async_iterator([b"chunk1", b"chunk2", b"chunk3"])),
+            key=url,
+        )
+        assert await entry.response.aread() == b"chunk1chunk2chunk3"
+        entries.append(entry)
+
+    cursor = await (await storage._ensure_connection()).cursor()
+    await cursor.execute("SELECT refcount FROM bodies")
+    assert await cursor.fetchall() == [(2,)]
+    await cursor.execute("SELECT COUNT(*), COUNT(DISTINCT body_id) FROM body_chunks")
+    assert await cursor.fetchone() == (3, 1)
+    await cursor.execute("SELECT COUNT(*) FROM streams")
+    assert await cursor.fetchone() == (0,)
+
+    for url in ("https://example.com/a", "https://example.com/b"):
+        cached = await storage.get_entries(url)
+        assert len(cached) == 1
+        assert await cached[0].response.aread() == b"chunk1chunk2chunk3"
+
+    # Dropping one reference keeps the body; dropping the last one frees it.
+    await storage._hard_delete_pair(entries[0], cursor)
+    await storage._collect_bodies(cursor)
+    await cursor.execute("SELECT COUNT(*) FROM body_chunks")
+    assert await cursor.fetchone() == (3,)
+
+    await storage._hard_delete_pair(entries[1], cursor)
+    await storage._collect_bodies(cursor)
+    await cursor.execute("SELECT COUNT(*) FROM body_chunks")
+    assert await cursor.fetchone() == (0,)
+    await cursor.execute("SELECT COUNT(*) FROM bodies")
+    assert await cursor.fetchone() == (0,)
+
+
+@pytest.mark.anyio
+async def test_collect_bodies_removes_unfinished_deduplicated_streams() -> None:
+    """Test that chunks of a deduplicated stream whose entry is gone are removed."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        deduplicate_bodies=True,
+        write_batch_chunks=1,
+    )
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"chunk1", b"chunk2"])),
+        key="test_key",
+    )
+    stream = entry.response._aiter_stream()
+    await stream.__anext__()
+    await stream.__anext__()
+
+    cursor = await (await storage._ensure_connection()).cursor()
+    await storage._hard_delete_pair(entry, cursor)
+    await storage._collect_bodies(cursor)
+
+    await cursor.execute("SELECT COUNT(*) FROM body_chunks")
+    assert await cursor.fetchone() == (0,)
+
+
+@pytest.mark.anyio
+async def test_get_variant_entries() -> None:
+    """Test that only the variants selected by the request's Vary headers are returned."""
+    storage = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+
+    for language in ("en", "fr", "de"):
+        entry = await storage.create_entry(
+            request=Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": language})),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Language"}),
+                stream=make_async_iterator([language.encode()]),
+            ),
+            key="test_key",
+        )
+        await entry.response.aread()
+
+    request = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": "fr"}))
+    entries = await storage.get_variant_entries("test_key", request)
+    assert [await entry.response.aread() for entry in entries] == [b"fr"]
+
+    missing = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": "es"}))
+    assert await storage.get_variant_entries("test_key", missing) == []
+    assert len(await storage.get_entries("test_key")) == 3
+
+
+@pytest.mark.anyio
+async def test_get_variant_entries_after_vary_changes() -> None:
+    """Test that entries stored under an older Vary set or before indexing are still found."""
+    storage = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+    request = Request(
+        method="GET",
+        url="https://example.com",
+        headers=Headers({"Accept": "text/html", "Accept-Language": "en"}),
+    )
+
+    for vary in ("Accept", "Accept, Accept-Language", "*"):
+        entry = await storage.create_entry(
+            request=request,
+            response=Response(status_code=200, headers=Headers({"Vary": vary}), stream=make_async_iterator([b"x"])),
+            key="test_key",
+        )
+        await entry.response.aread()
+
+    # Rows written before the variant index existed have no variant key.
+    cursor = await (await storage._ensure_connection()).cursor()
+    await cursor.execute("UPDATE entries SET vary = NULL, variant_key = NULL WHERE id = ?", (entry.id.bytes,))
+
+    entries = await storage.get_variant_entries("test_key", request)
+    assert sorted(entry.response.headers["vary"] for entry in entries) == ["*", "Accept", "Accept, Accept-Language"]
+
+
+@pytest.mark.anyio
+async def test_get_variant_entries_sees_vary_sets_added_after_a_lookup() -> None:
+    """Test that a Vary set stored after a lookup is not hidden by the remembered sets."""
+    storage = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+    request = Request(
+        method="GET",
+        url="https://example.com",
+        headers=Headers({"Accept": "text/html", "Accept-Language": "en"}),
+    )
+
+    for vary in ("Accept", "Accept-Language"):
+        entry = await storage.create_entry(
+            request=request,
+            response=Response(status_code=200, headers=Headers({"Vary": vary}), stream=make_async_iterator([b"x"])),
+            key="test_key",
+        )
+        await entry.response.aread()
+        entries = await storage.get_variant_entries("test_key", request)
+        assert entries[-1].id == entry.id
+
+    assert sorted(entry.response.headers["vary"] for entry in entries) == ["Accept", "Accept-Language"]
+
+
+@pytest.mark.anyio
+async def test_key_filter() -> None:
+    """Test that the key filter tracks stored keys and is rebuilt from the database outside of lookups."""
+    connection = await anysqlite.connect(":memory:", check_same_thread=False)
+    storage = AsyncSqliteStorage(connection=connection, key_filter=BloomFilter(capacity=100))
+    # A second storage sharing the database, like another worker process.
+    other = AsyncSqliteStorage(connection=connection, key_filter=BloomFilter(capacity=100))
+
+    assert await storage.might_have_entries("test_key") is False
+    assert await other.might_have_entries("test_key") is False
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    assert await storage.might_have_entries("test_key") is True
+    # Lookups never rebuild the filter.
+    other._key_filter_refreshed_at = 0.0
+    assert await other.might_have_entries("test_key") is False
+
+    # The first write after the refresh interval does.
+    other_entry = await other.create_entry(
+        request=Request(method="GET", url="https://example.com/other"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="other_key",
+    )
+    await other_entry.response.aread()
+    assert await other.might_have_entries("test_key") is True
+
+    # A storage that connects later builds the filter from the database.
+    later = AsyncSqliteStorage(connection=connection, key_filter=BloomFilter(capacity=100))
+    assert await later.might_have_entries("test_key") is True
+    assert await later.might_have_entries("other_key") is True
+
+    # The batch cleanup rebuilds it too, dropping the keys of removed entries.
+    await storage.remove_entry(entry.id)
+    await storage._batch_cleanup()
+    assert await storage.might_have_entries("test_key") is False
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"deduplicate_bodies": True},
+        {"inline_body_threshold": 1024},
+        {"compression": BodyCompression(min_size=0)},
+    ],
+)
+async def test_stream_entry_range(options: dict[str, Any]) -> None:
+    """Test that byte ranges of stored bodies are read starting at the right chunk."""
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        write_batch_chunks=2,
+        **options,
+    )
+    body = [b"0123456789", b"abcdefghij", b"ABCDEFGHIJ", b"klmnopqrst"]
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200, headers=Headers({"Content-Type": "text/plain"}), stream=make_async_iterator(body)
+        ),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    full = b"".join(body)
+    for first, last in [(0, 39), (0, 0), (12, 14), (9, 30), (25, 100)]:
+        (cached,) = await storage.get_entries("test_key")
+        chunks = [chunk async for chunk in storage.stream_entry_range(cached, first, last)]
+        assert b"".join(chunks) == full[first : last + 1]
+
+    if not options:
+        (cached,) = await storage.get_entries("test_key")
+        with patch.object(storage, "_stream_data_from_cache", wraps=storage._stream_data_from_cache) as stream:
+            chunks = [chunk async for chunk in storage.stream_entry_range(cached, 25, 34)]
+        assert b"".join(chunks) == b"FGHIJklmno"
+        assert stream.call_args.kwargs["first_chunk"] == 2
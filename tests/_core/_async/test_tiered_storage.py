@@ -0,0 +1,255 @@
+import uuid
+from dataclasses import replace
+
+import anysqlite
+import pytest
+
+from hishel import (
+    AsyncInMemoryStorage,
+    AsyncSqliteStorage,
+    AsyncTieredStorage,
+    BloomFilter,
+    Headers,
+    Request,
+    Response,
+)
+from hishel._utils import make_async_iterator
+
+
+async def make_tiers() -> tuple[AsyncInMemoryStorage, AsyncSqliteStorage, AsyncTieredStorage]:
+    memory = AsyncInMemoryStorage()
+    backing = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+    return memory, backing, AsyncTieredStorage(memory=memory, backing=[backing])
+
+
+@pytest.mark.anyio
+async def test_create_entry_writes_through_all_tiers() -> None:
+    """Test that a new entry is stored in every tier under the same ID."""
+    memory, backing, storage = await make_tiers()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"chunk1", b"chunk2"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    assert await entry.response.aread() == b"chunk1chunk2"
+
+    for tier in (memory, backing):
+        entries = await tier.get_entries("test_key")
+        assert [e.id for e in entries] == [uuid.UUID(int=0)]
+        assert await entries[0].response.aread() == b"chunk1chunk2"
+
+
+@pytest.mark.anyio
+async def test_backing_hit_is_promoted_to_memory() -> None:
+    """Test that entries found in a backing tier are copied into the memory tier."""
+    memory, backing, storage = await make_tiers()
+
+    stored = await backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    await stored.response.aread()
+    assert await memory.get_entries("test_key") == []
+
+    entries = await storage.get_entries("test_key")
+    assert [e.id for e in entries] == [uuid.UUID(int=1)]
+    assert await entries[0].response.aread() == b"data"
+
+    promoted = await memory.get_entries("test_key")
+    assert [e.id for e in promoted] == [uuid.UUID(int=1)]
+    assert promoted[0].meta.created_at == stored.meta.created_at
+    assert await promoted[0].response.aread() == b"data"
+
+
+@pytest.mark.anyio
+async def test_concurrent_backing_hits_promote_once() -> None:
+    """Test that a backing hit arriving while the entry is being promoted does not promote it again."""
+    memory, backing, storage = await make_tiers()
+
+    stored = await backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    await stored.response.aread()
+
+    first = await storage.get_entries("test_key")
+    second = await storage.get_entries("test_key")
+    assert await second[0].response.aread() == b"abc"
+    assert await first[0].response.aread() == b"abc"
+
+    promoted = await memory.get_entries("test_key")
+    assert [e.id for e in promoted] == [uuid.UUID(int=1)]
+    assert memory._size == 3
+
+    await storage.remove_entry(uuid.UUID(int=1))
+    assert await storage.get_entries("test_key") == []
+
+
+@pytest.mark.anyio
+async def test_abandoned_promotion_is_retried() -> None:
+    """Test that an entry is promoted again if the first promoted stream was dropped unread."""
+    memory, backing, storage = await make_tiers()
+
+    stored = await backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    await stored.response.aread()
+
+    entries = await storage.get_entries("test_key")
+    del entries
+
+    entries = await storage.get_entries("test_key")
+    assert await entries[0].response.aread() == b"abc"
+    assert [e.id for e in await memory.get_entries("test_key")] == [uuid.UUID(int=1)]
+
+
+@pytest.mark.anyio
+async def test_memory_variant_hit_does_not_read_backing_tier() -> None:
+    """Test that variant lookups stop at the memory tier when it has a matching entry."""
+    memory, backing, storage = await make_tiers()
+    request = Request(method="GET", url="https://example.com")
+
+    entry = await storage.create_entry(
+        request=request,
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    async def fail(key: str, request: Request) -> list:  # type: ignore[type-arg]
+        raise AssertionError("backing tier should not be queried")
+
+    backing.get_variant_entries = fail  # type: ignore[method-assign]
+
+    entries = await storage.get_variant_entries("test_key", request)
+    assert len(entries) == 1
+
+
+@pytest.mark.anyio
+async def test_variants_only_in_the_backing_tier_are_found() -> None:
+    """Test that a variant held only by the backing tier is not hidden by another variant in memory."""
+    memory, backing, storage = await make_tiers()
+
+    def request(language: str) -> Request:
+        return Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": language}))
+
+    for tier in (storage, backing):
+        language = "en" if tier is storage else "fr"
+        entry = await tier.create_entry(
+            request=request(language),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Language"}),
+                stream=make_async_iterator([language.encode()]),
+            ),
+            key="test_key",
+        )
+        await entry.response.aread()
+
+    entries = await storage.get_entries("test_key")
+    assert sorted([await entry.response.aread() for entry in entries]) == [b"en", b"fr"]
+
+    entries = await storage.get_variant_entries("test_key", request("fr"))
+    assert [await entry.response.aread() for entry in entries] == [b"fr"]
+
+
+@pytest.mark.anyio
+async def test_range_reads_come_from_the_backing_tier() -> None:
+    """Test that a range read of a backing hit reads the backing tier and promotes nothing."""
+    memory, backing, storage = await make_tiers()
+
+    stored = await backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"0123", b"4567", b"89"])),
+        key="test_key",
+    )
+    await stored.response.aread()
+
+    (entry,) = await storage.get_entries("test_key")
+    assert b"".join([chunk async for chunk in storage.stream_entry_range(entry, 3, 6)]) == b"3456"
+    assert await memory.get_entries("test_key") == []
+    assert not await memory.might_have_entries("test_key")
+
+    # A later full read promotes the entry.
+    (entry,) = await storage.get_entries("test_key")
+    assert await entry.response.aread() == b"0123456789"
+    (promoted,) = await memory.get_entries("test_key")
+    assert b"".join([chunk async for chunk in storage.stream_entry_range(promoted, 3, 6)]) == b"3456"
+
+
+@pytest.mark.anyio
+async def test_might_have_entries_uses_the_backing_key_filter() -> None:
+    """Test that unknown keys are ruled out by the memory tier and the backing tier's key filter."""
+    memory = AsyncInMemoryStorage()
+    backing = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        key_filter=BloomFilter(capacity=100),
+    )
+    storage = AsyncTieredStorage(memory=memory, backing=[backing])
+    assert await storage.might_have_entries("test_key") is False
+
+    stored = await backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await stored.response.aread()
+    assert await storage.might_have_entries("test_key") is True
+    assert await storage.might_have_entries("other_key") is False
+
+
+@pytest.mark.anyio
+async def test_update_entry_propagates_to_all_tiers() -> None:
+    """Test that updates reach every tier."""
+    memory, backing, storage = await make_tiers()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    updated = await storage.update_entry(
+        entry.id,
+        lambda e: replace(e, response=replace(e.response, status_code=203)),
+    )
+
+    assert updated is not None
+    assert updated.response.status_code == 203
+    for tier in (memory, backing):
+        entries = await tier.get_entries("test_key")
+        assert entries[0].response.status_code == 203
+
+
+@pytest.mark.anyio
+async def test_remove_entry_propagates_to_all_tiers() -> None:
+    """Test that removals reach every tier."""
+    memory, backing, storage = await make_tiers()
+
+    entry = await storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_async_iterator([b"data"])),
+        key="test_key",
+    )
+    await entry.response.aread()
+
+    await storage.remove_entry(entry.id)
+
+    assert await storage.get_entries("test_key") == []
+    assert await memory.get_entries("test_key") == []
+    assert await backing.get_entries("test_key") == []
+
+
+def test_backing_tier_is_required() -> None:
+    with pytest.raises(ValueError):
+        AsyncTieredStorage(memory=AsyncInMemoryStorage(), backing=[])
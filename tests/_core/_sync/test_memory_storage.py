@@ -0,0 +1,390 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from time_machine import travel
+
+from hishel import SyncInMemoryStorage, Headers, Request, Response
+from hishel._core._storages._sync_memory import PENDING_BODY_TIMEOUT
+from hishel._utils import make_sync_iterator
+
+
+
+def test_add_entry() -> None:
+    """Test adding a complete entry with request and response."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"chunk1", b"chunk2"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+
+    assert entry.response.read() == b"chunk1chunk2"
+
+    entries = storage.get_entries("test_key")
+    assert len(entries) == 1
+    assert entries[0].id == uuid.UUID(int=0)
+    assert entries[0].cache_key == b"test_key"
+    assert entries[0].response.read() == b"chunk1chunk2"
+
+
+
+def test_stored_body_can_be_read_many_times() -> None:
+    """Test that every lookup gets its own stream over the stored body."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+
+    for _ in range(3):
+        entries = storage.get_entries("test_key")
+        assert entries[0].response.read() == b"data"
+
+
+
+def test_incomplete_entries() -> None:
+    """Test that entries are hidden until their response stream is consumed."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+
+    assert storage.get_entries("test_key") == []
+
+    entry.response.read()
+
+    assert len(storage.get_entries("test_key")) == 1
+
+
+
+def test_might_have_entries() -> None:
+    """Test that the storage tells exactly which keys have entries."""
+    storage = SyncInMemoryStorage()
+    assert storage.might_have_entries("test_key") is False
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+    assert storage.might_have_entries("test_key") is True
+
+    storage.remove_entry(entry.id)
+    assert storage.might_have_entries("test_key") is False
+
+
+
+def test_multiple_entries_same_key() -> None:
+    """Test storing several entries under the same cache key."""
+    storage = SyncInMemoryStorage()
+
+    for i in range(2):
+        entry = storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key="shared_key",
+            id_=uuid.UUID(int=i),
+        )
+        entry.response.read()
+
+    entries = storage.get_entries("shared_key")
+    assert {entry.id for entry in entries} == {uuid.UUID(int=0), uuid.UUID(int=1)}
+    assert storage.get_entries("other_key") == []
+
+
+
+def test_create_entry_with_existing_id_replaces_it() -> None:
+    """Test that storing an entry again under the same ID replaces the old one."""
+    storage = SyncInMemoryStorage()
+
+    first = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    second = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    first.response.read()
+    second.response.read()
+
+    entries = storage.get_entries("test_key")
+    assert [entry.id for entry in entries] == [uuid.UUID(int=0)]
+    assert storage._size == 3
+
+    storage.remove_entry(uuid.UUID(int=0))
+    assert storage.get_entries("test_key") == []
+    assert storage._size == 0
+
+
+
+def test_update_entry() -> None:
+    """Test updating an entry with a callable and moving it to another cache key."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="old_key",
+    )
+    entry.response.read()
+
+    updated = storage.update_entry(
+        entry.id,
+        lambda e: replace(e, response=replace(e.response, status_code=203), cache_key=b"new_key"),
+    )
+
+    assert updated is not None
+    assert storage.get_entries("old_key") == []
+    entries = storage.get_entries("new_key")
+    assert len(entries) == 1
+    assert entries[0].response.status_code == 203
+    assert entries[0].response.read() == b"data"
+
+
+
+def test_update_nonexistent_entry() -> None:
+    """Test updating an entry that does not exist."""
+    storage = SyncInMemoryStorage()
+
+    result = storage.update_entry(
+        uuid.UUID(int=42),
+        lambda e: e,
+    )
+
+    assert result is None
+
+
+
+def test_remove_entry() -> None:
+    """Test removing an entry."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+    entries = storage.get_entries("test_key")
+
+    storage.remove_entry(entry.id)
+
+    assert storage.get_entries("test_key") == []
+    # Streams handed out before the removal can still be read.
+    assert entries[0].response.read() == b"data"
+
+
+
+def test_stored_entries_are_isolated_from_callers() -> None:
+    """Test that mutating returned entries does not change the stored ones."""
+    storage = SyncInMemoryStorage()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200, headers=Headers({"content-type": "text/plain"}), stream=make_sync_iterator([b"data"])
+        ),
+        key="test_key",
+    )
+    entry.response.read()
+    entry.response.headers["x-added"] = "by the caller"
+
+    entries = storage.get_entries("test_key")
+    entries[0].response.metadata["hishel_from_cache"] = True  # type: ignore[index]
+    entries[0].response.headers["content-type"] = "text/html"
+    entries[0].request.headers["accept"] = "*/*"
+    storage.mark_pair_as_deleted(entries[0])
+
+    entries = storage.get_entries("test_key")
+    assert "hishel_from_cache" not in entries[0].response.metadata
+    assert entries[0].response.headers == Headers({"content-type": "text/plain"})
+    assert entries[0].request.headers == Headers({})
+    assert not storage.is_soft_deleted(entries[0])
+
+
+
+def test_entries_with_unread_bodies_are_dropped() -> None:
+    """Test that entries whose stream is closed, dropped or left unread are not kept."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = SyncInMemoryStorage()
+
+    def store(key: str) -> Response:
+        entry = storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key=key,
+        )
+        return entry.response
+
+    with travel(start, tick=False) as traveller:
+        closed = store("closed")
+        closed.stream.close()  # type: ignore[union-attr]
+        store("dropped")
+        held = store("held")
+
+        assert not storage.might_have_entries("closed")
+        assert not storage.might_have_entries("dropped")
+        assert storage.might_have_entries("held")
+
+        traveller.move_to(start + timedelta(seconds=PENDING_BODY_TIMEOUT + 1))
+        assert not storage.might_have_entries("held")
+        assert storage._records == {}
+        del held
+
+
+
+def test_expired_entries() -> None:
+    """Test that entries older than their TTL are dropped."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = SyncInMemoryStorage(default_ttl=60)
+
+    with travel(start, tick=False) as traveller:
+        short = storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key="test_key",
+        )
+        short.response.read()
+        long = storage.create_entry(
+            request=Request(method="GET", url="https://example.com", metadata={"hishel_ttl": 3600}),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key="test_key",
+        )
+        long.response.read()
+
+        traveller.move_to(start + timedelta(seconds=61))
+
+        entries = storage.get_entries("test_key")
+        assert [entry.id for entry in entries] == [long.id]
+
+
+
+def test_refresh_entry_ttl() -> None:
+    """Test that refreshing the TTL keeps the entry alive."""
+    start = datetime(2024, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC"))
+    storage = SyncInMemoryStorage(default_ttl=60)
+
+    with travel(start, tick=False) as traveller:
+        entry = storage.create_entry(
+            request=Request(method="GET", url="https://example.com"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key="test_key",
+        )
+        entry.response.read()
+
+        traveller.move_to(start + timedelta(seconds=50))
+        storage.refresh_entry_ttl(entry.id)
+
+        traveller.move_to(start + timedelta(seconds=100))
+        assert len(storage.get_entries("test_key")) == 1
+
+        traveller.move_to(start + timedelta(seconds=111))
+        assert storage.get_entries("test_key") == []
+
+
+
+def test_max_entries_evicts_least_recently_used() -> None:
+    """Test that the entry-count limit evicts the least recently used entry."""
+    storage = SyncInMemoryStorage(max_entries=2)
+
+    for key in ("a", "b"):
+        entry = storage.create_entry(
+            request=Request(method="GET", url=f"https://example.com/{key}"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+            key=key,
+        )
+        entry.response.read()
+
+    # Touch "a" so that "b" becomes the least recently used entry.
+    storage.get_entries("a")
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com/c"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="c",
+    )
+    entry.response.read()
+
+    assert len(storage.get_entries("a")) == 1
+    assert storage.get_entries("b") == []
+    assert len(storage.get_entries("c")) == 1
+
+
+
+def test_max_size_evicts_least_recently_used() -> None:
+    """Test that the byte-size limit evicts the least recently used entries."""
+    storage = SyncInMemoryStorage(max_size=10)
+
+    for key in ("a", "b", "c"):
+        entry = storage.create_entry(
+            request=Request(method="GET", url=f"https://example.com/{key}"),
+            response=Response(status_code=200, stream=make_sync_iterator([b"12345"])),
+            key=key,
+        )
+        entry.response.read()
+
+    assert storage.get_entries("a") == []
+    assert len(storage.get_entries("b")) == 1
+    assert len(storage.get_entries("c")) == 1
+
+
+
+def test_body_larger_than_max_size_is_not_stored() -> None:
+    """Test that a body which alone exceeds max_size is passed through but not stored."""
+    storage = SyncInMemoryStorage(max_size=4)
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"123", b"456"])),
+        key="test_key",
+    )
+
+    assert entry.response.read() == b"123456"
+    assert storage.get_entries("test_key") == []
+
+
+
+def test_get_variant_entries() -> None:
+    """Test that only the variants selected by the request's Vary headers are returned."""
+    storage = SyncInMemoryStorage()
+
+    for encoding in ("gzip", "br"):
+        entry = storage.create_entry(
+            request=Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": encoding})),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Encoding"}),
+                stream=make_sync_iterator([encoding.encode()]),
+            ),
+            key="test_key",
+        )
+        entry.response.read()
+
+    request = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": "br"}))
+    entries = storage.get_variant_entries("test_key", request)
+    assert [entry.response.read() for entry in entries] == [b"br"]
+
+    # Revalidation may change the Vary set of a stored entry.
+    storage.update_entry(
+        entries[0].id,
+        lambda entry: replace(entry, response=replace(entry.response, headers=Headers({}))),
+    )
+    other = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Encoding": "zstd"}))
+    assert [entry.id for entry in storage.get_variant_entries("test_key", other)] == [entries[0].id]
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import uuid
+import zlib
 from dataclasses import replace
 from datetime import datetime
-from typing import Iterator
+from typing import Iterator, cast
 from unittest.mock import MagicMock
 from zoneinfo import ZoneInfo
 
@@ -11,7 +12,7 @@ import fakeredis
 import pytest
 from time_machine import travel
 
-from hishel import Request, Response
+from hishel import BloomFilter, BodyCompression, Headers, Request, Response
 from hishel._core._storages._sync_redis import RedisStorage
 from hishel._utils import make_sync_iterator
 
@@ -313,6 +314,70 @@ def test_stream_persistence() -> None:
     assert retrieved_chunks == response_chunks
 
 
+def test_stream_persistence_across_read_batches() -> None:
+    """Test that streams spanning several LRANGE pages are retrieved in order."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client)
+
+    response_chunks = [f"chunk{i}".encode() for i in range(40)]
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator(response_chunks)),
+        key="stream_test",
+    )
+    entry.response.read()
+
+    entries = storage.get_entries("stream_test")
+    assert len(entries) == 1
+    assert list(entries[0].response._iter_stream()) == response_chunks
+
+
+def test_dangling_index_members_are_pruned() -> None:
+    """Test that index members whose entry blob is gone are removed from the index."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client)
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+    client.sadd("hishel:idx:test_key", uuid.UUID(int=99).hex)
+
+    entries = storage.get_entries("test_key")
+
+    assert [e.id for e in entries] == [entry.id]
+    assert client.smembers("hishel:idx:test_key") == {entry.id.hex.encode()}
+
+
+def test_lua_script_get_entries() -> None:
+    """Test that the Lua script mode returns only complete entries and prunes dangling members."""
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client, use_lua_scripts=True)
+
+    complete = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    complete.response.read()
+    storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    client.sadd("hishel:idx:test_key", uuid.UUID(int=99).hex)
+
+    entries = storage.get_entries("test_key")
+
+    assert [e.id for e in entries] == [complete.id]
+    assert entries[0].response.read() == b"data"
+    assert uuid.UUID(int=99).hex.encode() not in client.smembers("hishel:idx:test_key")
+
+
 def test_remove_nonexistent_entry() -> None:
     """Test that removing a non-existent entry doesn't raise an error."""
     client = fakeredis.FakeRedis()
@@ -360,6 +425,35 @@ def test_incomplete_entries() -> None:
     assert len(entries) == 0
 
 
+def test_stream_chunks_are_written_in_batches() -> None:
+    """Test that body chunks are buffered and flushed with a single RPUSH per batch."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client, write_batch_chunks=2)
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"1", b"2", b"3", b"4", b"5"])),
+        key="batched_key",
+    )
+    stream_key = f"hishel:stream:{entry.id.hex}"
+
+    assert isinstance(entry.response.stream, Iterator)
+    for _ in range(3):
+        entry.response.stream.__next__()
+
+    assert client.llen(stream_key) == 2
+    assert storage.get_entries("batched_key") == []
+
+    for _ in entry.response.stream:
+        ...
+
+    # 5 chunks plus the sentinel
+    assert client.llen(stream_key) == 6
+    entries = storage.get_entries("batched_key")
+    assert len(entries) == 1
+    assert entries[0].response.read() == b"12345"
+
+
 def test_soft_deleted_entries() -> None:
     """Test that entries marked as soft-deleted are excluded from get_entries."""
     client = fakeredis.FakeRedis()
@@ -481,3 +575,224 @@ def test_custom_prefix() -> None:
     assert client.exists(f"{key_prefix}:entry:{hex_id}") == 1
     assert client.exists(f"{key_prefix}:stream:{hex_id}") == 1
     assert client.exists(f"{key_prefix}:stream_done:{hex_id}") == 1
+
+
+def test_compressed_bodies() -> None:
+    """Test that bodies selected by the compression policy are stored compressed."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client, compression=BodyCompression(min_size=0), write_batch_chunks=2)
+    body = [b"<p>hello</p>" * 64] * 5
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(
+            status_code=200,
+            headers=Headers({"Content-Type": "text/html"}),
+            stream=make_sync_iterator(body),
+        ),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    assert entry.response.read() == b"".join(body)
+
+    stored = b"".join(cast("list[bytes]", client.lrange(f"hishel:stream:{entry.id.hex}", 0, -1)))
+    assert len(stored) < len(b"".join(body))
+    assert zlib.decompress(stored) == b"".join(body)
+
+    entries = storage.get_entries("test_key")
+    assert len(entries) == 1
+    assert entries[0].extra["hishel_body_codec"] == "zlib"
+    assert entries[0].response.read() == b"".join(body)
+
+
+def test_identical_bodies_are_stored_once() -> None:
+    """Test that deduplicated entries with the same body share one Redis list."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client, deduplicate_bodies=True, write_batch_chunks=2)
+
+    for url in ("https://example.com/a", "https://example.com/b"):
+        entry = storage.create_entry(
+            request=Request(method="GET", url=url),
+            response=Response(status_code=200, stream=make_sync_iterator([b"chunk1", b"chunk2", b"chunk3"])),
+            key=url,
+        )
+        assert entry.response.read() == b"chunk1chunk2chunk3"
+
+    assert client.keys("hishel:stream:*") == []
+    assert len(client.keys("hishel:body:*")) == 1
+
+    for url in ("https://example.com/a", "https://example.com/b"):
+        cached = storage.get_entries(url)
+        assert len(cached) == 1
+        assert cached[0].response.read() == b"chunk1chunk2chunk3"
+
+
+def test_shared_body_ttl_covers_longest_lived_entry() -> None:
+    """Test that sharing a body never shortens its TTL."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client, deduplicate_bodies=True, ttl=3600)
+
+    long_lived = storage.create_entry(
+        request=Request(method="GET", url="https://example.com/a"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="a",
+    )
+    long_lived.response.read()
+    short_lived = storage.create_entry(
+        request=Request(method="GET", url="https://example.com/b", metadata={"hishel_ttl": 60}),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="b",
+    )
+    short_lived.response.read()
+
+    (body_key,) = client.keys("hishel:body:*")
+    assert client.pttl(body_key) > 3600 * 1000
+
+
+def test_get_variant_entries() -> None:
+    """Test that only the variants selected by the request's Vary headers are read."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client)
+
+    for language in ("en", "fr", "de"):
+        entry = storage.create_entry(
+            request=Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": language})),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Language"}),
+                stream=make_sync_iterator([language.encode()]),
+            ),
+            key="test_key",
+        )
+        entry.response.read()
+
+    request = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": "fr"}))
+    entries = storage.get_variant_entries("test_key", request)
+    assert [entry.response.read() for entry in entries] == [b"fr"]
+
+    storage.remove_entry(entries[0].id)
+    assert storage.get_variant_entries("test_key", request) == []
+
+    missing = Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": "es"}))
+    assert storage.get_variant_entries("test_key", missing) == []
+    assert len(storage.get_entries("test_key")) == 2
+
+
+def test_get_variant_entries_across_vary_sets() -> None:
+    """Test that entries stored under different Vary sets, or before indexing, are still found."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(client=client)
+    request = Request(
+        method="GET",
+        url="https://example.com",
+        headers=Headers({"Accept": "text/html", "Accept-Language": "en"}),
+    )
+
+    for vary in ("Accept", "Accept, Accept-Language", "*"):
+        entry = storage.create_entry(
+            request=request,
+            response=Response(status_code=200, headers=Headers({"Vary": vary}), stream=make_sync_iterator([b"x"])),
+            key="test_key",
+        )
+        entry.response.read()
+
+    # "*" never matches a stored variant.
+    entries = storage.get_variant_entries("test_key", request)
+    assert sorted(entry.response.headers["vary"] for entry in entries) == ["Accept", "Accept, Accept-Language"]
+
+    # A revalidation that changes the Vary set moves the entry to its new variant.
+    (accept_entry,) = [entry for entry in entries if entry.response.headers["vary"] == "Accept"]
+    updated = storage.update_entry(
+        accept_entry.id,
+        lambda entry: replace(entry, response=replace(entry.response, headers=Headers({"Vary": "Accept-Language"}))),
+    )
+    assert updated is not None
+    entries = storage.get_variant_entries("test_key", request)
+    assert sorted(entry.response.headers["vary"] for entry in entries) == ["Accept, Accept-Language", "Accept-Language"]
+
+    # Keys written before the variant index existed fall back to every entry.
+    client.delete("hishel:varies:test_key")
+    assert len(storage.get_variant_entries("test_key", request)) == 3
+
+
+def test_key_filter_is_shared_through_redis() -> None:
+    """Test that the key filter is kept in Redis and rebuilt from the index keys."""
+    client = fakeredis.FakeRedis()
+    # An entry stored before the filter was enabled.
+    entry = RedisStorage(client=client).create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="old_key",
+    )
+    for _ in entry.response._iter_stream():
+        ...
+
+    storage = RedisStorage(client=client, key_filter=BloomFilter(capacity=100))
+    other = RedisStorage(client=client, key_filter=BloomFilter(capacity=100))
+
+    # Lookups never build the filter; until a write does, they can't rule out any key.
+    assert storage.might_have_entries("missing_key") is True
+
+    # The first write builds the shared filter from the stored index keys.
+    entry = other.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="new_key",
+    )
+    for _ in entry.response._iter_stream():
+        ...
+
+    assert other.might_have_entries("old_key") is True
+    assert other.might_have_entries("new_key") is True
+    assert other.might_have_entries("missing_key") is False
+    # Picked up once the shared bits are reloaded.
+    storage._key_filter_refreshed_at = 0.0
+    assert storage.might_have_entries("new_key") is True
+    assert storage.might_have_entries("missing_key") is False
+
+
+@pytest.mark.parametrize("deduplicate_bodies", [False, True])
+def test_stream_entry_range(deduplicate_bodies: bool) -> None:
+    """Test that byte ranges of stored bodies are read starting at the right chunk."""
+    client = fakeredis.FakeRedis()
+    storage = RedisStorage(
+        client=client,
+        deduplicate_bodies=deduplicate_bodies,
+        # Spread the chunk offsets over several writes.
+        write_batch_chunks=3,
+    )
+    body = [b"0123456789", b"abcdefghij", b"ABCDEFGHIJ", b"klmnopqrst"]
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator(body)),
+        key="test_key",
+    )
+    entry.response.read()
+
+    full = b"".join(body)
+    for first, last in [(0, 39), (0, 0), (12, 14), (9, 30), (25, 100), (40, 50)]:
+        (cached,) = storage.get_entries("test_key")
+        assert b"".join(storage.stream_entry_range(cached, first, last)) == full[first : last + 1]
+
+    (cached,) = storage.get_entries("test_key")
+    stream_from_cache = MagicMock(wraps=storage._stream_from_cache)
+    storage._stream_from_cache = stream_from_cache  # type: ignore[method-assign]
+    assert b"".join(storage.stream_entry_range(cached, 25, 34)) == b"FGHIJklmno"
+    assert stream_from_cache.call_args.args[1] == 2
+
+    # Bodies stored without offsets are read from the first chunk.
+    client.delete(*client.keys("hishel:*_offsets:*"))
+    assert b"".join(storage.stream_entry_range(cached, 25, 34)) == b"FGHIJklmno"
+    assert stream_from_cache.call_args.args[1] == 0
+
+    if deduplicate_bodies:
+        # The same body chunked differently shares the stored list and its offsets.
+        other = storage.create_entry(
+            request=Request(method="GET", url="https://example.com/other"),
+            response=Response(status_code=200, stream=make_sync_iterator([full[:5], full[5:]])),
+            key="other_key",
+        )
+        other.response.read()
+        (cached,) = storage.get_entries("other_key")
+        assert b"".join(storage.stream_entry_range(cached, 25, 34)) == b"FGHIJklmno"
@@ -0,0 +1,255 @@
+import uuid
+from dataclasses import replace
+
+import sqlite3
+import pytest
+
+from hishel import (
+    SyncInMemoryStorage,
+    SyncSqliteStorage,
+    SyncTieredStorage,
+    BloomFilter,
+    Headers,
+    Request,
+    Response,
+)
+from hishel._utils import make_sync_iterator
+
+
+def make_tiers() -> tuple[SyncInMemoryStorage, SyncSqliteStorage, SyncTieredStorage]:
+    memory = SyncInMemoryStorage()
+    backing = SyncSqliteStorage(connection=sqlite3.connect(":memory:", check_same_thread=False))
+    return memory, backing, SyncTieredStorage(memory=memory, backing=[backing])
+
+
+
+def test_create_entry_writes_through_all_tiers() -> None:
+    """Test that a new entry is stored in every tier under the same ID."""
+    memory, backing, storage = make_tiers()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"chunk1", b"chunk2"])),
+        key="test_key",
+        id_=uuid.UUID(int=0),
+    )
+    assert entry.response.read() == b"chunk1chunk2"
+
+    for tier in (memory, backing):
+        entries = tier.get_entries("test_key")
+        assert [e.id for e in entries] == [uuid.UUID(int=0)]
+        assert entries[0].response.read() == b"chunk1chunk2"
+
+
+
+def test_backing_hit_is_promoted_to_memory() -> None:
+    """Test that entries found in a backing tier are copied into the memory tier."""
+    memory, backing, storage = make_tiers()
+
+    stored = backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    stored.response.read()
+    assert memory.get_entries("test_key") == []
+
+    entries = storage.get_entries("test_key")
+    assert [e.id for e in entries] == [uuid.UUID(int=1)]
+    assert entries[0].response.read() == b"data"
+
+    promoted = memory.get_entries("test_key")
+    assert [e.id for e in promoted] == [uuid.UUID(int=1)]
+    assert promoted[0].meta.created_at == stored.meta.created_at
+    assert promoted[0].response.read() == b"data"
+
+
+
+def test_concurrent_backing_hits_promote_once() -> None:
+    """Test that a backing hit arriving while the entry is being promoted does not promote it again."""
+    memory, backing, storage = make_tiers()
+
+    stored = backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    stored.response.read()
+
+    first = storage.get_entries("test_key")
+    second = storage.get_entries("test_key")
+    assert second[0].response.read() == b"abc"
+    assert first[0].response.read() == b"abc"
+
+    promoted = memory.get_entries("test_key")
+    assert [e.id for e in promoted] == [uuid.UUID(int=1)]
+    assert memory._size == 3
+
+    storage.remove_entry(uuid.UUID(int=1))
+    assert storage.get_entries("test_key") == []
+
+
+
+def test_abandoned_promotion_is_retried() -> None:
+    """Test that an entry is promoted again if the first promoted stream was dropped unread."""
+    memory, backing, storage = make_tiers()
+
+    stored = backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"abc"])),
+        key="test_key",
+        id_=uuid.UUID(int=1),
+    )
+    stored.response.read()
+
+    entries = storage.get_entries("test_key")
+    del entries
+
+    entries = storage.get_entries("test_key")
+    assert entries[0].response.read() == b"abc"
+    assert [e.id for e in memory.get_entries("test_key")] == [uuid.UUID(int=1)]
+
+
+
+def test_memory_variant_hit_does_not_read_backing_tier() -> None:
+    """Test that variant lookups stop at the memory tier when it has a matching entry."""
+    memory, backing, storage = make_tiers()
+    request = Request(method="GET", url="https://example.com")
+
+    entry = storage.create_entry(
+        request=request,
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+
+    def fail(key: str, request: Request) -> list:  # type: ignore[type-arg]
+        raise AssertionError("backing tier should not be queried")
+
+    backing.get_variant_entries = fail  # type: ignore[method-assign]
+
+    entries = storage.get_variant_entries("test_key", request)
+    assert len(entries) == 1
+
+
+
+def test_variants_only_in_the_backing_tier_are_found() -> None:
+    """Test that a variant held only by the backing tier is not hidden by another variant in memory."""
+    memory, backing, storage = make_tiers()
+
+    def request(language: str) -> Request:
+        return Request(method="GET", url="https://example.com", headers=Headers({"Accept-Language": language}))
+
+    for tier in (storage, backing):
+        language = "en" if tier is storage else "fr"
+        entry = tier.create_entry(
+            request=request(language),
+            response=Response(
+                status_code=200,
+                headers=Headers({"Vary": "Accept-Language"}),
+                stream=make_sync_iterator([language.encode()]),
+            ),
+            key="test_key",
+        )
+        entry.response.read()
+
+    entries = storage.get_entries("test_key")
+    assert sorted([entry.response.read() for entry in entries]) == [b"en", b"fr"]
+
+    entries = storage.get_variant_entries("test_key", request("fr"))
+    assert [entry.response.read() for entry in entries] == [b"fr"]
+
+
+
+def test_range_reads_come_from_the_backing_tier() -> None:
+    """Test that a range read of a backing hit reads the backing tier and promotes nothing."""
+    memory, backing, storage = make_tiers()
+
+    stored = backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"0123", b"4567", b"89"])),
+        key="test_key",
+    )
+    stored.response.read()
+
+    (entry,) = storage.get_entries("test_key")
+    assert b"".join([chunk for chunk in storage.stream_entry_range(entry, 3, 6)]) == b"3456"
+    assert memory.get_entries("test_key") == []
+    assert not memory.might_have_entries("test_key")
+
+    # A later full read promotes the entry.
+    (entry,) = storage.get_entries("test_key")
+    assert entry.response.read() == b"0123456789"
+    (promoted,) = memory.get_entries("test_key")
+    assert b"".join([chunk for chunk in storage.stream_entry_range(promoted, 3, 6)]) == b"3456"
+
+
+
+def test_might_have_entries_uses_the_backing_key_filter() -> None:
+    """Test that unknown keys are ruled out by the memory tier and the backing tier's key filter."""
+    memory = SyncInMemoryStorage()
+    backing = SyncSqliteStorage(
+        connection=sqlite3.connect(":memory:", check_same_thread=False),
+        key_filter=BloomFilter(capacity=100),
+    )
+    storage = SyncTieredStorage(memory=memory, backing=[backing])
+    assert storage.might_have_entries("test_key") is False
+
+    stored = backing.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    stored.response.read()
+    assert storage.might_have_entries("test_key") is True
+    assert storage.might_have_entries("other_key") is False
+
+
+
+def test_update_entry_propagates_to_all_tiers() -> None:
+    """Test that updates reach every tier."""
+    memory, backing, storage = make_tiers()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+
+    updated = storage.update_entry(
+        entry.id,
+        lambda e: replace(e, response=replace(e.response, status_code=203)),
+    )
+
+    assert updated is not None
+    assert updated.response.status_code == 203
+    for tier in (memory, backing):
+        entries = tier.get_entries("test_key")
+        assert entries[0].response.status_code == 203
+
+
+
+def test_remove_entry_propagates_to_all_tiers() -> None:
+    """Test that removals reach every tier."""
+    memory, backing, storage = make_tiers()
+
+    entry = storage.create_entry(
+        request=Request(method="GET", url="https://example.com"),
+        response=Response(status_code=200, stream=make_sync_iterator([b"data"])),
+        key="test_key",
+    )
+    entry.response.read()
+
+    storage.remove_entry(entry.id)
+
+    assert storage.get_entries("test_key") == []
+    assert memory.get_entries("test_key") == []
+    assert backing.get_entries("test_key") == []
+
+
+def test_backing_tier_is_required() -> None:
+    with pytest.raises(ValueError):
+        SyncTieredStorage(memory=SyncInMemoryStorage(), backing=[])
@@ -317,6 +317,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "method"
         assert response.metadata.get("hishel_stored") is False
 
     @pytest.mark.parametrize("status_code", [100, 101, 102, 103])
@@ -345,6 +346,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "status"
         assert response.metadata.get("hishel_stored") is False
 
     @pytest.mark.parametrize("status_code", [206, 304])
@@ -376,6 +378,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "not-understood"
 
     def test_no_store_directive_prevents_storage(self, default_options: CacheOptions) -> None:
         """
@@ -398,6 +401,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "no-store"
         assert response.metadata.get("hishel_stored") is False
 
     def test_private_directive_prevents_storage_in_shared_cache(self, default_options: CacheOptions) -> None:
@@ -422,6 +426,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "private"
         assert response.metadata.get("hishel_stored") is False
 
     def test_authorization_header_prevents_storage_in_shared_cache(self, default_options: CacheOptions) -> None:
@@ -447,6 +452,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "authorization"
 
     def test_response_without_caching_metadata_and_non_cacheable_status(self, default_options: CacheOptions) -> None:
         """
@@ -476,6 +482,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "missing-freshness"
         assert response.metadata.get("hishel_stored") is False
 
     def test_response_with_no_store_overrides_other_directives(self, default_options: CacheOptions) -> None:
@@ -498,6 +505,7 @@ class TestTransitionToCouldNotBeStored:
 
         # Assert
         assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.reason == "no-store"
 
 
 # =============================================================================
@@ -25,13 +25,19 @@ import pytest
 from hishel import Entry, EntryMeta, Request, Response
 from hishel._core._headers import Headers
 from hishel._core._spec import (
+    Freshness,
     allowed_stale,
     exclude_unstorable_headers,
     get_age,
+    get_freshness,
     get_freshness_lifetime,
     get_heuristic_freshness,
+    get_variant_key,
+    if_range_matches,
     make_conditional_request,
+    normalize_vary,
     refresh_response_headers,
+    resolve_byte_ranges,
     vary_headers_match,
 )
 
@@ -222,6 +228,36 @@ class TestVaryHeadersMatch:
         assert vary_headers_match(request2, pair) is False
 
 
+class TestVariantKey:
+    """
+    Tests for normalize_vary and get_variant_key, which storages use to index variants.
+    """
+
+    def test_normalize_vary(self) -> None:
+        assert normalize_vary(None) == ""
+        assert normalize_vary("Accept-Language, accept ,Accept") == "accept,accept-language"
+        assert normalize_vary("Accept, *") == "*"
+
+    def test_variant_key_agrees_with_vary_headers_match(self) -> None:
+        vary = normalize_vary("Accept, Accept-Language")
+        stored = create_request(headers={"accept": "text/html", "accept-language": "en"})
+
+        same = create_request(headers={"Accept": "text/html", "Accept-Language": "en", "X-Other": "1"})
+        different = create_request(headers={"accept": "text/html", "accept-language": "fr"})
+        missing = create_request(headers={"accept": "text/html"})
+
+        assert get_variant_key(vary, same) == get_variant_key(vary, stored)
+        assert get_variant_key(vary, different) != get_variant_key(vary, stored)
+        assert get_variant_key(vary, missing) != get_variant_key(vary, stored)
+
+    def test_variant_key_includes_vary_set(self) -> None:
+        request = create_request(headers={"accept": "en", "accept-language": "en"})
+        assert get_variant_key("accept", request) != get_variant_key("accept-language", request)
+
+    def test_vary_star_has_no_variant_key(self) -> None:
+        assert get_variant_key("*", create_request()) is None
+
+
 # =============================================================================
 # Test Suite 2: get_freshness_lifetime
 # =============================================================================
@@ -587,6 +623,90 @@ class TestGetAge:
         assert age == 0  # max(0, now - future) = 0
 
 
+class TestGetFreshness:
+    """
+    Tests for get_freshness, the record storages keep so lookups don't parse headers.
+    """
+
+    def test_freshness_record_from_headers(self) -> None:
+        response = create_response(
+            headers={
+                "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                "cache-control": "max-age=60, s-maxage=120, stale-while-revalidate=30",
+            }
+        )
+
+        freshness = get_freshness(response)
+
+        assert freshness == Freshness(
+            date=1704067200,
+            lifetime_shared=120,
+            lifetime_private=60,
+            no_cache=False,
+            must_revalidate=False,
+            stale_while_revalidate=30,
+        )
+        assert freshness.expires_at(is_cache_shared=True) == 1704067320
+        assert freshness.expires_at(is_cache_shared=False) == 1704067260
+
+    def test_freshness_record_flags(self) -> None:
+        assert get_freshness(create_response(headers={"cache-control": "no-cache"})).no_cache is True
+        assert get_freshness(create_response(headers={"cache-control": "must-revalidate"})).must_revalidate is True
+
+        # A qualified no-cache doesn't force validation, but rules out serving stale.
+        qualified = get_freshness(create_response(headers={"cache-control": 'no-cache="set-cookie"'}))
+        assert qualified.no_cache is False
+        assert qualified.must_revalidate is True
+
+    def test_freshness_age_matches_get_age(self) -> None:
+        date = (datetime.utcnow() - timedelta(hours=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+        response = create_response(headers={"date": date})
+
+        assert abs(get_freshness(response).age() - get_age(response)) <= 1
+        assert get_freshness(create_response()).age() == 0
+
+
+class TestByteRanges:
+    """
+    Tests for resolve_byte_ranges and if_range_matches.
+
+    RFC 9110 Section 14: Range Requests
+    """
+
+    def test_ranges_are_resolved_against_the_length(self) -> None:
+        assert resolve_byte_ranges([(0, 9)], 100) == [(0, 9)]
+        assert resolve_byte_ranges([(90, None)], 100) == [(90, 99)]
+        assert resolve_byte_ranges([(None, 10)], 100) == [(90, 99)]
+        assert resolve_byte_ranges([(None, 500)], 100) == [(0, 99)]
+        assert resolve_byte_ranges([(50, 500)], 100) == [(50, 99)]
+
+    def test_unsatisfiable_ranges_are_dropped(self) -> None:
+        assert resolve_byte_ranges([(100, 200), (None, 0)], 100) == []
+        assert resolve_byte_ranges([(100, 200), (0, 0)], 100) == [(0, 0)]
+
+    def test_ranges_are_sorted_and_coalesced(self) -> None:
+        assert resolve_byte_ranges([(50, 59), (0, 9), (10, 19), (5, 7)], 100) == [(0, 19), (50, 59)]
+
+    def test_if_range_with_entity_tag(self) -> None:
+        response = create_response(headers={"etag": '"v1"'})
+
+        assert if_range_matches('"v1"', response) is True
+        assert if_range_matches('"v2"', response) is False
+        # Weak validators never match.
+        assert if_range_matches('W/"v1"', response) is False
+        assert if_range_matches('"v1"', create_response(headers={"etag": 'W/"v1"'})) is False
+
+    def test_if_range_with_date(self) -> None:
+        last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+        response = create_response(headers={"last-modified": last_modified, "date": "Tue, 02 Jan 2024 00:00:00 GMT"})
+
+        assert if_range_matches(last_modified, response) is True
+        assert if_range_matches("Sun, 31 Dec 2023 00:00:00 GMT", response) is False
+        # A Last-Modified equal to the Date is weak.
+        weak = create_response(headers={"last-modified": last_modified, "date": last_modified})
+        assert if_range_matches(last_modified, weak) is False
+
+
 # =============================================================================
 # Test Suite 6: make_conditional_request
 # =============================================================================
@@ -12,6 +12,7 @@ Test Categories:
 4. Edge cases and RFC 9111 compliance
 """
 
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
@@ -21,8 +22,11 @@ import pytest
 from hishel import Entry, EntryMeta, Request, Response
 from hishel._core._headers import Headers
 from hishel._core._spec import (
+    FRESHNESS_KEY,
     CacheMiss,
     CacheOptions,
+    CouldNotBeStored,
+    Freshness,
     FromCache,
     IdleClient,
     NeedRevalidation,
@@ -602,6 +606,170 @@ class TestTransitionToFromCache:
         assert isinstance(next_state, FromCache)
         assert next_state.entry.response.metadata.get("hishel_from_cache") is True
 
+    def test_stale_while_revalidate_serves_stale_and_schedules_revalidation(self) -> None:
+        """
+        Test: Stale response within its stale-while-revalidate window.
+
+        RFC 5861 Section 3: A cache MAY serve the stale response while it
+        revalidates it in the background.
+        """
+        # Arrange
+        idle_client = IdleClient(options=CacheOptions(stale_while_revalidate=True))
+        request = create_request()
+        response = create_response(
+            age_seconds=30,
+            max_age_seconds=10,
+            headers={"cache-control": "stale-while-revalidate=60", "etag": '"v1"'},
+        )
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.entry.id == cached_pair.id
+        assert next_state.background_revalidation is not None
+        assert next_state.background_revalidation.revalidating_entries == [cached_pair]
+        assert next_state.background_revalidation.request.headers["if-none-match"] == '"v1"'
+
+    def test_stale_while_revalidate_window_exceeded_requires_revalidation(self) -> None:
+        """
+        Test: Stale response past its stale-while-revalidate window.
+
+        RFC 5861 Section 3: Once the window has passed, the response must be
+        revalidated before it is reused.
+        """
+        # Arrange
+        idle_client = IdleClient(options=CacheOptions(stale_while_revalidate=True))
+        request = create_request()
+        response = create_response(
+            age_seconds=100,
+            max_age_seconds=10,
+            headers={"cache-control": "stale-while-revalidate=60"},
+        )
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
+    def test_stale_while_revalidate_ignored_when_disabled(self, idle_client: IdleClient) -> None:
+        """
+        Test: The stale-while-revalidate directive is ignored unless enabled in options.
+        """
+        # Arrange
+        request = create_request()
+        response = create_response(
+            age_seconds=30,
+            max_age_seconds=10,
+            headers={"cache-control": "stale-while-revalidate=60"},
+        )
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
+    def test_range_request_served_from_complete_response(self) -> None:
+        """
+        Test: With serve_ranges, a Range request is served from a fresh stored 200.
+
+        RFC 9110 Section 14.2: the byte ranges are resolved against the stored
+        representation, sorted and coalesced.
+        """
+        # Arrange
+        idle_client = IdleClient(options=CacheOptions(serve_ranges=True))
+        request = create_request(headers={"range": "bytes=90-, 0-9, 5-14"})
+        cached_pair = create_pair(response=create_response(headers={"content-length": "100"}))
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.entry.id == cached_pair.id
+        assert next_state.ranges == [(0, 14), (90, 99)]
+
+    def test_range_request_for_stale_response_goes_to_origin(self) -> None:
+        """
+        Test: A stale stored response is not sliced; the Range request goes to the origin.
+        """
+        # Arrange
+        idle_client = IdleClient(options=CacheOptions(serve_ranges=True))
+        request = create_request(headers={"range": "bytes=0-9"})
+        response = create_response(age_seconds=100, max_age_seconds=10, headers={"content-length": "100"})
+        cached_pair = create_pair(response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, CacheMiss)
+        assert next_state.request.headers["range"] == "bytes=0-9"
+
+    def test_failed_if_range_serves_full_response(self) -> None:
+        """
+        Test: When the If-Range validator doesn't match, the Range header is ignored.
+
+        RFC 9110 Section 13.1.5: "the recipient MUST ignore the Range header field"
+        """
+        # Arrange
+        idle_client = IdleClient(options=CacheOptions(serve_ranges=True))
+        request = create_request(headers={"range": "bytes=0-9", "if-range": '"v1"'})
+        response = create_response(headers={"content-length": "100", "etag": '"v2"'})
+        cached_pair = create_pair(response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.ranges is None
+
+    def test_max_stale_serves_stale_response_within_bound(self, idle_client: IdleClient) -> None:
+        """
+        Test: A request with max-stale accepts a response stale by at most that many seconds.
+
+        RFC 9111 Section 5.2.1.1: "the client is willing to accept a response
+        that has exceeded its freshness lifetime by no more than the specified
+        number of seconds"
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "max-stale=60"})
+        response = create_response(age_seconds=30, max_age_seconds=10)
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.entry.id == cached_pair.id
+
+    def test_immutable_fresh_response_skips_request_no_cache(self, idle_client: IdleClient) -> None:
+        """
+        Test: A reload (request no-cache) doesn't revalidate a fresh immutable response.
+
+        RFC 8246 Section 2: clients SHOULD NOT issue a conditional request
+        during the response's freshness lifetime.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "no-cache"})
+        response = create_response(age_seconds=10, headers={"cache-control": "immutable"})
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.entry.id == cached_pair.id
+
 
 # =============================================================================
 # Test Suite 3: Transition to NeedRevalidation State
@@ -777,6 +945,72 @@ class TestTransitionToNeedRevalidation:
         assert "if-none-match" in next_state.request.headers
         assert next_state.request.headers["if-none-match"] == '"abc123"'
 
+    def test_max_stale_exceeded_requires_revalidation(self, idle_client: IdleClient) -> None:
+        """
+        Test: A response stale for longer than the request's max-stale is revalidated.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "max-stale=60"})
+        response = create_response(age_seconds=100, max_age_seconds=10)
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
+    def test_max_stale_does_not_override_must_revalidate(self, idle_client: IdleClient) -> None:
+        """
+        Test: max-stale can't be used to serve a must-revalidate response stale.
+
+        RFC 9111 Section 5.2.2.2: the cache MUST NOT reuse a stale
+        must-revalidate response without validating it.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "max-stale"})
+        response = create_response(age_seconds=30, max_age_seconds=10, headers={"cache-control": "must-revalidate"})
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
+    def test_min_fresh_requires_revalidation_of_nearly_stale_response(self, idle_client: IdleClient) -> None:
+        """
+        Test: A response that won't stay fresh for min-fresh seconds is revalidated.
+
+        RFC 9111 Section 5.2.1.3: the client prefers a response whose freshness
+        lifetime is no less than its current age plus the specified time.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "min-fresh=600"})
+        response = create_response(age_seconds=3300, max_age_seconds=3600)
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
+    def test_immutable_stale_response_honors_request_no_cache(self, idle_client: IdleClient) -> None:
+        """
+        Test: immutable only applies during the response's freshness lifetime.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "no-cache, max-stale"})
+        response = create_response(age_seconds=30, max_age_seconds=10, headers={"cache-control": "immutable"})
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
+
 
 # =============================================================================
 # Test Suite 4: Edge Cases and RFC 9111 Compliance
@@ -786,6 +1020,53 @@ class TestTransitionToNeedRevalidation:
 
 
 class TestEdgeCasesAndCompliance:
+    def test_only_if_cached_without_stored_response_returns_gateway_timeout(self, idle_client: IdleClient) -> None:
+        """
+        Test: only-if-cached never forwards the request to the origin.
+
+        RFC 9111 Section 5.2.1.7: the cache SHOULD either respond using a stored
+        response or respond with a 504 (Gateway Timeout) status code.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "only-if-cached"})
+
+        # Act
+        next_state = idle_client.next(request, [])
+
+        # Assert
+        assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.response.status_code == 504
+
+    def test_only_if_cached_with_stale_response_returns_gateway_timeout(self, idle_client: IdleClient) -> None:
+        """
+        Test: only-if-cached doesn't revalidate a stale response with the origin.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "only-if-cached"})
+        response = create_response(age_seconds=100, max_age_seconds=10)
+        cached_pair = create_pair(request=request, response=response)
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, CouldNotBeStored)
+        assert next_state.response.status_code == 504
+
+    def test_only_if_cached_serves_fresh_response(self, idle_client: IdleClient) -> None:
+        """
+        Test: only-if-cached is satisfied by a fresh stored response.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "only-if-cached"})
+        cached_pair = create_pair(request=request, response=create_response(age_seconds=10))
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+
     """
     Tests for edge cases and specific RFC 9111 compliance scenarios.
     """
@@ -1101,3 +1382,27 @@ class TestIntegrationScenarios:
         )
         next_state_no_match = idle_client.next(non_matching_request, [cached_pair])
         assert isinstance(next_state_no_match, NeedRevalidation)
+
+    def test_stored_freshness_record_is_used_instead_of_headers(self, idle_client: IdleClient) -> None:
+        """
+        Test: A freshness record saved by the storage takes precedence over re-parsing headers.
+        """
+        # Arrange
+        request = create_request()
+        # The headers say fresh, the stored record says stale.
+        cached_pair = create_pair(request=request, response=create_response(age_seconds=10, max_age_seconds=3600))
+        cached_pair.extra = {
+            FRESHNESS_KEY: Freshness(
+                date=int(time.time()) - 10,
+                lifetime_shared=5,
+                lifetime_private=5,
+                no_cache=False,
+                must_revalidate=False,
+            )
+        }
+
+        # Act
+        next_state = idle_client.next(request, [cached_pair])
+
+        # Assert
+        assert isinstance(next_state, NeedRevalidation)
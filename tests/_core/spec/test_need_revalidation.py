@@ -14,6 +14,7 @@ Test Categories:
 """
 
 import uuid
+from datetime import datetime, timedelta
 from typing import Dict, Optional
 
 import pytest
@@ -24,6 +25,7 @@ from hishel._core._spec import (
     CacheMiss,
     CacheOptions,
     CouldNotBeStored,
+    FromCache,
     InvalidateEntries,
     NeedRevalidation,
     NeedToBeUpdated,
@@ -82,6 +84,26 @@ def create_pair(
     )
 
 
+def create_stale_pair(cache_control: str, age: int = 120) -> Entry:
+    """Helper to create a pair whose response was generated `age` seconds ago."""
+    date = (datetime.utcnow() - timedelta(seconds=age)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    return create_pair(response=create_response(headers={"cache-control": cache_control, "date": date}))
+
+
+def create_need_revalidation(
+    options: CacheOptions,
+    entries: list[Entry],
+    request: Optional[Request] = None,
+) -> NeedRevalidation:
+    """Helper to create a revalidation of `entries` for `request`."""
+    return NeedRevalidation(
+        request=create_request(),
+        original_request=request or create_request(),
+        revalidating_entries=entries,
+        options=options,
+    )
+
+
 # =============================================================================
 # Test Suite 1: 304 Not Modified Responses (Freshening)
 # =============================================================================
@@ -672,6 +694,136 @@ class TestServerErrorResponses:
         assert len(next_state.entry_ids) == 1  # First pair invalidated
 
 
+class TestStaleIfError:
+    """
+    Tests for serving stale responses when revalidation fails.
+
+    RFC 5861 Section 4: The stale-if-error Cache-Control Extension
+    """
+
+    def test_5xx_serves_stale_response_within_window(self) -> None:
+        """
+        Test: A 5xx response within the stale-if-error window serves the newest candidate.
+        """
+        # Arrange
+        newest = create_stale_pair("max-age=60, stale-if-error=3600")
+        older = create_stale_pair("max-age=60, stale-if-error=3600", age=300)
+        need_revalidation = create_need_revalidation(CacheOptions(stale_if_error=True), [newest, older])
+
+        # Act
+        next_state = need_revalidation.next(create_response(status_code=503))
+
+        # Assert
+        assert isinstance(next_state, FromCache)
+        assert next_state.entry.id == newest.id
+        assert int(next_state.entry.response.headers["age"]) >= 120
+
+    def test_5xx_past_window_forwards_error(self) -> None:
+        """
+        Test: Past the stale-if-error window, the error is forwarded as usual.
+        """
+        # Arrange
+        need_revalidation = create_need_revalidation(
+            CacheOptions(stale_if_error=True), [create_stale_pair("max-age=60, stale-if-error=30")]
+        )
+
+        # Act
+        next_state = need_revalidation.next(create_response(status_code=500))
+
+        # Assert
+        assert isinstance(next_state, InvalidateEntries)
+
+    def test_request_directive_allows_serving_stale(self) -> None:
+        """
+        Test: The request's stale-if-error directive also opens a window.
+        """
+        # Arrange
+        request = create_request(headers={"cache-control": "stale-if-error=600"})
+        need_revalidation = create_need_revalidation(
+            CacheOptions(stale_if_error=True), [create_stale_pair("max-age=60")], request=request
+        )
+
+        # Act & Assert
+        assert isinstance(need_revalidation.serve_stale_on_error(), FromCache)
+        without_directive = create_need_revalidation(
+            CacheOptions(stale_if_error=True), [create_stale_pair("max-age=60")]
+        )
+        assert without_directive.serve_stale_on_error() is None
+
+    def test_must_revalidate_is_never_served_stale(self) -> None:
+        """
+        Test: must-revalidate responses are not served when the origin fails.
+
+        RFC 9111 Section 5.2.2.2: the cache MUST NOT reuse the response without
+        successful validation.
+        """
+        need_revalidation = create_need_revalidation(
+            CacheOptions(stale_if_error=True), [create_stale_pair("max-age=60, must-revalidate, stale-if-error=600")]
+        )
+
+        assert need_revalidation.serve_stale_on_error() is None
+
+    def test_disabled_by_default(self, default_options: CacheOptions) -> None:
+        """
+        Test: Without the stale_if_error option, the directive is ignored.
+        """
+        need_revalidation = NeedRevalidation(
+            request=create_request(),
+            original_request=create_request(),
+            revalidating_entries=[create_stale_pair("max-age=60, stale-if-error=3600")],
+            options=default_options,
+        )
+
+        assert need_revalidation.serve_stale_on_error() is None
+
+
+class TestServeStalePastDeadline:
+    """
+    Tests for serving stale responses when revalidation exceeds the request's deadline.
+    """
+
+    def test_serves_newest_candidate(self) -> None:
+        """
+        Test: The newest candidate is served with an Age header, however stale it is.
+        """
+        # Arrange
+        newest = create_stale_pair("max-age=60")
+        older = create_stale_pair("max-age=60", age=300)
+        need_revalidation = create_need_revalidation(CacheOptions(), [newest, older])
+
+        # Act
+        stale = need_revalidation.serve_stale_past_deadline()
+
+        # Assert
+        assert isinstance(stale, FromCache)
+        assert stale.entry.id == newest.id
+        assert int(stale.entry.response.headers["age"]) >= 120
+
+    def test_must_revalidate_is_never_served_stale(self) -> None:
+        """
+        Test: Candidates that must be revalidated are skipped (RFC 9111 Section 4.2.4).
+        """
+        # Arrange
+        need_revalidation = create_need_revalidation(CacheOptions(), [create_stale_pair("max-age=60, must-revalidate")])
+
+        # Act / Assert
+        assert need_revalidation.serve_stale_past_deadline() is None
+
+    def test_request_no_cache_is_never_served_stale(self) -> None:
+        """
+        Test: A request that asked for validation with no-cache gets no stale response.
+        """
+        # Arrange
+        need_revalidation = create_need_revalidation(
+            CacheOptions(),
+            [create_stale_pair("max-age=60")],
+            request=create_request(headers={"cache-control": "no-cache"}),
+        )
+
+        # Act / Assert
+        assert need_revalidation.serve_stale_past_deadline() is None
+
+
 # =============================================================================
 # Test Suite 4: Edge Cases and Error Handling
 # =============================================================================
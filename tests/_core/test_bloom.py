@@ -0,0 +1,53 @@
+import pytest
+
+from hishel import BloomFilter
+
+
+def test_added_keys_are_found() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"key-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+
+
+def test_false_positive_rate() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"key-{i}")
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_bits_use_the_redis_layout() -> None:
+    bloom = BloomFilter(capacity=10)
+    bloom.add("key")
+
+    data = bloom.to_bytes()
+    for position in bloom.positions("key"):
+        # Redis GETBIT offset `position` is bit 7 - position % 8 of byte position // 8.
+        assert data[position // 8] >> (7 - position % 8) & 1
+
+
+def test_load_round_trip() -> None:
+    bloom = BloomFilter(capacity=10)
+    bloom.add("key")
+
+    copy = bloom.empty_copy()
+    assert "key" not in copy
+    # Redis strings only grow as far as the highest bit that was set.
+    copy.load(bloom.to_bytes().rstrip(b"\x00"))
+    assert "key" in copy
+
+    with pytest.raises(ValueError):
+        copy.load(bloom.to_bytes() + b"\x00")
+
+
+def test_clear() -> None:
+    bloom = BloomFilter(capacity=10)
+    bloom.add("key")
+    bloom.clear()
+
+    assert "key" not in bloom
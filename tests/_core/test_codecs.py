@@ -0,0 +1,49 @@
+import pytest
+
+from hishel import BodyCompression, Headers, LzmaCodec, Response, ZlibCodec
+from hishel._core._storages._codecs import BodyCodec, decompress_sync_stream, get_codec
+
+
+def make_response(headers: dict[str, str]) -> Response:
+    return Response(status_code=200, headers=Headers(headers))
+
+
+@pytest.mark.parametrize("codec", [ZlibCodec(), LzmaCodec()])
+def test_streaming_round_trip(codec: BodyCodec) -> None:
+    chunks = [b"hello world " * 100, b"", b"goodbye " * 50]
+
+    compressor = codec.compressor()
+    compressed = [compressor.compress(chunk) for chunk in chunks] + [compressor.flush()]
+
+    assert b"".join(decompress_sync_stream(iter(compressed), codec.name)) == b"".join(chunks)
+
+
+def test_unknown_codec() -> None:
+    with pytest.raises(ValueError, match="Unknown body codec"):
+        get_codec("brotli")
+
+
+@pytest.mark.parametrize(
+    "content_type",
+    ["text/html; charset=utf-8", "application/json", "application/problem+json", "image/svg+xml"],
+)
+def test_select_compressible_types(content_type: str) -> None:
+    assert BodyCompression().select(make_response({"content-type": content_type})) is not None
+
+
+@pytest.mark.parametrize("content_type", ["image/png", "application/octet-stream", ""])
+def test_select_skips_other_types(content_type: str) -> None:
+    assert BodyCompression().select(make_response({"content-type": content_type})) is None
+
+
+def test_select_skips_small_bodies() -> None:
+    compression = BodyCompression(min_size=1024)
+
+    assert compression.select(make_response({"content-type": "text/html", "content-length": "100"})) is None
+    assert compression.select(make_response({"content-type": "text/html", "content-length": "2048"})) is not None
+
+
+def test_select_skips_encoded_bodies() -> None:
+    response = make_response({"content-type": "text/html", "content-encoding": "gzip"})
+
+    assert BodyCompression().select(response) is None
@@ -4,7 +4,9 @@ Comprehensive pytest tests for HTTP Cache-Control parser.
 Run with: pytest test_cache_control.py -v
 """
 
-from hishel._core._headers import CacheControl, parse_cache_control
+import pytest
+
+from hishel._core._headers import CacheControl, parse_byte_ranges, parse_cache_control
 
 
 class TestBasicParsing:
@@ -607,3 +609,52 @@ class TestDefaultValues:
 
         # Extensions should be empty list
         assert cc.extensions == []
+
+
+class TestMemoization:
+    """Test that parsed values are shared and can't be modified."""
+
+    def test_same_value_returns_same_object(self):
+        """Parsing the same header value twice returns the memoized result."""
+        assert parse_cache_control("max-age=60, public") is parse_cache_control("max-age=60, public")
+
+    def test_missing_header_is_memoized(self):
+        """A missing header parses like an empty one."""
+        assert parse_cache_control(None) is parse_cache_control("")
+
+    def test_parsed_value_is_frozen(self):
+        """Shared results reject attribute assignment."""
+        cc = parse_cache_control("max-age=60")
+        with pytest.raises(AttributeError):
+            cc.max_age = 0
+        assert parse_cache_control("max-age=60").max_age == 60
+
+    def test_unparsed_instance_is_mutable(self):
+        """Only parsed instances are frozen."""
+        cc = CacheControl()
+        cc.max_age = 0
+        assert cc.max_age == 0
+
+    def test_quoted_value_with_escapes(self):
+        """Quoted values that need unescaping fall back to the slow path."""
+        cc = parse_cache_control('ext="a\\"b", max-age=5')
+        assert 'ext=a"b' in cc.extensions
+        assert cc.max_age == 5
+
+
+class TestByteRanges:
+    """Test parsing of Range header values."""
+
+    def test_single_and_multiple_ranges(self):
+        assert parse_byte_ranges("bytes=0-99") == [(0, 99)]
+        assert parse_byte_ranges("bytes=0-99, 200-, -500") == [(0, 99), (200, None), (None, 500)]
+
+    def test_whitespace_and_empty_elements(self):
+        assert parse_byte_ranges("bytes= 0 - 99 ,, 100-") == [(0, 99), (100, None)]
+
+    @pytest.mark.parametrize(
+        "value",
+        ["items=0-99", "bytes 0-99", "bytes=", "bytes=-", "bytes=a-b", "bytes=10-5", "bytes=0"],
+    )
+    def test_invalid_values(self, value):
+        assert parse_byte_ranges(value) is None
@@ -0,0 +1,207 @@
+import uuid
+
+import msgpack
+import pytest
+
+from hishel import Entry, EntryMeta, Request, Response
+from hishel._core._headers import Headers
+from hishel._core._spec import FRESHNESS_KEY, Freshness
+from hishel._core._storages._packing import (
+    FORMAT_MARKER,
+    FORMAT_VERSION,
+    HEADER_NAMES,
+    _pack_headers,
+    _PackedHeaders,
+    pack,
+    unpack,
+)
+
+
+def make_entry() -> Entry:
+    return Entry(
+        id=uuid.UUID(int=1),
+        request=Request(
+            method="GET",
+            url="https://example.com",
+            headers=Headers({"Accept": "text/html"}),
+            metadata={"hishel_ttl": 60.0},
+        ),
+        response=Response(
+            status_code=200,
+            headers=Headers(
+                {
+                    "Content-Type": "text/html",
+                    "Vary": "Accept",
+                    "Date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                    "Cache-Control": "max-age=60",
+                }
+            ),
+        ),
+        meta=EntryMeta(created_at=1000.0),
+        cache_key=b"test_key",
+    )
+
+
+def test_pack_round_trip() -> None:
+    entry = unpack(pack(make_entry(), kind="pair"), kind="pair")
+
+    assert entry.id == uuid.UUID(int=1)
+    assert entry.request.method == "GET"
+    assert entry.request.url == "https://example.com"
+    assert entry.request.headers == Headers({"accept": "text/html"})
+    assert entry.request.metadata == {"hishel_ttl": 60.0}
+    assert entry.response.status_code == 200
+    assert entry.response.headers == Headers(
+        {
+            "content-type": "text/html",
+            "vary": "Accept",
+            "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+            "cache-control": "max-age=60",
+        }
+    )
+    assert entry.meta == EntryMeta(created_at=1000.0)
+    assert entry.cache_key == b"test_key"
+
+
+def test_unpack_head() -> None:
+    head = unpack(pack(make_entry(), kind="pair"), kind="head")
+
+    assert head.id == uuid.UUID(int=1)
+    assert head.method == "GET"
+    assert head.url == "https://example.com"
+    assert head.created_at == 1000.0
+    assert head.deleted_at is None
+    assert head.ttl == 60.0
+    assert head.vary == "Accept"
+
+
+def test_headers_are_decoded_on_first_access() -> None:
+    entry = unpack(pack(make_entry(), kind="pair"), kind="pair")
+    headers = entry.response.headers
+
+    assert isinstance(headers, _PackedHeaders)
+    assert headers._decoded is None
+    assert headers["content-type"] == "text/html"
+    assert headers._decoded is not None
+
+
+def test_repacking_keeps_header_changes() -> None:
+    entry = unpack(pack(make_entry(), kind="pair"), kind="pair")
+    entry.response.headers["x-extra"] = "1"
+
+    repacked = unpack(pack(entry, kind="pair"), kind="pair")
+
+    assert repacked.response.headers["x-extra"] == "1"
+    assert repacked.request.headers["accept"] == "text/html"
+
+
+def test_unpack_legacy_map_format() -> None:
+    legacy = msgpack.packb(
+        {
+            "id": uuid.UUID(int=1).bytes,
+            "request": {
+                "method": "GET",
+                "url": "https://example.com",
+                "headers": {"accept": ["text/html"]},
+                "extra": {"hishel_ttl": 60.0},
+            },
+            "response": {
+                "status_code": 200,
+                "headers": {"vary": ["Accept"]},
+                "extra": {},
+            },
+            "meta": {"created_at": 1000.0, "deleted_at": None},
+            "cache_key": b"test_key",
+        }
+    )
+
+    head = unpack(legacy, kind="head")
+    assert head.ttl == 60.0
+    assert head.vary == "Accept"
+
+    entry = unpack(legacy, kind="pair")
+    assert entry.id == uuid.UUID(int=1)
+    assert entry.request.headers["accept"] == "text/html"
+    assert entry.response.status_code == 200
+
+
+def test_pack_writes_format_marker() -> None:
+    assert pack(make_entry(), kind="pair")[:2] == bytes((FORMAT_MARKER, FORMAT_VERSION))
+
+
+def test_unsupported_format_version() -> None:
+    packed = pack(make_entry(), kind="pair")
+
+    with pytest.raises(ValueError, match="Unsupported entry format version"):
+        unpack(packed[:1] + bytes((FORMAT_VERSION + 1,)) + packed[2:], kind="pair")
+
+
+def test_header_names_are_interned() -> None:
+    packed = _pack_headers(Headers({"Content-Type": "text/html", "X-Custom": ["a", "b"]}))
+
+    assert msgpack.unpackb(packed) == [HEADER_NAMES.index("content-type"), "text/html", "x-custom", ["a", "b"]]
+    assert _PackedHeaders(packed) == Headers({"content-type": "text/html", "x-custom": ["a", "b"]})
+
+
+def test_unpack_rejects_unversioned_arrays() -> None:
+    unversioned = msgpack.packb([uuid.UUID(int=1).bytes, b"test_key", "GET", "https://example.com"])
+
+    with pytest.raises(ValueError, match="Unsupported entry format"):
+        unpack(unversioned, kind="pair")
+
+
+def test_freshness_is_stored_with_the_entry() -> None:
+    head = unpack(pack(make_entry(), kind="pair"), kind="head")
+
+    assert head.freshness == Freshness(
+        date=1704067200,
+        lifetime_shared=60,
+        lifetime_private=60,
+        no_cache=False,
+        must_revalidate=False,
+    )
+    assert head.to_entry().extra[FRESHNESS_KEY] == head.freshness
+
+
+def test_unpack_version_1_freshness_record() -> None:
+    entry = make_entry()
+    entry.response.headers["cache-control"] = "max-age=60, stale-while-revalidate=30, stale-if-error=600, immutable"
+    fields = msgpack.unpackb(pack(entry, kind="pair")[2:])
+    # Version 1 freshness records end at stale_while_revalidate.
+    fields[13] = fields[13][:6]
+    version_1 = bytes((FORMAT_MARKER, 1)) + msgpack.packb(fields)
+
+    head = unpack(version_1, kind="head")
+
+    assert head.freshness == Freshness(
+        date=1704067200,
+        lifetime_shared=60,
+        lifetime_private=60,
+        no_cache=False,
+        must_revalidate=False,
+        stale_while_revalidate=30,
+    )
+    assert head.to_entry().response.headers["cache-control"] == entry.response.headers["cache-control"]
+
+
+def test_freshness_round_trip_keeps_stale_if_error_and_immutable() -> None:
+    entry = make_entry()
+    entry.response.headers["cache-control"] = "max-age=60, stale-if-error=600, immutable"
+
+    head = unpack(pack(entry, kind="pair"), kind="head")
+
+    assert head.freshness is not None
+    assert head.freshness.stale_if_error == 600
+    assert head.freshness.immutable is True
+    # Carried over unchanged when the entry is written again.
+    assert unpack(pack(head.to_entry(), kind="pair"), kind="head").freshness == head.freshness
+
+
+def test_freshness_is_recomputed_when_headers_change() -> None:
+    entry = unpack(pack(make_entry(), kind="pair"), kind="pair")
+    entry.response.headers["cache-control"] = "no-cache"
+
+    head = unpack(pack(entry, kind="pair"), kind="head")
+
+    assert head.freshness is not None
+    assert head.freshness.no_cache is True
@@ -0,0 +1,86 @@
+import hashlib
+
+import pytest
+
+from hishel import CacheKeyBuilder, Headers, Request
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://Example.COM:443", "https://example.com/"),
+        ("http://example.com:80/a?b=1#top", "http://example.com/a?b=1"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("https://user@Example.com/a", "https://user@example.com/a"),
+        ("https://[::1]:443/a", "https://[::1]/a"),
+    ],
+)
+def test_canonical_url_normalizes_scheme_host_and_port(url: str, expected: str) -> None:
+    assert CacheKeyBuilder(canonicalize_url=True).canonical_url(url) == expected
+
+
+def test_default_keys_match_the_previous_derivation() -> None:
+    builder = CacheKeyBuilder()
+    request = Request(method="POST", url="HTTPS://Example.COM:443/search?b=2&a=1")
+
+    assert builder.canonical_url(request.url) == request.url
+    assert builder.build(request) == hashlib.sha256(b"HTTPS://Example.COM:443/search?b=2&a=1").hexdigest()
+    assert builder.build(request, b"query") == hashlib.sha256(b"query").hexdigest()
+
+
+def test_query_filters_leave_the_rest_of_the_url_alone() -> None:
+    builder = CacheKeyBuilder(sort_query=True)
+
+    assert builder.canonical_url("https://Example.COM:443/?b=2&a=1") == "https://Example.COM:443/?a=1&b=2"
+
+
+def test_canonical_url_filters_and_sorts_query() -> None:
+    builder = CacheKeyBuilder(sort_query=True, ignore_params=("utm_*", "fbclid"))
+
+    url = builder.canonical_url("https://example.com/?q=a&utm_source=x&fbclid=1&page=2&q=b")
+
+    assert url == "https://example.com/?page=2&q=a&q=b"
+
+
+def test_canonical_url_keeps_only_allowed_params() -> None:
+    builder = CacheKeyBuilder(allow_params=("id", "v*"))
+
+    assert (
+        builder.canonical_url("https://example.com/?session=1&id=7&version=2") == "https://example.com/?id=7&version=2"
+    )
+
+
+def test_equivalent_urls_share_a_key() -> None:
+    builder = CacheKeyBuilder(canonicalize_url=True, sort_query=True, ignore_params=("utm_*",))
+
+    first = builder.build(Request(method="GET", url="https://example.com/list?b=2&a=1"))
+    second = builder.build(Request(method="GET", url="https://EXAMPLE.com:443/list?a=1&utm_medium=mail&b=2"))
+
+    assert first == second
+
+
+def test_key_includes_headers_and_body() -> None:
+    builder = CacheKeyBuilder(headers=("accept-language",))
+    english = Request(method="GET", url="https://example.com/", headers=Headers({"Accept-Language": "en"}))
+    german = Request(method="GET", url="https://example.com/", headers=Headers({"Accept-Language": "de"}))
+
+    assert builder.build(english) != builder.build(german)
+    assert builder.build(english, b"a") != builder.build(english, b"b")
+
+
+def test_key_uses_the_configured_hash() -> None:
+    request = Request(method="GET", url="https://example.com/")
+
+    assert CacheKeyBuilder().build(request) == hashlib.sha256(b"https://example.com/").hexdigest()
+    assert CacheKeyBuilder(hash_name="blake2b").build(request) == hashlib.blake2b(b"https://example.com/").hexdigest()
+
+
+def test_body_hasher_matches_the_key_for_the_whole_body() -> None:
+    builder = CacheKeyBuilder(headers=("accept",))
+    request = Request(method="POST", url="https://example.com/graphql", headers=Headers({"Accept": "application/json"}))
+
+    hasher = builder.body_hasher(request)
+    for chunk in (b"{query", b" { items }", b"}"):
+        hasher.update(chunk)
+
+    assert hasher.hexdigest() == builder.build(request, b"{query { items }}")
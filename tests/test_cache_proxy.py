@@ -0,0 +1,841 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from typing import Any
+from unittest.mock import patch
+
+import anyio
+import anysqlite
+import pytest
+
+from hishel import (
+    AsyncCacheProxy,
+    AsyncSqliteStorage,
+    BloomFilter,
+    CacheKeyBuilder,
+    CacheOptions,
+    FilterPolicy,
+    Headers,
+    Request,
+    Response,
+    SpecificationPolicy,
+    SyncCacheProxy,
+    SyncSqliteStorage,
+)
+from hishel._concurrency import UncacheableMemo
+from hishel._utils import make_async_iterator, make_sync_iterator
+
+
+@pytest.mark.anyio
+async def test_coalesced_cache_misses_hit_origin_once() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await anyio.sleep(0.05)
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.coalesce_requests = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+    bodies: list[bytes] = []
+
+    async def fetch() -> None:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        bodies.append(await response.aread())
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(10):
+            tg.start_soon(fetch)
+
+    assert calls == 1
+    assert bodies == [b"hello"] * 10
+
+
+@pytest.mark.anyio
+async def test_coalesced_cache_misses_fall_back_to_origin_when_not_stored() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await anyio.sleep(0.01)
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "no-store"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.coalesce_requests = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    async def fetch() -> None:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(3):
+            tg.start_soon(fetch)
+
+    assert calls == 3
+
+
+@pytest.mark.anyio
+async def test_coalesced_flight_is_released_when_leader_never_reads_the_body() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.coalesce_requests = True
+    policy.coalesce_timeout = 2
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    # Closed without being read.
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    await response.stream.aclose()  # type: ignore[union-attr]
+    # Dropped without being read or closed.
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    del response
+
+    started = time.monotonic()
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert await response.aread() == b"hello"
+    assert time.monotonic() - started < 1
+    assert calls == 3
+
+
+def test_sync_coalesced_cache_misses_hit_origin_once() -> None:
+    calls = 0
+    calls_lock = threading.Lock()
+
+    def send_request(request: Request) -> Response:
+        nonlocal calls
+        with calls_lock:
+            calls += 1
+        time.sleep(0.05)
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600"}),
+            stream=make_sync_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.coalesce_requests = True
+    proxy = SyncCacheProxy(
+        send_request,
+        storage=SyncSqliteStorage(connection=sqlite3.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    def fetch() -> bytes:
+        response = proxy.handle_request(Request(method="GET", url="https://example.com"))
+        return response.read()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        bodies = list(executor.map(lambda _: fetch(), range(10)))
+
+    assert calls == 1
+    assert bodies == [b"hello"] * 10
+
+
+@pytest.mark.anyio
+async def test_stale_while_revalidate_serves_stale_and_refreshes_in_background() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return Response(
+                status_code=200,
+                headers=Headers(
+                    {
+                        "cache-control": "max-age=1, stale-while-revalidate=60",
+                        "date": formatdate(time.time() - 10, usegmt=True),
+                        "etag": '"v1"',
+                    }
+                ),
+                stream=make_async_iterator([b"stale"]),
+            )
+        assert request.headers["if-none-match"] == '"v1"'
+        await anyio.sleep(0.05)
+        return Response(
+            status_code=304,
+            headers=Headers({"date": formatdate(usegmt=True)}),
+            stream=make_async_iterator([]),
+        )
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=SpecificationPolicy(cache_options=CacheOptions(stale_while_revalidate=True)),
+    )
+
+    async with proxy:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        assert response.metadata["hishel_from_cache"] is True
+        assert await response.aread() == b"stale"
+
+    assert calls == 2
+
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert response.metadata["hishel_from_cache"] is True
+    assert await response.aread() == b"stale"
+    assert calls == 2
+
+
+def test_sync_stale_while_revalidate_serves_stale_and_refreshes_in_background() -> None:
+    calls = 0
+    revalidated = threading.Event()
+
+    def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return Response(
+                status_code=200,
+                headers=Headers(
+                    {
+                        "cache-control": "max-age=1, stale-while-revalidate=60",
+                        "date": formatdate(time.time() - 10, usegmt=True),
+                        "etag": '"v1"',
+                    }
+                ),
+                stream=make_sync_iterator([b"stale"]),
+            )
+        revalidated.set()
+        return Response(
+            status_code=304,
+            headers=Headers({"date": formatdate(usegmt=True)}),
+            stream=make_sync_iterator([]),
+        )
+
+    proxy = SyncCacheProxy(
+        send_request,
+        storage=SyncSqliteStorage(connection=sqlite3.connect(":memory:", check_same_thread=False)),
+        policy=SpecificationPolicy(cache_options=CacheOptions(stale_while_revalidate=True)),
+    )
+
+    with proxy:
+        proxy.handle_request(Request(method="GET", url="https://example.com")).read()
+
+        response = proxy.handle_request(Request(method="GET", url="https://example.com"))
+        assert response.metadata["hishel_from_cache"] is True
+        assert response.read() == b"stale"
+        assert revalidated.wait(5)
+
+    assert calls == 2
+
+    response = proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert response.read() == b"stale"
+    assert calls == 2
+
+
+def test_sync_concurrent_stale_hits_start_one_background_revalidation() -> None:
+    calls = 0
+    calls_lock = threading.Lock()
+    release = threading.Event()
+
+    def send_request(request: Request) -> Response:
+        nonlocal calls
+        with calls_lock:
+            calls += 1
+            first = calls == 1
+        if first:
+            return Response(
+                status_code=200,
+                headers=Headers(
+                    {
+                        "cache-control": "max-age=1, stale-while-revalidate=60",
+                        "date": formatdate(time.time() - 10, usegmt=True),
+                        "etag": '"v1"',
+                    }
+                ),
+                stream=make_sync_iterator([b"stale"]),
+            )
+        # Keep the revalidation running while the other threads are served.
+        release.wait(5)
+        return Response(
+            status_code=304,
+            headers=Headers({"date": formatdate(usegmt=True)}),
+            stream=make_sync_iterator([]),
+        )
+
+    proxy = SyncCacheProxy(
+        send_request,
+        storage=SyncSqliteStorage(connection=sqlite3.connect(":memory:", check_same_thread=False)),
+        policy=SpecificationPolicy(cache_options=CacheOptions(stale_while_revalidate=True)),
+    )
+    barrier = threading.Barrier(8)
+
+    def fetch() -> bytes:
+        barrier.wait()
+        return proxy.handle_request(Request(method="GET", url="https://example.com")).read()
+
+    with proxy:
+        proxy.handle_request(Request(method="GET", url="https://example.com")).read()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            bodies = list(pool.map(lambda _: fetch(), range(8)))
+        release.set()
+
+    assert bodies == [b"stale"] * 8
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_deadline_serves_stale_and_finishes_revalidation_in_background() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return Response(
+                status_code=200,
+                headers=Headers({"cache-control": "max-age=0", "etag": '"v1"'}),
+                stream=make_async_iterator([b"stale"]),
+            )
+        await anyio.sleep(0.2)
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600", "etag": '"v2"'}),
+            stream=make_async_iterator([b"fresh"]),
+        )
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+    )
+
+    async with proxy:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+
+        response = await proxy.handle_request(
+            Request(method="GET", url="https://example.com", metadata={"hishel_deadline": 0.05})
+        )
+        assert response.metadata["hishel_from_cache"] is True
+        assert await response.aread() == b"stale"
+
+    assert calls == 2
+
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert response.metadata["hishel_from_cache"] is True
+    assert await response.aread() == b"fresh"
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_deadline_revalidation_keeps_the_spooled_body_until_it_is_sent() -> None:
+    received: list[bytes] = []
+
+    async def send_request(request: Request) -> Response:
+        if received:
+            # Only read the body after the deadline has passed.
+            await anyio.sleep(0.2)
+        received.append(b"".join([chunk async for chunk in request._aiter_stream()]))
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=0", "etag": f'"v{len(received)}"'}),
+            stream=make_async_iterator([b"stale" if len(received) == 1 else b"fresh"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.use_body_key = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    def search(**metadata: float) -> Request:
+        return Request(
+            method="GET", url="https://example.com", stream=make_async_iterator([b"query"]), metadata=metadata
+        )
+
+    async with proxy:
+        response = await proxy.handle_request(search())
+        await response.aread()
+
+        response = await proxy.handle_request(search(hishel_deadline=0.05))
+        assert response.metadata["hishel_from_cache"] is True
+        assert await response.aread() == b"stale"
+
+    assert received == [b"query", b"query"]
+
+
+def test_sync_deadline_serves_stale_and_finishes_revalidation_in_background() -> None:
+    calls = 0
+
+    def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return Response(
+                status_code=200,
+                headers=Headers({"cache-control": "max-age=0", "etag": '"v1"'}),
+                stream=make_sync_iterator([b"stale"]),
+            )
+        time.sleep(0.2)
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600", "etag": '"v2"'}),
+            stream=make_sync_iterator([b"fresh"]),
+        )
+
+    proxy = SyncCacheProxy(
+        send_request,
+        storage=SyncSqliteStorage(connection=sqlite3.connect(":memory:", check_same_thread=False)),
+    )
+
+    with proxy:
+        proxy.handle_request(Request(method="GET", url="https://example.com")).read()
+
+        response = proxy.handle_request(
+            Request(method="GET", url="https://example.com", metadata={"hishel_deadline": 0.05})
+        )
+        assert response.metadata["hishel_from_cache"] is True
+        assert response.read() == b"stale"
+
+    assert calls == 2
+
+    response = proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert response.read() == b"fresh"
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_deadline_returns_revalidated_response_when_origin_is_fast() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=0"}),
+            stream=make_async_iterator([f"response {calls}".encode()]),
+        )
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+    )
+
+    async with proxy:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+
+        response = await proxy.handle_request(
+            Request(method="GET", url="https://example.com", metadata={"hishel_deadline": 5})
+        )
+        assert response.metadata["hishel_from_cache"] is False
+        assert await response.aread() == b"response 2"
+
+
+@pytest.mark.anyio
+async def test_variant_index_serves_the_matching_variant() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600", "vary": "Accept-Language"}),
+            stream=make_async_iterator([request.headers["accept-language"].encode()]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.use_variant_index = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    for language in ("en", "fr", "en", "fr"):
+        response = await proxy.handle_request(
+            Request(method="GET", url="https://example.com", headers=Headers({"accept-language": language}))
+        )
+        assert await response.aread() == language.encode()
+
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_key_filter_skips_lookups_for_unknown_keys() -> None:
+    async def send_request(request: Request) -> Response:
+        return Response(
+            status_code=200, headers=Headers({"cache-control": "max-age=3600"}), stream=make_async_iterator([b"hello"])
+        )
+
+    storage = AsyncSqliteStorage(
+        connection=await anysqlite.connect(":memory:", check_same_thread=False),
+        key_filter=BloomFilter(capacity=100),
+    )
+    proxy = AsyncCacheProxy(send_request, storage=storage)
+
+    with patch.object(storage, "get_entries", wraps=storage.get_entries) as get_entries:
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+        assert get_entries.call_count == 0
+
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        assert response.metadata["hishel_from_cache"] is True
+        assert get_entries.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_uncacheable_responses_skip_the_storage() -> None:
+    cache_control = "no-store"
+
+    async def send_request(request: Request) -> Response:
+        return Response(
+            status_code=200, headers=Headers({"cache-control": cache_control}), stream=make_async_iterator([b"hello"])
+        )
+
+    storage = AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False))
+    policy = SpecificationPolicy()
+    policy.remember_uncacheable = True
+    proxy = AsyncCacheProxy(send_request, storage=storage, policy=policy)
+
+    with patch.object(storage, "get_entries", wraps=storage.get_entries) as get_entries:
+        for _ in range(3):
+            response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+            assert await response.aread() == b"hello"
+            assert response.metadata["hishel_stored"] is False
+        assert get_entries.call_count == 1
+
+        # Once the origin allows storing, the response is stored and the key is forgotten.
+        cache_control = "max-age=3600"
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        await response.aread()
+        assert response.metadata["hishel_stored"] is True
+        assert get_entries.call_count == 1
+
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        assert response.metadata["hishel_from_cache"] is True
+        assert get_entries.call_count == 2
+
+
+def test_uncacheable_memo_is_bounded_and_expires() -> None:
+    memo = UncacheableMemo(maxsize=2)
+    memo.add("a", ttl=60)
+    memo.add("b", ttl=60)
+    memo.add("c", ttl=60)
+    assert "a" not in memo
+    assert "b" in memo and "c" in memo
+
+    memo.add("d", ttl=0)
+    assert "d" not in memo
+    assert len(memo) == 1
+
+
+@pytest.mark.anyio
+async def test_range_requests_are_served_from_the_cache() -> None:
+    calls = 0
+    body = b"0123456789abcdefghij"
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers(
+                {"cache-control": "max-age=3600", "content-type": "text/plain", "content-length": str(len(body))}
+            ),
+            stream=make_async_iterator([body[:8], body[8:]]),
+        )
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=SpecificationPolicy(cache_options=CacheOptions(serve_ranges=True)),
+    )
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert await response.aread() == body
+
+    response = await proxy.handle_request(
+        Request(method="GET", url="https://example.com", headers=Headers({"range": "bytes=5-11"}))
+    )
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 5-11/20"
+    assert response.headers["content-length"] == "7"
+    assert response.metadata["hishel_from_cache"] is True
+    assert await response.aread() == b"56789ab"
+
+    response = await proxy.handle_request(
+        Request(method="GET", url="https://example.com", headers=Headers({"range": "bytes=-3, 0-1"}))
+    )
+    boundary = response.headers["content-type"].split("boundary=")[1]
+    content = await response.aread()
+    assert response.status_code == 206
+    assert int(response.headers["content-length"]) == len(content)
+    assert (
+        content
+        == (
+            f"--{boundary}\r\ncontent-type: text/plain\r\ncontent-range: bytes 0-1/20\r\n\r\n01"
+            f"\r\n--{boundary}\r\ncontent-type: text/plain\r\ncontent-range: bytes 17-19/20\r\n\r\nhij"
+            f"\r\n--{boundary}--\r\n"
+        ).encode()
+    )
+    assert calls == 1
+
+
+@pytest.mark.anyio
+async def test_stale_if_error_serves_stored_response_when_origin_fails() -> None:
+    outcomes: list[Response | Exception] = [
+        Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=0, stale-if-error=60"}),
+            stream=make_async_iterator([b"hello"]),
+        ),
+        ConnectionError("origin is down"),
+        Response(status_code=503, stream=make_async_iterator([b"unavailable"])),
+    ]
+
+    async def send_request(request: Request) -> Response:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=SpecificationPolicy(cache_options=CacheOptions(stale_if_error=True)),
+    )
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert await response.aread() == b"hello"
+
+    for _ in range(2):
+        response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+        assert response.status_code == 200
+        assert response.metadata["hishel_from_cache"] is True
+        assert await response.aread() == b"hello"
+    assert outcomes == []
+
+
+@pytest.mark.anyio
+async def test_only_if_cached_never_reaches_the_origin() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+    )
+    cached_request = Request(
+        method="GET", url="https://example.com", headers=Headers({"cache-control": "only-if-cached"})
+    )
+
+    response = await proxy.handle_request(cached_request)
+    assert response.status_code == 504
+    assert calls == 0
+
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert await response.aread() == b"hello"
+
+    response = await proxy.handle_request(cached_request)
+    assert response.status_code == 200
+    assert response.metadata["hishel_from_cache"] is True
+    assert calls == 1
+
+
+@pytest.mark.anyio
+async def test_only_if_cached_is_honored_for_remembered_uncacheable_keys() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "no-store"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.remember_uncacheable = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com"))
+    assert await response.aread() == b"hello"
+    assert calls == 1
+
+    response = await proxy.handle_request(
+        Request(method="GET", url="https://example.com", headers=Headers({"cache-control": "only-if-cached"}))
+    )
+    assert response.status_code == 504
+    assert calls == 1
+
+
+@pytest.mark.anyio
+async def test_canonicalized_urls_share_cache_entries() -> None:
+    calls = 0
+
+    async def send_request(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(
+            status_code=200,
+            headers=Headers({"cache-control": "max-age=3600"}),
+            stream=make_async_iterator([b"hello"]),
+        )
+
+    policy = SpecificationPolicy()
+    policy.key_builder = CacheKeyBuilder(canonicalize_url=True, sort_query=True, ignore_params=("utm_*",))
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    response = await proxy.handle_request(Request(method="GET", url="https://example.com/?a=1&b=2"))
+    assert await response.aread() == b"hello"
+
+    response = await proxy.handle_request(Request(method="GET", url="https://Example.com/?b=2&utm_source=mail&a=1"))
+    assert response.metadata["hishel_from_cache"] is True
+    assert await response.aread() == b"hello"
+    assert calls == 1
+
+
+@pytest.mark.anyio
+async def test_body_key_is_hashed_while_the_body_is_spooled() -> None:
+    received: list[bytes] = []
+
+    async def send_request(request: Request) -> Response:
+        received.append(b"".join([chunk async for chunk in request._aiter_stream()]))
+        return Response(status_code=200, stream=make_async_iterator([b"result"]))
+
+    policy = FilterPolicy()
+    policy.use_body_key = True
+    policy.body_key_spool_size = 4
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    def search(*chunks: bytes) -> Request:
+        return Request(method="POST", url="https://example.com/search", stream=make_async_iterator(chunks))
+
+    response = await proxy.handle_request(search(b"query=", b"python"))
+    assert await response.aread() == b"result"
+    assert received == [b"query=python"]
+
+    response = await proxy.handle_request(search(b"query", b"=python"))
+    assert response.metadata["hishel_from_cache"] is True
+
+    response = await proxy.handle_request(search(b"query=rust"))
+    assert response.metadata["hishel_from_cache"] is False
+    assert received == [b"query=python", b"query=rust"]
+
+
+@pytest.mark.anyio
+async def test_body_key_accepts_sync_bodies_in_async_proxies() -> None:
+    received: list[bytes] = []
+
+    async def send_request(request: Request) -> Response:
+        received.append(b"".join([chunk async for chunk in request._aiter_stream()]))
+        return Response(status_code=200, stream=make_async_iterator([b"result"]))
+
+    policy = FilterPolicy()
+    policy.use_body_key = True
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    for body in (iter([b"query=", b"python"]), iter([b"query=python"])):
+        response = await proxy.handle_request(Request(method="POST", url="https://example.com/search", stream=body))
+        assert await response.aread() == b"result"
+
+    assert response.metadata["hishel_from_cache"] is True
+    assert received == [b"query=python"]
+
+
+@pytest.mark.anyio
+async def test_body_key_spool_is_closed_when_the_body_is_never_sent() -> None:
+    spools: list[tempfile.SpooledTemporaryFile[bytes]] = []
+
+    class RecordingSpool(tempfile.SpooledTemporaryFile):  # type: ignore[type-arg]
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            spools.append(self)
+
+    async def send_request(request: Request) -> Response:
+        # Answers without reading the request body.
+        return Response(status_code=200, stream=make_async_iterator([b"result"]))
+
+    policy = FilterPolicy()
+    policy.use_body_key = True
+    policy.body_key_spool_size = 4
+    proxy = AsyncCacheProxy(
+        send_request,
+        storage=AsyncSqliteStorage(connection=await anysqlite.connect(":memory:", check_same_thread=False)),
+        policy=policy,
+    )
+
+    with (
+        patch("tempfile.SpooledTemporaryFile", RecordingSpool),
+        patch("anyio.to_thread.run_sync", wraps=anyio.to_thread.run_sync) as run_sync,
+    ):
+        for from_cache in (False, True):
+            request = Request(
+                method="POST", url="https://example.com/search", stream=make_async_iterator([b"query=", b"python"])
+            )
+            response = await proxy.handle_request(request)
+            assert response.metadata["hishel_from_cache"] is from_cache
+            assert await response.aread() == b"result"
+
+    # Both bodies spilled to disk, off the event loop, and neither was read by the origin.
+    assert run_sync.called
+    assert len(spools) == 2
+    assert all(spool._rolled and spool.closed for spool in spools)  # type: ignore[attr-defined]